@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Materialized dashboard aggregates.
+
+Global and per-department totals of active employees live in summary
+tables kept up to date by triggers on employees, so every write path
+(API, Excel import, maintenance scripts) maintains them without extra
+code and /api/analytics/dashboard reads a handful of rows instead of
+scanning the whole table. The top-N leaderboard is served from a partial
+index ordered by total_entries, which SQLite maintains the same way.
+
+Usage:
+    python analytics.py            # check summary tables against a full recompute
+    python analytics.py --repair   # rebuild them if they have drifted
+"""
+import argparse
+from typing import Dict, List
+
+LEADERBOARD_SIZE = 10
+
+ANALYTICS_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS analytics_totals (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total_employees INTEGER NOT NULL DEFAULT 0,
+        total_entries INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS analytics_department_totals (
+        department TEXT PRIMARY KEY,
+        employee_count INTEGER NOT NULL DEFAULT 0,
+        total_entries INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    # Covers the top performers query so it reads LEADERBOARD_SIZE index entries
+    '''
+    CREATE INDEX IF NOT EXISTS idx_employees_leaderboard
+    ON employees(total_entries DESC, name, department)
+    WHERE is_active = 1 AND total_entries > 0
+    ''',
+    # An update is applied as "remove the old row, add the new row", which also
+    # covers activation changes and moves between departments
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_analytics_employee_insert
+    AFTER INSERT ON employees WHEN NEW.is_active = 1
+    BEGIN
+        UPDATE analytics_totals
+        SET total_employees = total_employees + 1,
+            total_entries = total_entries + COALESCE(NEW.total_entries, 0)
+        WHERE id = 1;
+        INSERT INTO analytics_department_totals (department, employee_count, total_entries)
+        SELECT NEW.department, 1, COALESCE(NEW.total_entries, 0)
+        WHERE NEW.department IS NOT NULL
+        ON CONFLICT(department) DO UPDATE SET
+            employee_count = employee_count + 1,
+            total_entries = total_entries + excluded.total_entries;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_analytics_employee_delete
+    AFTER DELETE ON employees WHEN OLD.is_active = 1
+    BEGIN
+        UPDATE analytics_totals
+        SET total_employees = total_employees - 1,
+            total_entries = total_entries - COALESCE(OLD.total_entries, 0)
+        WHERE id = 1;
+        UPDATE analytics_department_totals
+        SET employee_count = employee_count - 1,
+            total_entries = total_entries - COALESCE(OLD.total_entries, 0)
+        WHERE department = OLD.department;
+        DELETE FROM analytics_department_totals
+        WHERE department = OLD.department AND employee_count <= 0;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_analytics_employee_update
+    AFTER UPDATE OF total_entries, is_active, department ON employees
+    WHEN OLD.is_active = 1 OR NEW.is_active = 1
+    BEGIN
+        UPDATE analytics_totals
+        SET total_employees = total_employees
+                - (CASE WHEN OLD.is_active = 1 THEN 1 ELSE 0 END)
+                + (CASE WHEN NEW.is_active = 1 THEN 1 ELSE 0 END),
+            total_entries = total_entries
+                - (CASE WHEN OLD.is_active = 1 THEN COALESCE(OLD.total_entries, 0) ELSE 0 END)
+                + (CASE WHEN NEW.is_active = 1 THEN COALESCE(NEW.total_entries, 0) ELSE 0 END)
+        WHERE id = 1;
+        UPDATE analytics_department_totals
+        SET employee_count = employee_count - 1,
+            total_entries = total_entries - COALESCE(OLD.total_entries, 0)
+        WHERE OLD.is_active = 1 AND department = OLD.department;
+        DELETE FROM analytics_department_totals
+        WHERE OLD.is_active = 1 AND department = OLD.department AND employee_count <= 0;
+        INSERT INTO analytics_department_totals (department, employee_count, total_entries)
+        SELECT NEW.department, 1, COALESCE(NEW.total_entries, 0)
+        WHERE NEW.is_active = 1 AND NEW.department IS NOT NULL
+        ON CONFLICT(department) DO UPDATE SET
+            employee_count = employee_count + 1,
+            total_entries = total_entries + excluded.total_entries;
+    END
+    '''
+]
+
+def install_analytics(conn):
+    """Create the summary tables and triggers, seeding them on first install"""
+    for statement in ANALYTICS_SCHEMA:
+        conn.execute(statement)
+    if conn.execute('SELECT 1 FROM analytics_totals WHERE id = 1').fetchone() is None:
+        rebuild_analytics(conn)
+
+def rebuild_analytics(conn):
+    """Recompute the summary tables from employees (caller commits)"""
+    conn.execute('DELETE FROM analytics_totals')
+    conn.execute('''
+        INSERT INTO analytics_totals (id, total_employees, total_entries)
+        SELECT 1, COUNT(*), COALESCE(SUM(total_entries), 0)
+        FROM employees WHERE is_active = 1
+    ''')
+    conn.execute('DELETE FROM analytics_department_totals')
+    conn.execute('''
+        INSERT INTO analytics_department_totals (department, employee_count, total_entries)
+        SELECT department, COUNT(*), COALESCE(SUM(total_entries), 0)
+        FROM employees
+        WHERE is_active = 1 AND department IS NOT NULL
+        GROUP BY department
+    ''')
+
+def _materialized(conn) -> Dict:
+    row = conn.execute('SELECT total_employees, total_entries FROM analytics_totals WHERE id = 1').fetchone()
+    departments = conn.execute('''
+        SELECT department, employee_count, total_entries FROM analytics_department_totals
+    ''').fetchall()
+    return {
+        'totals': tuple(row) if row else None,
+        'departments': {d[0]: (d[1], d[2]) for d in departments}
+    }
+
+def _recomputed(conn) -> Dict:
+    row = conn.execute('''
+        SELECT COUNT(*), COALESCE(SUM(total_entries), 0) FROM employees WHERE is_active = 1
+    ''').fetchone()
+    departments = conn.execute('''
+        SELECT department, COUNT(*), COALESCE(SUM(total_entries), 0)
+        FROM employees
+        WHERE is_active = 1 AND department IS NOT NULL
+        GROUP BY department
+    ''').fetchall()
+    return {
+        'totals': tuple(row),
+        'departments': {d[0]: (d[1], d[2]) for d in departments}
+    }
+
+def check_analytics(conn) -> List[str]:
+    """Diff the summary tables against a from-scratch recompute.
+
+    Returns a list of human readable mismatches, empty when consistent.
+    """
+    stored = _materialized(conn)
+    actual = _recomputed(conn)
+    problems = []
+    if stored['totals'] != actual['totals']:
+        problems.append(f"totals: stored {stored['totals']}, actual {actual['totals']}")
+    for department in sorted(set(stored['departments']) | set(actual['departments'])):
+        have = stored['departments'].get(department)
+        want = actual['departments'].get(department)
+        if have != want:
+            problems.append(f"department {department!r}: stored {have}, actual {want}")
+    return problems
+
+def read_dashboard_aggregates(conn) -> Dict:
+    """Totals, department breakdown and leaderboard for the dashboard"""
+    from database import fetch_records
+
+    totals = conn.execute('SELECT total_employees, total_entries FROM analytics_totals WHERE id = 1').fetchone()
+    departments = fetch_records(conn, '''
+        SELECT department, employee_count, total_entries
+        FROM analytics_department_totals
+        ORDER BY total_entries DESC
+    ''')
+    top_performers = fetch_records(conn, '''
+        SELECT name, total_entries, department
+        FROM employees
+        WHERE is_active = 1 AND total_entries > 0
+        ORDER BY total_entries DESC
+        LIMIT ?
+    ''', (LEADERBOARD_SIZE,))
+    # Raffle participants; counted from idx_employees_leaderboard alone
+    eligible = conn.execute(
+        'SELECT COUNT(*) FROM employees WHERE is_active = 1 AND total_entries > 0'
+    ).fetchone()[0]
+    return {
+        'total_employees': totals[0] if totals else 0,
+        'total_entries': totals[1] if totals else 0,
+        'eligible_employees': eligible,
+        'top_performers': top_performers,
+        'department_stats': departments
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the materialized dashboard aggregates")
+    parser.add_argument('--repair', action='store_true', help="rebuild the summary tables on mismatch")
+    args = parser.parse_args()
+
+    from database import db
+
+    with db.get_connection() as conn:
+        problems = check_analytics(conn)
+        if not problems:
+            print("Analytics aggregates are consistent")
+            return
+        for problem in problems:
+            print(f"MISMATCH {problem}")
+        if args.repair:
+            rebuild_analytics(conn)
+            db.bump_data_version(conn)
+            conn.commit()
+            print("Summary tables rebuilt")
+        else:
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
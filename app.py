@@ -1,48 +1,93 @@
 from flask import Flask, render_template, request, jsonify, session, redirect, url_for
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+import csv
+import io
 import json
+import multiprocessing
 import os
+import secrets
+import sqlite3
+import tempfile
+import time
+import zipfile
 from datetime import datetime
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
-from openpyxl import load_workbook
 
 # Import our secure modules
 from config import config
-from database import db, DatabaseManager
-from auth import AuthManager, login_required, role_required
+from database import db, fetch_records, iter_keyed_records
+from json_provider import FastJSONProvider
+from auth import AuthManager, PasswordHasherBusy, password_hasher, revocations, login_required, role_required
+from cache import versioned_response
+from raffle import (DRAW_ALGORITHM, load_participants, draw_many, replay_draw,
+                    snapshot_participants, snapshot_digest)
+from odds import simulate_odds, simulation_work, apply_overrides
+from analytics import read_dashboard_aggregates, LEADERBOARD_SIZE
+from excel_import import (EmployeeNameReader, insert_employee_batches, extract_workbooks, merge_names,
+                          batched, IMPORT_BATCH_SIZE)
+from name_matching import normalize_name, find_near_duplicates, NEAR_DUPLICATE_REPORT_LIMIT
+from jobs import JobQueue, JOB_QUEUED, JOB_CANCELLED, FINISHED_STATES
+import rate_limit_storage  # noqa: F401 (registers the sqlite:// RATELIMIT_STORAGE_URI scheme)
+
+class SpooledUploadRequest(Request):
+    """Keep uploaded files in memory up to UPLOAD_SPOOL_THRESHOLD.
+    
+    Werkzeug spills anything over 500KB to a temp file by default, which
+    costs an extra disk write and read-back for every normal-sized workbook.
+    """
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=app.config['UPLOAD_SPOOL_THRESHOLD'], mode='rb+')
+
+# Sheet-parsing workers (excel_import.extract_workbooks) are started with
+# spawn, which re-imports the main module in every child as __mp_main__:
+# under `python app.py` that is this file, and parent_process() is not set
+# yet while it runs. Startup side effects (directories, JSON migration,
+# rate-limit storage, job dispatcher) belong to the serving process only.
+SERVING_PROCESS = __name__ != '__mp_main__' and multiprocessing.parent_process() is None
 
 # Create Flask app with configuration
 app = Flask(__name__)
+app.request_class = SpooledUploadRequest
 config_name = os.getenv('FLASK_ENV', 'development')
 app.config.from_object(config[config_name])
+app.json = FastJSONProvider(app, use_orjson=app.config['JSON_USE_ORJSON'])
 
-# Initialize rate limiter
+# Initialize rate limiter; counts are shared across workers through
+# RATELIMIT_STORAGE_URI (a SQLite file by default)
 limiter = Limiter(
     key_func=get_remote_address,
     default_limits=["100 per hour"]
 )
-limiter.init_app(app)
-
-# Create necessary directories with error handling
-try:
-    os.makedirs(app.config['UPLOAD_PATH'], exist_ok=True)
-    os.makedirs('data', exist_ok=True)
-    os.makedirs('backups', exist_ok=True)
-except Exception as e:
-    print(f"Warning: Could not create directories: {e}")
-
-# Initialize database with error handling
-try:
-    db_manager = DatabaseManager()
-    
-    # Migrate existing JSON data if it exists
-    if os.path.exists('raffle_data.json'):
-        db_manager.migrate_from_json('raffle_data.json')
-except Exception as e:
-    print(f"Database initialization warning: {e}")
-    # Create a fallback minimal database manager
-    db_manager = None
+
+if SERVING_PROCESS:
+    limiter.init_app(app)
+    
+    # Create necessary directories with error handling
+    try:
+        os.makedirs(app.config['UPLOAD_PATH'], exist_ok=True)
+        os.makedirs('data', exist_ok=True)
+        os.makedirs('backups', exist_ok=True)
+    except Exception as e:
+        print(f"Warning: Could not create directories: {e}")
+    
+    # Migrate existing JSON data if it exists (the shared db is initialized on import)
+    try:
+        if os.path.exists('raffle_data.json'):
+            db.migrate_from_json('raffle_data.json')
+    except Exception as e:
+        print(f"Database initialization warning: {e}")
+
+# Background jobs for work that shouldn't run inside a request (imports, resets)
+jobs = JobQueue(
+    db,
+    workers=app.config['JOB_WORKERS'],
+    poll_interval=app.config['JOB_POLL_INTERVAL'],
+    max_attempts=app.config['JOB_MAX_ATTEMPTS']
+)
 
 # Security middleware
 @app.before_request
@@ -64,120 +109,28 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
-def process_excel_file(filepath):
-    """
-    Process Excel file and extract employee names using openpyxl.
-    This function will try to find employee names in common column patterns.
-    """
-    try:
-        # Load the Excel file
-        workbook = load_workbook(filepath)
-        sheet = workbook.active
-        
-        # Get all data from the sheet
-        data = []
-        headers = []
-        
-        # Read headers (first row)
-        for cell in sheet[1]:
-            headers.append(str(cell.value) if cell.value else "")
-        
-        # Read all data rows
-        for row in sheet.iter_rows(min_row=2, values_only=True):
-            data.append([str(cell) if cell is not None else "" for cell in row])
-        
-        employees = []
-        first_name_col = None
-        last_name_col = None
-        full_name_col = None
-        detected_columns = []
-        
-        # Look for first name and last name columns
-        for i, header in enumerate(headers):
-            header_lower = header.lower().strip()
-            if 'first' in header_lower and 'name' in header_lower:
-                first_name_col = i
-                detected_columns.append(f"First Name (Column {i+1})")
-            elif 'last' in header_lower and 'name' in header_lower:
-                last_name_col = i
-                detected_columns.append(f"Last Name (Column {i+1})")
-            elif ('full' in header_lower or 'employee' in header_lower or 'caregiver' in header_lower or 'staff' in header_lower) and 'name' in header_lower:
-                full_name_col = i
-                detected_columns.append(f"Full Name (Column {i+1})")
-        
-        # If we found both first and last name columns, combine them
-        if first_name_col is not None and last_name_col is not None:
-            for row in data:
-                if (len(row) > max(first_name_col, last_name_col) and 
-                    row[first_name_col] and row[last_name_col]):
-                    
-                    first_name = str(row[first_name_col]).strip()
-                    last_name = str(row[last_name_col]).strip()
-                    
-                    if (first_name and last_name and 
-                        first_name.lower() not in ['none', 'null', 'nan', ''] and
-                        last_name.lower() not in ['none', 'null', 'nan', '']):
-                        
-                        full_name = f"{first_name} {last_name}"
-                        employees.append(full_name)
-        
-        # If we found a full name column, use that
-        elif full_name_col is not None:
-            for row in data:
-                if len(row) > full_name_col and row[full_name_col]:
-                    name = str(row[full_name_col]).strip()
-                    if (len(name) > 2 and len(name) < 100 and 
-                        any(c.isalpha() for c in name) and 
-                        name.lower() not in ['none', 'null', 'nan', '']):
-                        employees.append(name)
-        
-        # If no obvious name columns found, check first few columns
-        elif not detected_columns:
-            # Common column name patterns that might contain employee names
-            name_patterns = ['name', 'caregiver', 'employee', 'staff']
-            
-            for i, header in enumerate(headers):
-                if header and any(pattern in header.lower() for pattern in name_patterns):
-                    full_name_col = i
-                    detected_columns.append(f"Name (Column {i+1}: {header})")
-                    break
-            
-            if full_name_col is not None:
-                for row in data:
-                    if len(row) > full_name_col and row[full_name_col]:
-                        name = str(row[full_name_col]).strip()
-                        if (len(name) > 2 and len(name) < 100 and 
-                            any(c.isalpha() for c in name) and 
-                            name.lower() not in ['none', 'null', 'nan', '']):
-                            employees.append(name)
-            else:
-                # Last resort: check first column for names
-                detected_columns.append("First Column (assumed names)")
-                for row in data:
-                    if len(row) > 0 and row[0]:
-                        potential_name = str(row[0]).strip()
-                        if (len(potential_name) > 2 and len(potential_name) < 100 and 
-                            any(c.isalpha() for c in potential_name) and
-                            potential_name.lower() not in ['none', 'null', 'nan', '']):
-                            employees.append(potential_name)
-        
-        if workbook:
-            workbook.close()
-        
-        return {
-            'success': True,
-            'employees': list(set(employees)),  # Remove duplicates
-            'total_rows': len(data),
-            'columns': headers,
-            'detected_columns': detected_columns,
-            'employees_found': len(set(employees))
-        }
-        
-    except Exception as e:
-        return {
-            'success': False,
-            'error': str(e)
-        }
+def validate_entry_award(activity_name, entries_awarded):
+    """Validation shared by single and bulk entry awards, returns an error message or None"""
+    if not activity_name:
+        return 'Activity name is required'
+    
+    if entries_awarded <= 0 or entries_awarded > 10:
+        return 'Entries must be between 1 and 10'
+    
+    return None
+
+def validate_odds_overrides(overrides):
+    """Check /api/raffle/odds overrides ({"<employee_id>": entries}), returns an error message or None"""
+    if not isinstance(overrides, dict):
+        return 'Overrides must be an object of employee id to entries'
+    
+    for employee_id, entries in overrides.items():
+        if not employee_id.strip().isdigit():
+            return f'Invalid employee id in overrides: {employee_id}'
+        if isinstance(entries, bool) or not isinstance(entries, int) or entries < 0:
+            return f'Entries for employee {employee_id} must be a non-negative integer'
+    
+    return None
 
 # Authentication routes
 @app.route('/login', methods=['GET', 'POST'])
@@ -188,9 +141,14 @@ def login():
         email = data.get('email', '').strip().lower()
         password = data.get('password', '')
         
-        success, message, user_data = AuthManager.login(
-            email, password, get_remote_address()
-        )
+        try:
+            success, message, user_data = AuthManager.login(
+                email, password, get_remote_address()
+            )
+        except PasswordHasherBusy:
+            response = jsonify({'success': False, 'message': 'Too many sign-ins at once, please try again in a moment'})
+            response.headers['Retry-After'] = '1'
+            return response, 503
         
         if success:
             token = AuthManager.generate_token(user_data)
@@ -215,13 +173,23 @@ def login():
     
     return render_template('login.html')
 
-@app.route('/logout')
+@app.route('/logout', methods=['GET', 'POST'])
 def logout():
+    # Revoke the tokens this client holds so they stop working before they expire
+    tokens = [session.get('access_token')]
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        tokens.append(auth_header[len('Bearer '):])
+    for token in filter(None, tokens):
+        AuthManager.revoke_token(token, 'logout')
+    
     # Log the logout
     if 'user_id' in session:
         db.log_audit(session['user_id'], "User logout", ip_address=get_remote_address())
     
     session.clear()
+    if request.method == 'POST':
+        return jsonify({'success': True, 'message': 'Logged out'})
     return redirect(url_for('login'))
 
 # Health check endpoint for deployment
@@ -246,50 +214,137 @@ def index():
 def dashboard():
     return render_template('dashboard.html')
 
+# Columns clients may request from /api/employees via ?fields=
+EMPLOYEE_FIELDS = (
+    'id', 'name', 'email', 'phone', 'department', 'position',
+    'hire_date', 'photo_path', 'total_entries', 'is_active',
+    'created_at', 'updated_at'
+)
+EMPLOYEES_MAX_PAGE_SIZE = 500
+
+# Largest batch accepted by /api/entries/bulk
+BULK_AWARD_MAX_ROWS = 5000
+
+# Largest number of prizes accepted by /api/raffle/draw_many
+RAFFLE_MAX_PRIZES = 100
+
+# Draws read the roster and pick winners before taking the write lock; if
+# the roster changed in the meantime the draw is made again, and the last
+# attempt holds the lock throughout so it always completes
+RAFFLE_DRAW_ATTEMPTS = 3
+
+# Monte Carlo trial budget for /api/raffle/odds
+RAFFLE_ODDS_DEFAULT_TRIALS = 200_000
+RAFFLE_ODDS_MAX_TRIALS = 1_000_000
+# Most random values one simulation may expect to generate (odds.simulation_work), ~2 s of CPU
+RAFFLE_ODDS_MAX_WORK = 100_000_000
+
+# Chunk size when writing an upload out of its buffer: a few large writes, not 16KB ones
+UPLOAD_COPY_BUFFER_SIZE = 1024 * 1024
+
 @app.route('/api/employees', methods=['GET'])
 @login_required
+@versioned_response
 def get_employees():
+    """List active employees ordered by name.
+
+    Query parameters:
+        limit    page size (1-500); omit to return every matching employee
+        after    keyset cursor "<name>,<id>" taken from the previous page's next_cursor
+        fields   comma separated columns to return (id and name are always included)
+        include  "activities" to embed each employee's 10 most recent activities
+        q        case-insensitive substring match on name
+        department  exact department match
+    """
     try:
-        print("=== Get Employees API Debug ===")
-        with db.get_connection() as conn:
-            # First check total count
-            count_cursor = conn.execute('SELECT COUNT(*) as total FROM employees')
-            total_count = count_cursor.fetchone()['total']
-            print(f"Total employees in DB: {total_count}")
-            
-            # Check active count
-            active_cursor = conn.execute('SELECT COUNT(*) as active FROM employees WHERE is_active = 1')
-            active_count = active_cursor.fetchone()['active']
-            print(f"Active employees in DB: {active_count}")
-            
-            cursor = conn.execute('''
-                SELECT id, name, email, phone, department, position, 
-                       hire_date, photo_path, total_entries, is_active,
-                       created_at, updated_at
-                FROM employees WHERE is_active = 1
-                ORDER BY name
-            ''')
-            
-            employees = []
-            for row in cursor.fetchall():
-                employee = dict(row)
-                # Get recent activities
-                activity_cursor = conn.execute('''
-                    SELECT activity_name, activity_category, entries_awarded, created_at
-                    FROM activities WHERE employee_id = ?
-                    ORDER BY created_at DESC LIMIT 10
-                ''', (employee['id'],))
+        fields = EMPLOYEE_FIELDS
+        if request.args.get('fields'):
+            requested = [f.strip() for f in request.args['fields'].split(',') if f.strip()]
+            unknown = [f for f in requested if f not in EMPLOYEE_FIELDS]
+            if unknown:
+                return jsonify({'success': False, 'error': f'Unknown fields: {", ".join(unknown)}'}), 400
+            fields = tuple(f for f in EMPLOYEE_FIELDS if f in ('id', 'name') or f in requested)
+        
+        include = {i.strip() for i in request.args.get('include', '').split(',') if i.strip()}
+        
+        limit = request.args.get('limit')
+        if limit is not None:
+            limit = int(limit)
+            if limit <= 0 or limit > EMPLOYEES_MAX_PAGE_SIZE:
+                return jsonify({'success': False, 'error': f'Limit must be between 1 and {EMPLOYEES_MAX_PAGE_SIZE}'}), 400
+        
+        conditions = ['is_active = 1']
+        params = []
+        
+        after = request.args.get('after')
+        if after:
+            # Names may contain commas, the id is always the last component
+            after_name, _, after_id = after.rpartition(',')
+            conditions.append('(name, id) > (?, ?)')
+            params.extend([after_name, int(after_id)])
+        
+        search = request.args.get('q', '').strip()
+        if search:
+            escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            conditions.append("name LIKE ? ESCAPE '\\'")
+            params.append(f'%{escaped}%')
+        
+        department = request.args.get('department', '').strip()
+        if department:
+            conditions.append('department = ?')
+            params.append(department)
+        
+        # ORDER BY name, id walks idx_employees_name (rowid is the implicit
+        # tie breaker) so the keyset condition seeks instead of scanning
+        query = f'''
+            SELECT {', '.join(fields)}
+            FROM employees WHERE {' AND '.join(conditions)}
+            ORDER BY name, id
+        '''
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit + 1)
+        
+        with db.read_connection() as conn:
+            employees = fetch_records(conn, query, params)
+            
+            next_cursor = None
+            if limit is not None and len(employees) > limit:
+                employees = employees[:limit]
+                next_cursor = f"{employees[-1]['name']},{employees[-1]['id']}"
+            
+            if 'activities' in include and employees:
+                employees_by_id = {}
+                for employee in employees:
+                    employee['activities'] = []
+                    employees_by_id[employee['id']] = employee
                 
-                employee['activities'] = [dict(activity) for activity in activity_cursor.fetchall()]
-                employees.append(employee)
-            
-            print(f"Returning {len(employees)} employees to frontend")
-            if len(employees) > 0:
-                print(f"First employee: {employees[0]['name']}")
+                # Fetch the 10 most recent activities for the whole page in
+                # one statement; the correlated rowid list is served by
+                # idx_activities_employee_created so no per-employee round trips
+                activities = iter_keyed_records(conn, '''
+                    SELECT a.employee_id, a.activity_name, a.activity_category,
+                           a.entries_awarded, a.created_at
+                    FROM json_each(?) page
+                    JOIN activities a ON a.id IN (
+                        SELECT id FROM activities
+                        WHERE employee_id = page.value
+                        ORDER BY created_at DESC LIMIT 10
+                    )
+                    ORDER BY a.created_at DESC
+                ''', (json.dumps(list(employees_by_id)),))
+                
+                for employee_id, activity in activities:
+                    employees_by_id[employee_id]['activities'].append(activity)
             
-            result = {'success': True, 'employees': employees}
-            return jsonify(result)
+            return jsonify({
+                'success': True,
+                'employees': employees,
+                'next_cursor': next_cursor
+            })
             
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid limit or cursor'}), 400
     except Exception as e:
         print(f"Error in get_employees: {e}")
         import traceback
@@ -297,7 +352,6 @@ def get_employees():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/employee', methods=['POST'])
-@login_required
 @role_required('manager')
 def add_employee():
     try:
@@ -315,19 +369,26 @@ def add_employee():
         if email and not AuthManager.validate_email(email):
             return jsonify({'success': False, 'error': 'Invalid email format'}), 400
         
+        name_normalized = normalize_name(name)
         with db.get_connection() as conn:
-            # Check if employee already exists
-            cursor = conn.execute('SELECT id FROM employees WHERE name = ? OR (email = ? AND email != "")', (name, email))
+            # Check if employee already exists (case, spacing and accents don't count)
+            cursor = conn.execute('SELECT id FROM employees WHERE name_normalized = ? OR (email = ? AND email != "")',
+                                  (name_normalized, email))
             if cursor.fetchone():
                 return jsonify({'success': False, 'error': 'Employee already exists'}), 400
             
             # Insert new employee
-            cursor = conn.execute('''
-                INSERT INTO employees (name, email, phone, department, position, hire_date)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (name, email or None, phone or None, department or None, position or None, hire_date))
+            try:
+                cursor = conn.execute('''
+                    INSERT INTO employees (name, name_normalized, email, phone, department, position, hire_date)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (name, name_normalized, email or None, phone or None, department or None, position or None, hire_date))
+            except sqlite3.IntegrityError:
+                # Added concurrently since the check above
+                return jsonify({'success': False, 'error': 'Employee already exists'}), 400
             
             employee_id = cursor.lastrowid
+            db.bump_data_version(conn)
             conn.commit()
             
             # Log the action
@@ -346,7 +407,6 @@ def add_employee():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/employee/<int:employee_id>/add_entry', methods=['POST'])
-@login_required
 @role_required('manager')
 def add_entry(employee_id):
     try:
@@ -356,16 +416,19 @@ def add_entry(employee_id):
         entries_awarded = int(data.get('entries_awarded', 1))
         notes = data.get('notes', '').strip()
         
-        if not activity_name:
-            return jsonify({'success': False, 'error': 'Activity name is required'}), 400
+        error = validate_entry_award(activity_name, entries_awarded)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
         
-        if entries_awarded <= 0 or entries_awarded > 10:
-            return jsonify({'success': False, 'error': 'Entries must be between 1 and 10'}), 400
-        
-        with db.get_connection() as conn:
-            # Check if employee exists
-            cursor = conn.execute('SELECT id, name, total_entries FROM employees WHERE id = ? AND is_active = 1', (employee_id,))
-            employee = cursor.fetchone()
+        # One BEGIN IMMEDIATE transaction: the increment happens in SQL so
+        # concurrent awards can't overwrite each other's totals, and the
+        # activity and audit rows commit (or roll back) together with it
+        with db.write_transaction() as conn:
+            employee = conn.execute('''
+                UPDATE employees SET total_entries = total_entries + ?
+                WHERE id = ? AND is_active = 1
+                RETURNING name, total_entries
+            ''', (entries_awarded, employee_id)).fetchone()
             
             if not employee:
                 return jsonify({'success': False, 'error': 'Employee not found'}), 404
@@ -378,13 +441,6 @@ def add_entry(employee_id):
             ''', (employee_id, activity_name, activity_category, entries_awarded, 
                  request.current_user['user_id'], notes))
             
-            # Update employee total entries
-            new_total = employee['total_entries'] + entries_awarded
-            conn.execute('UPDATE employees SET total_entries = ? WHERE id = ?', 
-                        (new_total, employee_id))
-            
-            conn.commit()
-            
             # Log the action
             db.log_audit(
                 request.current_user['user_id'],
@@ -396,22 +452,141 @@ def add_entry(employee_id):
                     'activity': activity_name,
                     'entries': entries_awarded
                 },
-                ip_address=get_remote_address()
+                ip_address=get_remote_address(),
+                conn=conn
             )
             
-            return jsonify({
-                'success': True, 
-                'message': f'Added {entries_awarded} entries for {activity_name}',
-                'new_total': new_total
-            })
+            db.bump_data_version(conn)
+        
+        return jsonify({
+            'success': True, 
+            'message': f'Added {entries_awarded} entries for {activity_name}',
+            'new_total': employee['total_entries']
+        })
             
     except ValueError:
         return jsonify({'success': False, 'error': 'Invalid entries value'}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/entries/bulk', methods=['POST'])
+@role_required('manager')
+def bulk_add_entries():
+    """Award entries to many employees in one transaction.
+    
+    Accepts either a JSON body ({"awards": [...]} or a bare list) or an
+    uploaded CSV file with the columns employee_id, activity_name, category,
+    entries and an optional notes column.
+    """
+    try:
+        if 'file' in request.files:
+            upload = request.files['file']
+            source = secure_filename(upload.filename or '') or 'upload.csv'
+            rows = list(csv.DictReader(io.TextIOWrapper(upload.stream, encoding='utf-8-sig')))
+        else:
+            data = request.get_json()
+            source = 'json'
+            rows = data.get('awards', []) if isinstance(data, dict) else data
+        
+        if not isinstance(rows, list) or not rows:
+            return jsonify({'success': False, 'error': 'No awards supplied'}), 400
+        
+        if len(rows) > BULK_AWARD_MAX_ROWS:
+            return jsonify({'success': False, 'error': f'At most {BULK_AWARD_MAX_ROWS} awards per request'}), 400
+        
+        results = []
+        awards = []
+        for index, row in enumerate(rows, start=1):
+            result = {'row': index, 'employee_id': None, 'success': False}
+            results.append(result)
+            try:
+                employee_id = int(row.get('employee_id'))
+                entries_awarded = int(row.get('entries', row.get('entries_awarded', 1)))
+            except (AttributeError, TypeError, ValueError):
+                result['error'] = 'Invalid employee_id or entries value'
+                continue
+            
+            activity_name = (row.get('activity_name') or '').strip()
+            activity_category = (row.get('category') or row.get('activity_category') or '').strip()
+            notes = (row.get('notes') or '').strip()
+            result['employee_id'] = employee_id
+            
+            error = validate_entry_award(activity_name, entries_awarded)
+            if error:
+                result['error'] = error
+                continue
+            
+            awards.append((result, employee_id, activity_name, activity_category, entries_awarded, notes))
+        
+        user_id = request.current_user['user_id']
+        with db.write_transaction() as conn:
+            requested_ids = sorted({award[1] for award in awards})
+            active_ids = {row['id'] for row in conn.execute('''
+                SELECT id FROM employees
+                WHERE is_active = 1 AND id IN (SELECT value FROM json_each(?))
+            ''', (json.dumps(requested_ids),))}
+            
+            applied = []
+            for award in awards:
+                if award[1] in active_ids:
+                    applied.append(award)
+                else:
+                    award[0]['error'] = 'Employee not found'
+            
+            if applied:
+                conn.executemany('''
+                    INSERT INTO activities (employee_id, activity_name, activity_category,
+                                          entries_awarded, awarded_by, notes)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', [(employee_id, activity_name, activity_category, entries_awarded, user_id, notes)
+                      for _, employee_id, activity_name, activity_category, entries_awarded, notes in applied])
+                
+                totals_by_employee = {}
+                for award in applied:
+                    totals_by_employee[award[1]] = totals_by_employee.get(award[1], 0) + award[4]
+                conn.executemany(
+                    'UPDATE employees SET total_entries = total_entries + ? WHERE id = ?',
+                    [(entries, employee_id) for employee_id, entries in totals_by_employee.items()]
+                )
+                
+                new_totals = {row['id']: row['total_entries'] for row in conn.execute('''
+                    SELECT id, total_entries FROM employees
+                    WHERE id IN (SELECT value FROM json_each(?))
+                ''', (json.dumps(list(totals_by_employee)),))}
+                for award in applied:
+                    award[0]['success'] = True
+                    award[0]['new_total'] = new_totals[award[1]]
+                
+                entries_total = sum(totals_by_employee.values())
+                db.log_audit(
+                    user_id,
+                    f"Bulk added {entries_total} raffle entries",
+                    "activities",
+                    new_values={
+                        'source': source,
+                        'awards': len(applied),
+                        'employees': len(totals_by_employee),
+                        'entries': entries_total,
+                        'rejected': len(results) - len(applied)
+                    },
+                    ip_address=get_remote_address(),
+                    conn=conn
+                )
+                
+                db.bump_data_version(conn)
+        
+        return jsonify({
+            'success': bool(applied),
+            'message': f'Applied {len(applied)} of {len(results)} awards',
+            'applied': len(applied),
+            'rejected': len(results) - len(applied),
+            'results': results
+        }), 200 if applied else 400
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/employee/<int:employee_id>', methods=['DELETE'])
-@login_required
 @role_required('admin')
 def delete_employee(employee_id):
     try:
@@ -425,6 +600,7 @@ def delete_employee(employee_id):
             
             # Soft delete - mark as inactive
             conn.execute('UPDATE employees SET is_active = 0 WHERE id = ?', (employee_id,))
+            db.bump_data_version(conn)
             conn.commit()
             
             # Log the action
@@ -446,7 +622,6 @@ def delete_employee(employee_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/employee/<int:employee_id>/reset_points', methods=['POST'])
-@login_required
 @role_required('admin')
 def reset_employee_points(employee_id):
     try:
@@ -471,6 +646,7 @@ def reset_employee_points(employee_id):
             ''', (employee_id, 'Points Reset', 'system', -old_total, 
                  request.current_user['user_id'], f'Reset from {old_total} to 0'))
             
+            db.bump_data_version(conn)
             conn.commit()
             
             # Log the action
@@ -492,12 +668,168 @@ def reset_employee_points(employee_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def run_reset_all_job(job):
+    """Background job: back up, then deactivate everyone in one transaction"""
+    backup_file = db.backup_database(
+        progress=lambda copied, total: job.progress(backup_pages=copied, backup_total_pages=total)
+    )['path']
+    job.progress(backup_file=backup_file)
+    
+    with db.write_transaction() as conn:
+        # Mark all employees as inactive instead of deleting
+        cursor = conn.execute('UPDATE employees SET is_active = 0 WHERE is_active = 1')
+        deactivated = cursor.rowcount
+        
+        # Add system activity for the reset
+        conn.execute('''
+            INSERT INTO activities (employee_id, activity_name, activity_category, 
+                                  entries_awarded, awarded_by, notes)
+            SELECT id, 'System Reset', 'system', -total_entries, ?, 'All data reset'
+            FROM employees WHERE total_entries > 0
+        ''', (job.created_by,))
+        
+        db.bump_data_version(conn)
+        
+        # Log the action
+        db.log_audit(
+            job.created_by,
+            "SYSTEM RESET - All employee data reset",
+            "system",
+            new_values={'backup_file': backup_file, 'deactivated': deactivated},
+            ip_address=job.payload.get('ip_address'),
+            conn=conn
+        )
+    
+    job.progress(deactivated=deactivated)
+    return {
+        'message': 'All employee data has been reset',
+        'backup_file': backup_file,
+        'deactivated': deactivated
+    }
+
+def run_import_excel_job(job):
+    """Background job: import employee names from one or more uploaded workbooks.
+    
+    A single sheet is streamed in this thread. Several files or sheets=all
+    parse each sheet in a process pool and merge the names. Either way the
+    de-duplicated names are inserted in one transaction at the end, so the
+    writer connection is only held for the insert, not the parsing.
+    """
+    files = job.payload['files']
+    for file in files:
+        if not os.path.exists(file['filepath']):
+            raise FileNotFoundError('Uploaded file is no longer available; please upload it again')
+    
+    if len(files) == 1 and not job.payload.get('all_sheets'):
+        started = time.perf_counter()
+        names = []
+        with EmployeeNameReader(files[0]['filepath']) as reader:
+            for batch in batched(reader, IMPORT_BATCH_SIZE):
+                names.extend(batch)
+                job.progress(rows_scanned=reader.total_rows, names_found=reader.employees_found)
+        
+        sheets = [{
+            **reader.file_info(),
+            'file': files[0]['filename'],
+            'employees_found': reader.employees_found,
+            'seconds': round(time.perf_counter() - started, 3)
+        }]
+        names_found = reader.employees_found
+    else:
+        rows_scanned = 0
+        sheets_done = 0
+        
+        def sheet_done(result):
+            nonlocal rows_scanned, sheets_done
+            rows_scanned += result['total_rows']
+            sheets_done += 1
+            job.progress(rows_scanned=rows_scanned, sheets_done=sheets_done)
+        
+        results = extract_workbooks(files, all_sheets=job.payload.get('all_sheets', False),
+                                    max_processes=app.config['IMPORT_PROCESSES'], on_sheet_done=sheet_done)
+        names = list(merge_names(results))
+        names_found = len(names)
+        job.progress(names_found=names_found)
+        
+        sheets = [{key: value for key, value in result.items() if key != 'names'} for result in results]
+    
+    with db.get_connection() as conn:
+        last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM employees').fetchone()[0]
+        # Cancellable between staged batches; a cancel rolls the whole insert back
+        added_count, skipped_count = insert_employee_batches(conn, names, progress=job.check_cancelled)
+        db.bump_data_version(conn)
+        conn.commit()
+    
+    # Flag new names that look like someone already on the roster (or each other)
+    near_duplicates = []
+    if added_count:
+        with db.read_connection() as conn:
+            near_duplicates = find_near_duplicates(conn, new_since_id=last_id)
+    
+    total_rows = sum(sheet['total_rows'] for sheet in sheets)
+    job.progress(rows_scanned=total_rows, names_found=names_found,
+                 inserted=added_count, skipped=skipped_count, possible_duplicates=len(near_duplicates))
+    print(f"Import complete: {added_count} added, {skipped_count} skipped, "
+          f"{len(near_duplicates)} possible duplicates "
+          f"({names_found} names in {total_rows} rows across {len(sheets)} sheets)")
+    
+    db.log_audit(
+        job.created_by,
+        f"Excel import: {added_count} employees added",
+        "employees",
+        new_values={
+            'filenames': [file['filename'] for file in files],
+            'sheets': len(sheets),
+            'added': added_count,
+            'skipped': skipped_count,
+            'possible_duplicates': len(near_duplicates)
+        },
+        ip_address=job.payload.get('ip_address')
+    )
+    
+    message = f'Successfully imported {added_count} new employees'
+    if near_duplicates:
+        message += f'; {len(near_duplicates)} look like existing employees, please review'
+    
+    return {
+        'message': message,
+        'total_employees_found': names_found,
+        'new_employees_added': added_count,
+        'existing_employees_skipped': skipped_count,
+        'file_info': sheets[0] if len(sheets) == 1 else {'files': len(files), 'sheets': len(sheets), 'total_rows': total_rows},
+        'sheets': sheets,
+        'possible_duplicate_count': len(near_duplicates),
+        'possible_duplicates': near_duplicates[:NEAR_DUPLICATE_REPORT_LIMIT]
+    }
+
+def remove_uploaded_file(payload):
+    for file in payload['files']:
+        if os.path.exists(file['filepath']):
+            os.remove(file['filepath'])
+
+jobs.register('reset_all', run_reset_all_job)
+jobs.register('import_excel', run_import_excel_job, cleanup=remove_uploaded_file)
+# Start the dispatcher once handlers exist so jobs left by a previous process
+# resume; sheet-parsing workers must never claim jobs themselves
+if SERVING_PROCESS:
+    jobs.start()
+
+def job_accepted(job_id):
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': JOB_QUEUED,
+        'status_url': url_for('get_job', job_id=job_id)
+    }), 202
+
 @app.route('/api/reset_all', methods=['POST'])
-@login_required
 @role_required('admin')
 @limiter.limit("1 per hour")
 def reset_all_data():
-    """DANGEROUS: Reset all employee data - requires admin role and is rate limited"""
+    """DANGEROUS: Reset all employee data - requires admin role and is rate limited.
+    
+    Runs as a background job; poll /api/jobs/<job_id> for the outcome.
+    """
     try:
         data = request.get_json()
         confirmation = data.get('confirmation', '')
@@ -505,251 +837,431 @@ def reset_all_data():
         if confirmation != 'RESET_ALL_DATA':
             return jsonify({'success': False, 'error': 'Invalid confirmation'}), 400
         
-        with db.get_connection() as conn:
-            # Create backup before reset
-            backup_file = db.backup_database()
-            
-            # Mark all employees as inactive instead of deleting
-            conn.execute('UPDATE employees SET is_active = 0')
-            
-            # Add system activity for the reset
-            conn.execute('''
-                INSERT INTO activities (employee_id, activity_name, activity_category, 
-                                      entries_awarded, awarded_by, notes)
-                SELECT id, 'System Reset', 'system', -total_entries, ?, 'All data reset'
-                FROM employees WHERE total_entries > 0
-            ''', (request.current_user['user_id'],))
-            
-            conn.commit()
-            
-            # Log the action
-            db.log_audit(
-                request.current_user['user_id'],
-                "SYSTEM RESET - All employee data reset",
-                "system",
-                notes=f"Backup created: {backup_file}",
-                ip_address=get_remote_address()
-            )
-            
-            return jsonify({
-                'success': True, 
-                'message': 'All employee data has been reset',
-                'backup_file': backup_file
-            })
+        job_id = jobs.enqueue('reset_all', {'ip_address': get_remote_address()},
+                              created_by=request.current_user['user_id'])
+        return job_accepted(job_id)
             
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    """Bodies over MAX_CONTENT_LENGTH are cut off while streaming, before they are buffered"""
+    return jsonify({'success': False, 'error': 'File too large'}), 413
+
 @app.route('/api/import_excel', methods=['POST'])
-@login_required
 @role_required('manager')
 @limiter.limit("5 per hour")
 def import_excel():
-    import traceback
-    filepath = None
+    """Queue an Excel import; poll /api/jobs/<job_id> for progress and results.
+    
+    Accepts one or more workbooks (repeat the 'file' field, up to
+    MAX_IMPORT_FILES). sheets=all imports every sheet of every workbook
+    instead of just the active one.
+    
+    Uploads are never copied in memory: each is size-checked and validated
+    in its spooled buffer, then written once to UPLOAD_PATH for the job.
+    """
+    saved_paths = []
     
     try:
-        print("=== Excel Import Debug ===")
-        print(f"Request method: {request.method}")
-        print(f"Content type: {request.content_type}")
-        print(f"Files in request: {list(request.files.keys())}")
-        
-        if 'file' not in request.files:
-            print("ERROR: No file in request")
+        uploads = request.files.getlist('file') + request.files.getlist('files')
+        if not uploads:
             return jsonify({'success': False, 'error': 'No file uploaded'}), 400
         
-        file = request.files['file']
-        print(f"File object: {file}")
-        print(f"Filename: {file.filename}")
+        if len(uploads) > app.config['MAX_IMPORT_FILES']:
+            return jsonify({'success': False, 'error': f"At most {app.config['MAX_IMPORT_FILES']} files per import"}), 400
         
-        if file.filename == '':
-            print("ERROR: Empty filename")
-            return jsonify({'success': False, 'error': 'No file selected'}), 400
+        all_sheets = request.form.get('sheets', 'active') == 'all'
         
-        if not allowed_file(file.filename):
-            print(f"ERROR: File type not allowed: {file.filename}")
-            return jsonify({'success': False, 'error': 'Invalid file type. Please upload .xlsx or .xls files only'}), 400
+        for file in uploads:
+            if file.filename == '':
+                return jsonify({'success': False, 'error': 'No file selected'}), 400
+            
+            if not allowed_file(file.filename):
+                return jsonify({'success': False, 'error': f'Invalid file type: {file.filename}. Please upload .xlsx or .xls files only'}), 400
+            
+            # Check file size without copying the buffer
+            file.stream.seek(0, os.SEEK_END)
+            file_size = file.stream.tell()
+            file.stream.seek(0)
+            if file_size > app.config['MAX_FILE_SIZE']:
+                return jsonify({'success': False, 'error': f'File too large: {file.filename}'}), 400
+            
+            # .xlsx is a zip container; reject anything else before queueing
+            if not zipfile.is_zipfile(file.stream):
+                return jsonify({'success': False, 'error': f'Failed to process Excel file {file.filename}: File is not a zip file'}), 400
+            file.stream.seek(0)
         
-        # Check file size
-        file_content = file.read()
-        print(f"File size: {len(file_content)} bytes")
-        if len(file_content) > app.config['MAX_FILE_SIZE']:
-            print(f"ERROR: File too large: {len(file_content)} > {app.config['MAX_FILE_SIZE']}")
-            return jsonify({'success': False, 'error': 'File too large'}), 400
-        file.seek(0)  # Reset file pointer
-        
-        # Save uploaded file securely
-        filename = secure_filename(file.filename)
+        # The job may run in another worker process or after a restart, so it
+        # gets files of its own; the job removes them once it has finished
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        safe_filename = f"{timestamp}_{filename}"
-        
-        # Make sure upload directory exists
         upload_dir = app.config['UPLOAD_PATH']
-        print(f"Upload directory: {upload_dir}")
-        if not os.path.exists(upload_dir):
-            print(f"Creating upload directory: {upload_dir}")
-            os.makedirs(upload_dir, exist_ok=True)
+        os.makedirs(upload_dir, exist_ok=True)
+        files = []
+        for file in uploads:
+            filename = secure_filename(file.filename)
+            filepath = os.path.abspath(os.path.join(upload_dir, f"{timestamp}_{secrets.token_hex(4)}_{filename}"))
+            file.save(filepath, buffer_size=UPLOAD_COPY_BUFFER_SIZE)
+            saved_paths.append(filepath)
+            files.append({'filepath': filepath, 'filename': filename})
         
-        filepath = os.path.join(upload_dir, safe_filename)
-        print(f"Saving file to: {filepath}")
-        file.save(filepath)
-        print(f"File saved successfully, size: {os.path.getsize(filepath)} bytes")
-        
-        try:
-            # Process the Excel file
-            print("Processing Excel file...")
-            result = process_excel_file(filepath)
-            print(f"Excel processing result: {result}")
-            
-            if not result['success']:
-                print(f"Excel processing failed: {result.get('error', 'Unknown error')}")
-                return jsonify({'success': False, 'error': f'Failed to process Excel file: {result["error"]}'}), 400
-            
-            print(f"Found {len(result['employees'])} employees")
-            
-            # Import employees to database
-            added_count = 0
-            skipped_count = 0
-            
-            print("Connecting to database...")
-            if db_manager is None:
-                print("ERROR: Database manager is None")
-                return jsonify({'success': False, 'error': 'Database not available'}), 500
-                
-            with db.get_connection() as conn:
-                print("Database connection established")
-                for i, employee_name in enumerate(result['employees']):
-                    print(f"Processing employee {i+1}/{len(result['employees'])}: {employee_name}")
-                    
-                    # Check if employee already exists
-                    cursor = conn.execute('SELECT id FROM employees WHERE name = ?', (employee_name,))
-                    if cursor.fetchone():
-                        print(f"  Employee already exists: {employee_name}")
-                        skipped_count += 1
-                        continue
-                    
-                    # Insert new employee
-                    print(f"  Adding new employee: {employee_name}")
-                    conn.execute('''
-                        INSERT INTO employees (name, total_entries)
-                        VALUES (?, ?)
-                    ''', (employee_name, 0))
-                    added_count += 1
-                
-                print(f"Committing database changes...")
-                conn.commit()
-                print(f"Database commit successful")
-            
-            print(f"Import complete: {added_count} added, {skipped_count} skipped")
-            
-            # Log the import
-            try:
-                print("Logging audit entry...")
-                db.log_audit(
-                    session.get('user_id'),
-                    f"Excel import: {added_count} employees added",
-                    "employees",
-                    new_values={
-                        'filename': filename,
-                        'added': added_count,
-                        'skipped': skipped_count
-                    },
-                    ip_address=get_remote_address()
-                )
-                print("Audit log entry created")
-            except Exception as audit_error:
-                print(f"Audit logging failed (non-critical): {audit_error}")
-            
-            return jsonify({
-                'success': True,
-                'message': f'Successfully imported {added_count} new employees',
-                'total_employees_found': len(result['employees']),
-                'new_employees_added': added_count,
-                'existing_employees_skipped': skipped_count,
-                'file_info': {
-                    'total_rows': result.get('total_rows', 0),
-                    'columns': result.get('columns', []),
-                    'detected_columns': result.get('detected_columns', [])
-                }
-            })
-            
-        finally:
-            # Clean up uploaded file
-            if filepath and os.path.exists(filepath):
-                print(f"Cleaning up file: {filepath}")
-                try:
-                    os.remove(filepath)
-                    print("File cleanup successful")
-                except Exception as cleanup_error:
-                    print(f"File cleanup failed: {cleanup_error}")
+        job_id = jobs.enqueue('import_excel', {
+            'files': files,
+            'all_sheets': all_sheets,
+            'ip_address': get_remote_address()
+        }, created_by=request.current_user['user_id'])
+        print(f"Queued Excel import job {job_id} for {', '.join(f['filename'] for f in files)}")
+        return job_accepted(job_id)
         
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         error_msg = f'An error occurred: {str(e)}'
         print(f"ERROR: {error_msg}")
-        print("Traceback:")
-        traceback.print_exc()
         
-        # Clean up file on error
-        if filepath and os.path.exists(filepath):
+        # Clean up files on error
+        for filepath in saved_paths:
             try:
                 os.remove(filepath)
-                print("Error cleanup: File removed")
-            except:
-                print("Error cleanup: Failed to remove file")
+            except OSError:
+                pass
         
         return jsonify({'success': False, 'error': error_msg}), 500
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_job(job_id):
+    """Status, progress counters and result of a background job"""
+    job = jobs.get(job_id)
+    user = request.current_user
+    if job is None or (job['created_by'] != user['user_id'] and user['role'] != 'admin'):
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    # The payload holds server-side paths; only expose what the client sent
+    job.pop('payload', None)
+    job.pop('worker_pid', None)
+    return jsonify({'success': True, 'job': job})
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+@login_required
+def cancel_job(job_id):
+    """Cancel a queued job, or ask a running one to stop and roll back"""
+    job = jobs.get(job_id)
+    user = request.current_user
+    if job is None or (job['created_by'] != user['user_id'] and user['role'] != 'admin'):
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    status = jobs.cancel(job_id)
+    if status in FINISHED_STATES and status != JOB_CANCELLED:
+        return jsonify({'success': False, 'error': f'Job already {status}'}), 409
+    
+    return jsonify({
+        'success': True,
+        'status': status,
+        'message': 'Job cancelled' if status == JOB_CANCELLED else 'Cancellation requested'
+    })
+
 # New professional endpoints
 @app.route('/api/raffle/conduct', methods=['POST'])
-@login_required
 @role_required('manager')
 def conduct_raffle():
-    """Conduct a raffle and record the winner"""
+    """Preview a raffle: eligible totals and the leading participants' chances.
+    
+    The winner is drawn and recorded server-side by POST /api/raffle/draw
+    (or /api/raffle/draw_many); the full roster is never sent to the client.
+    """
     try:
-        data = request.get_json()
-        prize = data.get('prize', 'Quarterly Prize')
-        
-        with db.get_connection() as conn:
-            # Get all eligible employees (with entries > 0)
-            cursor = conn.execute('''
-                SELECT id, name, total_entries 
-                FROM employees 
+        with db.read_transaction() as conn:
+            # Both queries are answered from idx_employees_leaderboard
+            total_participants, total_entries = conn.execute('''
+                SELECT COUNT(*), COALESCE(SUM(total_entries), 0)
+                FROM employees
                 WHERE is_active = 1 AND total_entries > 0
-                ORDER BY name
-            ''')
+            ''').fetchone()
             
-            eligible_employees = cursor.fetchall()
-            
-            if not eligible_employees:
+            if not total_participants:
                 return jsonify({'success': False, 'error': 'No eligible employees found'}), 400
             
-            # Calculate total entries and chances
-            total_entries = sum(emp['total_entries'] for emp in eligible_employees)
-            participants = []
-            
-            for emp in eligible_employees:
-                chance = (emp['total_entries'] / total_entries) * 100
-                participants.append({
-                    'id': emp['id'],
-                    'name': emp['name'],
-                    'entries': emp['total_entries'],
-                    'chance': round(chance, 2)
-                })
-            
-            # For now, return the data for client-side selection
-            # In a real implementation, you might want to do server-side selection
-            return jsonify({
-                'success': True,
-                'participants': participants,
-                'total_entries': total_entries,
-                'total_participants': len(participants)
-            })
+            leaders = fetch_records(conn, '''
+                SELECT id, name, total_entries AS entries
+                FROM employees
+                WHERE is_active = 1 AND total_entries > 0
+                ORDER BY total_entries DESC
+                LIMIT ?
+            ''', (LEADERBOARD_SIZE,))
+        
+        for participant in leaders:
+            participant['chance'] = round(participant['entries'] / total_entries * 100, 2)
+        
+        return jsonify({
+            'success': True,
+            'leaders': leaders,
+            'total_entries': total_entries,
+            'total_participants': total_participants,
+            'draw_url': url_for('draw_raffle')
+        })
             
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/raffle/record_winner', methods=['POST'])
+def record_draw(conn, participants, winners, prizes, seed, snapshot, user_id):
+    """Store a server-side draw and one raffle_history row per prize.
+    
+    Runs inside the caller's write transaction; returns (draw_id, results)
+    where results lists the prize assignments in draw order.
+    """
+    total_entries = sum(p['total_entries'] for p in participants)
+    
+    cursor = conn.execute('''
+        INSERT INTO raffle_draws
+        (algorithm, seed, participants_snapshot, snapshot_sha256,
+         total_participants, total_entries, prize_count, conducted_by)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (DRAW_ALGORITHM, seed, snapshot, snapshot_digest(snapshot),
+         len(participants), total_entries, len(winners), user_id))
+    draw_id = cursor.lastrowid
+    
+    results = []
+    for position, (winner, prize) in enumerate(zip(winners, prizes), start=1):
+        # Chance of this winner being drawn first, matching /api/raffle/conduct
+        winning_chance = round(winner['total_entries'] / total_entries * 100, 2)
+        cursor = conn.execute('''
+            INSERT INTO raffle_history 
+            (winner_id, prize, total_participants, total_entries, winning_chance, conducted_by, draw_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (winner['id'], prize, len(participants), total_entries, winning_chance, user_id, draw_id))
+        results.append({
+            'position': position,
+            'prize': prize,
+            'raffle_id': cursor.lastrowid,
+            'winner': {
+                'id': winner['id'],
+                'name': winner['name'],
+                'entries': winner['total_entries'],
+                'chance': winning_chance
+            }
+        })
+    
+    db.bump_data_version(conn)
+    db.log_audit(
+        user_id,
+        f"Conducted raffle - Winner: {winners[0]['name']}" if len(winners) == 1
+        else f"Conducted raffle - {len(winners)} winners drawn",
+        "raffle_draws",
+        draw_id,
+        new_values={
+            'winners': [{'prize': r['prize'], 'winner': r['winner']['name']} for r in results],
+            'participants': len(participants),
+            'seed': seed
+        },
+        ip_address=get_remote_address(),
+        conn=conn
+    )
+    
+    return draw_id, results
+
+def conduct_draw(prizes, user_id):
+    """Draw one winner per prize and record the draw.
+    
+    Loading the roster, building the sampler and serializing and hashing
+    the snapshot happen under a read snapshot, before the write lock; the
+    write transaction only checks that the data version hasn't moved and
+    INSERTs. Returns (participants, draw_id, results, seed), with draw_id
+    None when there are fewer eligible employees than prizes.
+    """
+    for _ in range(RAFFLE_DRAW_ATTEMPTS - 1):
+        with db.read_transaction() as conn:
+            version = db.get_data_version(conn)
+            participants = load_participants(conn)
+        if len(participants) < len(prizes):
+            return participants, None, None, None
+        
+        winners, seed = draw_many(participants, len(prizes))
+        snapshot = snapshot_participants(participants)
+        
+        with db.write_transaction() as conn:
+            # Otherwise entries were awarded or another draw recorded since the read; draw again
+            if db.get_data_version(conn) == version:
+                draw_id, results = record_draw(conn, participants, winners, prizes, seed, snapshot, user_id)
+                return participants, draw_id, results, seed
+    
+    # The roster kept changing underneath: draw while holding the lock so this attempt completes
+    with db.write_transaction() as conn:
+        participants = load_participants(conn)
+        if len(participants) < len(prizes):
+            return participants, None, None, None
+        winners, seed = draw_many(participants, len(prizes))
+        draw_id, results = record_draw(conn, participants, winners, prizes, seed,
+                                       snapshot_participants(participants), user_id)
+        return participants, draw_id, results, seed
+
+@app.route('/api/raffle/draw', methods=['POST'])
+@role_required('manager')
+def draw_raffle():
+    """Draw a winner server-side, weighted by entries, and record it"""
+    try:
+        data = request.get_json(silent=True) or {}
+        prize = data.get('prize', 'Quarterly Prize')
+        
+        participants, draw_id, results, seed = conduct_draw([prize], request.current_user['user_id'])
+        if draw_id is None:
+            return jsonify({'success': False, 'error': 'No eligible employees found'}), 400
+        winner = results[0]['winner']
+        
+        return jsonify({
+            'success': True,
+            'message': f'Raffle completed! Winner: {winner["name"]}',
+            'raffle_id': results[0]['raffle_id'],
+            'draw_id': draw_id,
+            'winner': winner,
+            'total_participants': len(participants),
+            'total_entries': sum(p['total_entries'] for p in participants),
+            'seed': seed
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/raffle/draw_many', methods=['POST'])
+@role_required('manager')
+def draw_raffle_many():
+    """Draw distinct winners for several prizes in one recorded draw.
+    
+    Body: {"prizes": ["First prize", "Second prize", ...]} or
+    {"count": 15, "prize": "Quarterly Prize"}. Prizes are assigned in the
+    order the winners are drawn.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        prizes = data.get('prizes')
+        if prizes is None:
+            prizes = [data.get('prize', 'Quarterly Prize')] * int(data.get('count', 1))
+        
+        if not isinstance(prizes, list) or not prizes:
+            return jsonify({'success': False, 'error': 'At least one prize is required'}), 400
+        
+        if len(prizes) > RAFFLE_MAX_PRIZES:
+            return jsonify({'success': False, 'error': f'At most {RAFFLE_MAX_PRIZES} prizes per draw'}), 400
+        
+        participants, draw_id, results, seed = conduct_draw(prizes, request.current_user['user_id'])
+        if draw_id is None:
+            return jsonify({
+                'success': False,
+                'error': f'{len(prizes)} prizes but only {len(participants)} eligible employees'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'message': f'Drew {len(results)} winners',
+            'draw_id': draw_id,
+            'results': results,
+            'total_participants': len(participants),
+            'total_entries': sum(p['total_entries'] for p in participants),
+            'seed': seed
+        })
+        
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid prize count'}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/raffle/odds', methods=['POST'])
 @login_required
+def raffle_odds():
+    """Monte Carlo odds of winning at least one of several prizes.
+    
+    Body: {"prizes": 15, "trials": 200000, "overrides": {"<employee_id>": entries}}
+    where overrides is an optional what-if adjustment of current entries.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({'success': False, 'error': 'Expected a JSON object'}), 400
+        prizes = int(data.get('prizes', 1))
+        trials = int(data.get('trials', RAFFLE_ODDS_DEFAULT_TRIALS))
+        
+        if prizes <= 0 or prizes > RAFFLE_MAX_PRIZES:
+            return jsonify({'success': False, 'error': f'Prizes must be between 1 and {RAFFLE_MAX_PRIZES}'}), 400
+        
+        if trials <= 0 or trials > RAFFLE_ODDS_MAX_TRIALS:
+            return jsonify({'success': False, 'error': f'Trials must be between 1 and {RAFFLE_ODDS_MAX_TRIALS}'}), 400
+        
+        overrides = data.get('overrides')
+        if overrides is not None:
+            error = validate_odds_overrides(overrides)
+            if error:
+                return jsonify({'success': False, 'error': error}), 400
+        
+        with db.read_connection() as conn:
+            participants = load_participants(conn)
+        
+        if overrides:
+            participants = apply_overrides(participants, overrides)
+        
+        if len(participants) < prizes:
+            return jsonify({
+                'success': False,
+                'error': f'{prizes} prizes but only {len(participants)} eligible employees'
+            }), 400
+        
+        # Skewed entries make multi-prize trials costlier; refuse what would tie up the worker
+        work = simulation_work([p['total_entries'] for p in participants], prizes, trials)
+        if work > RAFFLE_ODDS_MAX_WORK:
+            return jsonify({
+                'success': False,
+                'error': f'Too many trials for this roster, at most {trials * RAFFLE_ODDS_MAX_WORK // work} '
+                         f'for {prizes} prizes'
+            }), 400
+        
+        result = simulate_odds(participants, prizes, trials)
+        return jsonify({'success': True, **result})
+        
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': f'Invalid simulation parameters: {e}'}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/raffle/<int:raffle_id>/replay', methods=['GET'])
+@role_required('manager')
+def replay_raffle(raffle_id):
+    """Re-run a recorded server-side draw from its seed and snapshot"""
+    try:
+        with db.read_connection() as conn:
+            draw = conn.execute('''
+                SELECT d.id, d.algorithm, d.seed, d.participants_snapshot, d.snapshot_sha256, d.prize_count
+                FROM raffle_history h
+                JOIN raffle_draws d ON d.id = h.draw_id
+                WHERE h.id = ?
+            ''', (raffle_id,)).fetchone()
+            
+            if not draw:
+                return jsonify({'success': False, 'error': 'No server-side draw recorded for this raffle'}), 404
+            
+            recorded_winner_ids = [row['winner_id'] for row in conn.execute(
+                'SELECT winner_id FROM raffle_history WHERE draw_id = ? ORDER BY id', (draw['id'],)
+            )]
+        
+        if draw['algorithm'] != DRAW_ALGORITHM:
+            return jsonify({'success': False, 'error': f'Unsupported draw algorithm {draw["algorithm"]}'}), 400
+        
+        snapshot_intact = snapshot_digest(draw['participants_snapshot']) == draw['snapshot_sha256']
+        replayed_winner_ids = replay_draw(draw['participants_snapshot'], draw['seed'], draw['prize_count'])
+        
+        return jsonify({
+            'success': True,
+            'verified': snapshot_intact and replayed_winner_ids == recorded_winner_ids,
+            'snapshot_intact': snapshot_intact,
+            'draw_id': draw['id'],
+            'recorded_winner_ids': recorded_winner_ids,
+            'replayed_winner_ids': replayed_winner_ids,
+            'seed': draw['seed']
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/raffle/record_winner', methods=['POST'])
 @role_required('manager')
 def record_raffle_winner():
     """Record the winner of a raffle"""
@@ -781,6 +1293,7 @@ def record_raffle_winner():
                  request.current_user['user_id']))
             
             raffle_id = cursor.lastrowid
+            db.bump_data_version(conn)
             conn.commit()
             
             # Log the raffle
@@ -809,57 +1322,34 @@ def record_raffle_winner():
 
 @app.route('/api/analytics/dashboard', methods=['GET'])
 @login_required
+@versioned_response
 def analytics_dashboard():
     """Get analytics data for dashboard"""
     try:
-        with db.get_connection() as conn:
-            # Total employees
-            cursor = conn.execute('SELECT COUNT(*) as total FROM employees WHERE is_active = 1')
-            total_employees = cursor.fetchone()['total']
-            
-            # Total entries
-            cursor = conn.execute('SELECT SUM(total_entries) as total FROM employees WHERE is_active = 1')
-            total_entries = cursor.fetchone()['total'] or 0
+        with db.read_connection() as conn:
+            # Totals, leaderboard and departments come from the materialized aggregates
+            aggregates = read_dashboard_aggregates(conn)
             
-            # Recent activities
-            cursor = conn.execute('''
+            # Recent activities; CROSS JOIN pins activities as the outer loop so
+            # SQLite walks idx_activities_date newest-first and stops after 10
+            recent_activities = fetch_records(conn, '''
                 SELECT a.activity_name, a.entries_awarded, a.created_at, e.name as employee_name
                 FROM activities a
-                JOIN employees e ON a.employee_id = e.id
+                CROSS JOIN employees e ON a.employee_id = e.id
                 WHERE e.is_active = 1
                 ORDER BY a.created_at DESC
                 LIMIT 10
             ''')
-            recent_activities = [dict(row) for row in cursor.fetchall()]
-            
-            # Top performers
-            cursor = conn.execute('''
-                SELECT name, total_entries, department
-                FROM employees 
-                WHERE is_active = 1 AND total_entries > 0
-                ORDER BY total_entries DESC
-                LIMIT 10
-            ''')
-            top_performers = [dict(row) for row in cursor.fetchall()]
-            
-            # Department breakdown
-            cursor = conn.execute('''
-                SELECT department, COUNT(*) as employee_count, SUM(total_entries) as total_entries
-                FROM employees 
-                WHERE is_active = 1 AND department IS NOT NULL
-                GROUP BY department
-                ORDER BY total_entries DESC
-            ''')
-            department_stats = [dict(row) for row in cursor.fetchall()]
             
             return jsonify({
                 'success': True,
                 'analytics': {
-                    'total_employees': total_employees,
-                    'total_entries': total_entries,
+                    'total_employees': aggregates['total_employees'],
+                    'total_entries': aggregates['total_entries'],
+                    'eligible_employees': aggregates['eligible_employees'],
                     'recent_activities': recent_activities,
-                    'top_performers': top_performers,
-                    'department_stats': department_stats
+                    'top_performers': aggregates['top_performers'],
+                    'department_stats': aggregates['department_stats']
                 }
             })
             
@@ -867,30 +1357,54 @@ def analytics_dashboard():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/backup', methods=['POST'])
-@login_required
 @role_required('admin')
 def create_backup():
     """Create a database backup"""
     try:
-        backup_file = db.backup_database()
+        backup = db.backup_database()
         
         # Log the backup
         db.log_audit(
             request.current_user['user_id'],
             "Database backup created",
-            notes=f"Backup file: {backup_file}",
+            new_values={'backup_file': backup['path'], 'bytes': backup['bytes'],
+                        'compression': backup['compression'], 'integrity': backup['integrity']},
             ip_address=get_remote_address()
         )
         
         return jsonify({
             'success': True,
             'message': 'Backup created successfully',
-            'backup_file': os.path.basename(backup_file)
+            'backup_file': os.path.basename(backup['path']),
+            'bytes': backup['bytes'],
+            'database_bytes': backup['database_bytes'],
+            'compression': backup['compression'],
+            'integrity': backup['integrity'],
+            'seconds': backup['seconds'],
+            'pruned': len(backup['pruned'])
         })
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/metrics', methods=['GET'])
+@role_required('admin')
+def metrics():
+    """Runtime metrics for the background subsystems of this worker process"""
+    return jsonify({
+        'success': True,
+        'pid': os.getpid(),
+        'metrics': {
+            'audit_log': db.audit_writer.metrics(),
+            'password_hasher': password_hasher.metrics(),
+            'token_revocations': revocations.metrics(),
+            'db_pool': {
+                'read': db.read_pool.metrics(),
+                'write': db.write_pool.metrics()
+            }
+        }
+    })
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('NODE_ENV', 'development') == 'development'
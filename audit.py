@@ -0,0 +1,215 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Tuple
+
+AUDIT_INSERT_SQL = '''
+    INSERT INTO audit_log
+    (user_id, action, table_name, record_id, old_values, new_values, ip_address, user_agent, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Queue marker asking the writer thread to exit after draining
+_STOP = object()
+
+logger = logging.getLogger(__name__)
+
+class AuditLogWriter:
+    """Batched audit-log writer backed by a bounded queue and a background thread.
+
+    Rows are inserted with executemany and a single commit per batch, so the
+    request that produced them never pays for the audit commit. A full queue
+    blocks the caller instead of dropping rows. In synchronous mode every row
+    is written and committed immediately (used by tests and scripts).
+
+    A batch that fails to commit (the database busy past its timeout, a full
+    disk) is retried up to `retries` times, waiting retry_delay, then twice
+    as long each time up to MAX_RETRY_DELAY. Only then are its rows given up,
+    and they are logged in full so the trail can be restored by hand.
+    """
+
+    MAX_RETRY_DELAY = 5.0
+
+    def __init__(self, db_path: str, batch_size: int = 100, flush_interval: float = 0.5,
+                 max_queue: int = 10000, synchronous: bool = False, retries: int = 5,
+                 retry_delay: float = 0.1):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.synchronous = synchronous
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._connection = None
+        self._thread = None
+        self._pid = None
+        self._stats = {
+            'queued_total': 0,
+            'written_total': 0,
+            'blocked_puts': 0,
+            'flushes': 0,
+            'retried_flushes': 0,
+            'failed_flushes': 0,
+            'dropped_rows': 0,
+            'total_flush_ms': 0.0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0
+        }
+        atexit.register(self.close)
+
+    def write(self, row: Tuple):
+        """Queue an audit row: (user_id, action, table_name, record_id,
+        old_values_json, new_values_json, ip_address, user_agent)"""
+        # Stamp the row now so a delayed flush doesn't skew the audit trail
+        row = row + (datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),)
+
+        if self.synchronous:
+            self._flush([row])
+            return
+
+        self._ensure_started()
+        with self._lock:
+            self._stats['queued_total'] += 1
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self._stats['blocked_puts'] += 1
+            self._queue.put(row)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Block until every queued row has been written, returns False on timeout"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self):
+        """Flush outstanding rows and stop the writer thread"""
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            self._queue.put(_STOP)
+            thread.join(timeout=30)
+        self._thread = None
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        total_flush_ms = stats.pop('total_flush_ms')
+        stats['avg_flush_ms'] = round(total_flush_ms / stats['flushes'], 3) if stats['flushes'] else 0.0
+        stats['queue_depth'] = self._queue.qsize()
+        stats['synchronous'] = self.synchronous
+        return stats
+
+    def _ensure_started(self):
+        # Gunicorn forks workers after import; each process needs its own thread
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._connection = None
+            self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                items = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+
+            # Gather up to batch_size rows, waiting at most flush_interval
+            deadline = time.monotonic() + self.flush_interval
+            while len(items) < self.batch_size and items[-1] is not _STOP:
+                remaining = deadline - time.monotonic()
+                try:
+                    items.append(self._queue.get(timeout=remaining) if remaining > 0
+                                 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stopping = any(item is _STOP for item in items)
+            if stopping:
+                # Drain whatever is left so shutdown never loses rows
+                while True:
+                    try:
+                        items.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+            try:
+                batch = [item for item in items if item is not _STOP]
+                if batch:
+                    self._flush(batch)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+            if stopping:
+                return
+
+    def _flush(self, batch):
+        started = time.perf_counter()
+        delay = self.retry_delay
+        attempt = 0
+        while True:
+            try:
+                self._insert(batch)
+                break
+            except Exception as e:
+                if attempt >= self.retries:
+                    with self._lock:
+                        self._stats['failed_flushes'] += 1
+                        self._stats['dropped_rows'] += len(batch)
+                    logger.error("Audit log flush failed after %d attempts, dropping %d rows: %s\n%s",
+                                 attempt + 1, len(batch), e,
+                                 '\n'.join(json.dumps(row, default=str) for row in batch))
+                    return
+                attempt += 1
+                with self._lock:
+                    self._stats['retried_flushes'] += 1
+                logger.warning("Audit log flush of %d rows failed (%s), retry %d of %d in %.2f s",
+                               len(batch), e, attempt, self.retries, delay)
+                time.sleep(delay)
+                delay = min(delay * 2, self.MAX_RETRY_DELAY)
+
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._stats['flushes'] += 1
+            self._stats['written_total'] += len(batch)
+            self._stats['total_flush_ms'] += elapsed
+            self._stats['last_flush_ms'] = round(elapsed, 3)
+            self._stats['max_flush_ms'] = round(max(self._stats['max_flush_ms'], elapsed), 3)
+
+    def _insert(self, batch):
+        with self._db_lock:
+            if self._connection is None:
+                self._connection = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30.0)
+            try:
+                self._connection.executemany(AUDIT_INSERT_SQL, batch)
+                self._connection.commit()
+            except Exception:
+                # Start the retry from a clean slate: no half-inserted batch,
+                # and a fresh connection in case this one is broken
+                try:
+                    self._connection.rollback()
+                    self._connection.close()
+                except sqlite3.Error:
+                    pass
+                self._connection = None
+                raise
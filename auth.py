@@ -1,25 +1,185 @@
 import bcrypt
+import hashlib
 import jwt
+import os
 import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from functools import wraps
 from typing import Dict, Optional, Tuple
 from flask import request, jsonify, session, current_app
 from database import db
 from config import Config
+from revocation import RevocationList
+
+# Role hierarchy: a role passes role_required for its own level and below
+ROLE_LEVELS = {'viewer': 1, 'manager': 2, 'admin': 3}
+
+class TokenCache:
+    """Bounded LRU of verified JWT claims keyed by a digest of the token.
+    
+    Saves repeating the signature check and claim parsing for a token that
+    was already verified. An entry is served only until the token's exp,
+    and the whole cache is dropped when JWT_SECRET changes, so it never
+    accepts a token jwt.decode would reject.
+    """
+    
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # token digest -> (claims, exp)
+        self._secret = None
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def key_for(token: str) -> bytes:
+        return hashlib.sha256(token.encode('utf-8')).digest()
+    
+    def get(self, token: str, secret: str) -> Optional[Dict]:
+        key = self.key_for(token)
+        with self._lock:
+            if secret != self._secret:
+                self._entries.clear()
+                self._secret = secret
+                return None
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            claims, expires = entry
+            if expires <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return dict(claims)
+    
+    def set(self, token: str, secret: str, claims: Dict):
+        expires = claims.get('exp')
+        # Tokens without an expiry are verified every time
+        if not isinstance(expires, (int, float)):
+            return
+        key = self.key_for(token)
+        with self._lock:
+            if secret != self._secret:
+                self._entries.clear()
+                self._secret = secret
+            self._entries[key] = (dict(claims), expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def discard(self, token: str):
+        with self._lock:
+            self._entries.pop(self.key_for(token), None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+
+token_cache = TokenCache(Config.TOKEN_CACHE_SIZE)
+
+# Revoked token ids and users, checked on every request whether or not the token is cached
+revocations = RevocationList(db, refresh_interval=Config.TOKEN_REVOCATION_REFRESH_INTERVAL)
+
+class PasswordHasherBusy(Exception):
+    """Too many password hashes are already queued; answer 503 and let the client retry"""
+
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated thread pool.
+    
+    bcrypt releases the GIL, so a request thread waiting on a hash does
+    not stall the rest of the worker, and no more than `workers` hashes
+    compete for the CPU however many logins arrive at once. When
+    `queue_limit` hashes are queued or running, new ones are refused with
+    PasswordHasherBusy instead of waiting behind them. New hashes use
+    `rounds` as the bcrypt cost.
+    """
+    
+    def __init__(self, workers: int = 2, queue_limit: int = 32, rounds: int = 12):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.rounds = rounds
+        self._executor = None
+        self._pid = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._stats = {'completed': 0, 'rejected': 0, 'total_ms': 0.0}
+    
+    def hash(self, password: str) -> str:
+        return self._run(self._hash, password)
+    
+    def verify(self, password: str, password_hash: str) -> bool:
+        return self._run(self._verify, password, password_hash)
+    
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True if the hash was made with a different cost than the current one"""
+        try:
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+    
+    def metrics(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = self._pending
+        stats['workers'] = self.workers
+        stats['queue_limit'] = self.queue_limit
+        stats['rounds'] = self.rounds
+        stats['avg_ms'] = round(stats.pop('total_ms') / stats['completed'], 3) if stats['completed'] else 0.0
+        return stats
+    
+    def _hash(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.rounds)).decode('utf-8')
+    
+    @staticmethod
+    def _verify(password: str, password_hash: str) -> bool:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    
+    def _run(self, fn, *args):
+        with self._lock:
+            # Threads don't survive a fork; each gunicorn worker starts its own pool
+            if self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+                self._pid = os.getpid()
+                self._pending = 0
+            if self._pending >= self.queue_limit:
+                self._stats['rejected'] += 1
+                raise PasswordHasherBusy(f'{self._pending} password hashes already in progress')
+            self._pending += 1
+            executor = self._executor
+        
+        started = time.perf_counter()
+        try:
+            return executor.submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._stats['completed'] += 1
+                self._stats['total_ms'] += (time.perf_counter() - started) * 1000
+
+password_hasher = PasswordHasher(
+    workers=Config.PASSWORD_HASH_WORKERS,
+    queue_limit=Config.PASSWORD_HASH_QUEUE_LIMIT,
+    rounds=Config.BCRYPT_ROUNDS
+)
 
 class AuthManager:
     """Secure authentication manager with JWT and session handling"""
     
     @staticmethod
     def hash_password(password: str) -> str:
-        """Hash a password using bcrypt"""
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        """Hash a password using bcrypt (on the password hashing pool)"""
+        return password_hasher.hash(password)
     
     @staticmethod
     def verify_password(password: str, password_hash: str) -> bool:
-        """Verify a password against its hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+        """Verify a password against its hash (on the password hashing pool)"""
+        return password_hasher.verify(password, password_hash)
     
     @staticmethod
     def validate_password(password: str) -> Tuple[bool, str]:
@@ -55,20 +215,43 @@ class AuthManager:
             'email': user_data['email'],
             'role': user_data['role'],
             'exp': datetime.utcnow() + timedelta(seconds=Config.SESSION_TIMEOUT // 1000),
-            'iat': datetime.utcnow()
+            # Not rounded to the second: revoking a user's tokens must not catch
+            # one issued later in the same second
+            'iat': time.time(),
+            'jti': secrets.token_urlsafe(16)
         }
         return jwt.encode(payload, Config.JWT_SECRET, algorithm='HS256')
     
     @staticmethod
     def verify_token(token: str) -> Optional[Dict]:
         """Verify JWT token and return user data"""
-        try:
-            payload = jwt.decode(token, Config.JWT_SECRET, algorithms=['HS256'])
-            return payload
-        except jwt.ExpiredSignatureError:
-            return None
-        except jwt.InvalidTokenError:
+        payload = token_cache.get(token, Config.JWT_SECRET)
+        if payload is None:
+            try:
+                payload = jwt.decode(token, Config.JWT_SECRET, algorithms=['HS256'])
+            except jwt.ExpiredSignatureError:
+                return None
+            except jwt.InvalidTokenError:
+                return None
+            token_cache.set(token, Config.JWT_SECRET, payload)
+        if revocations.is_revoked(payload):
             return None
+        return payload
+    
+    @staticmethod
+    def revoke_token(token: str, reason: str = None) -> bool:
+        """Revoke a token before it expires; returns False if it was not valid anyway"""
+        payload = AuthManager.verify_token(token)
+        if not payload or 'jti' not in payload:
+            return False
+        revocations.revoke(payload['jti'], payload.get('user_id'), payload['exp'], reason)
+        token_cache.discard(token)
+        return True
+    
+    @staticmethod
+    def revoke_user_tokens(user_id: int, reason: str = None):
+        """Revoke every token issued to a user so far, e.g. when the account is disabled"""
+        revocations.revoke_user(user_id, Config.SESSION_TIMEOUT / 1000, reason)
     
     @staticmethod
     def login(email: str, password: str, ip_address: str = None) -> Tuple[bool, str, Optional[Dict]]:
@@ -79,70 +262,80 @@ class AuthManager:
         if not AuthManager.validate_email(email):
             return False, "Invalid email format", None
         
-        with db.get_connection() as conn:
-            # Get user data
-            cursor = conn.execute('''
+        # No connection is held while bcrypt runs: the writer is shared by the whole worker
+        with db.read_connection() as conn:
+            user = conn.execute('''
                 SELECT id, email, password_hash, role, name, failed_login_attempts, 
                        locked_until, is_active
                 FROM users WHERE email = ?
-            ''', (email,))
-            
-            user = cursor.fetchone()
-            
-            if not user:
-                # Log failed attempt
-                db.log_audit(None, f"Failed login attempt for non-existent user: {email}", 
-                           ip_address=ip_address)
-                return False, "Invalid email or password", None
-            
-            # Check if account is locked
-            if user['locked_until'] and datetime.fromisoformat(user['locked_until']) > datetime.now():
-                return False, "Account is temporarily locked due to too many failed attempts", None
-            
-            # Check if account is active
-            if not user['is_active']:
-                return False, "Account is disabled", None
-            
-            # Verify password
-            if not AuthManager.verify_password(password, user['password_hash']):
-                # Increment failed login attempts
-                failed_attempts = user['failed_login_attempts'] + 1
-                locked_until = None
-                
-                if failed_attempts >= Config.MAX_LOGIN_ATTEMPTS:
-                    locked_until = (datetime.now() + timedelta(milliseconds=Config.LOCKOUT_TIME)).isoformat()
-                
+            ''', (email,)).fetchone()
+        
+        if not user:
+            # Log failed attempt
+            db.log_audit(None, f"Failed login attempt for non-existent user: {email}", 
+                       ip_address=ip_address)
+            return False, "Invalid email or password", None
+        
+        # Check if account is locked
+        if user['locked_until'] and datetime.fromisoformat(user['locked_until']) > datetime.now():
+            return False, "Account is temporarily locked due to too many failed attempts", None
+        
+        # Check if account is active
+        if not user['is_active']:
+            return False, "Account is disabled", None
+        
+        # Verify password
+        if not AuthManager.verify_password(password, user['password_hash']):
+            # Increment failed login attempts in SQL so concurrent failures all count
+            locked_until = (datetime.now() + timedelta(milliseconds=Config.LOCKOUT_TIME)).isoformat()
+            with db.get_connection() as conn:
                 conn.execute('''
                     UPDATE users 
-                    SET failed_login_attempts = ?, locked_until = ?
+                    SET failed_login_attempts = failed_login_attempts + 1,
+                        locked_until = CASE WHEN failed_login_attempts + 1 >= ? THEN ? ELSE NULL END
                     WHERE id = ?
-                ''', (failed_attempts, locked_until, user['id']))
+                ''', (Config.MAX_LOGIN_ATTEMPTS, locked_until, user['id']))
                 conn.commit()
-                
-                # Log failed attempt
-                db.log_audit(user['id'], "Failed login attempt", ip_address=ip_address)
-                
-                return False, "Invalid email or password", None
             
-            # Successful login - reset failed attempts and update last login
+            # Log failed attempt
+            db.log_audit(user['id'], "Failed login attempt", ip_address=ip_address)
+            
+            return False, "Invalid email or password", None
+        
+        # Move the hash to the configured cost while the plain password is at hand
+        new_password_hash = None
+        if password_hasher.needs_rehash(user['password_hash']):
+            try:
+                new_password_hash = AuthManager.hash_password(password)
+            except PasswordHasherBusy:
+                pass  # the next login will try again
+        
+        # Successful login - reset failed attempts and update last login
+        with db.get_connection() as conn:
             conn.execute('''
                 UPDATE users 
                 SET failed_login_attempts = 0, locked_until = NULL, last_login = CURRENT_TIMESTAMP
                 WHERE id = ?
             ''', (user['id'],))
+            if new_password_hash:
+                # Skipped if the password was changed since it was verified
+                conn.execute('UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?',
+                             (new_password_hash, user['id'], user['password_hash']))
             conn.commit()
-            
-            # Log successful login
-            db.log_audit(user['id'], "Successful login", ip_address=ip_address)
-            
-            user_data = {
-                'id': user['id'],
-                'email': user['email'],
-                'role': user['role'],
-                'name': user['name']
-            }
-            
-            return True, "Login successful", user_data
+        
+        # Log successful login
+        db.log_audit(user['id'], "Successful login", ip_address=ip_address)
+        if new_password_hash:
+            db.log_audit(user['id'], f"Password rehashed with cost {password_hasher.rounds}")
+        
+        user_data = {
+            'id': user['id'],
+            'email': user['email'],
+            'role': user['role'],
+            'name': user['name']
+        }
+        
+        return True, "Login successful", user_data
     
     @staticmethod
     def create_user(email: str, password: str, name: str, role: str = 'viewer', 
@@ -156,19 +349,19 @@ class AuthManager:
         if not is_valid:
             return False, message
         
-        if role not in ['admin', 'manager', 'viewer']:
+        if role not in ROLE_LEVELS:
             return False, "Invalid role"
         
         try:
-            with db.get_connection() as conn:
-                # Check if user already exists
-                cursor = conn.execute('SELECT id FROM users WHERE email = ?', (email,))
-                if cursor.fetchone():
+            # Check if user already exists
+            with db.read_connection() as conn:
+                if conn.execute('SELECT id FROM users WHERE email = ?', (email,)).fetchone():
                     return False, "User with this email already exists"
-                
-                # Hash password and create user
-                password_hash = AuthManager.hash_password(password)
-                
+            
+            # Hash password and create user
+            password_hash = AuthManager.hash_password(password)
+            
+            with db.get_connection() as conn:
                 cursor = conn.execute('''
                     INSERT INTO users (email, password_hash, role, name)
                     VALUES (?, ?, ?, ?)
@@ -183,6 +376,8 @@ class AuthManager:
                 
                 return True, "User created successfully"
                 
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
             return False, f"Error creating user: {str(e)}"
     
@@ -195,20 +390,20 @@ class AuthManager:
             return False, message
         
         try:
+            # Get current password hash
+            with db.read_connection() as conn:
+                user = conn.execute('SELECT password_hash FROM users WHERE id = ?', (user_id,)).fetchone()
+            
+            if not user:
+                return False, "User not found"
+            
+            # Verify old password
+            if not AuthManager.verify_password(old_password, user['password_hash']):
+                return False, "Current password is incorrect"
+            
+            # Update password
+            new_password_hash = AuthManager.hash_password(new_password)
             with db.get_connection() as conn:
-                # Get current password hash
-                cursor = conn.execute('SELECT password_hash FROM users WHERE id = ?', (user_id,))
-                user = cursor.fetchone()
-                
-                if not user:
-                    return False, "User not found"
-                
-                # Verify old password
-                if not AuthManager.verify_password(old_password, user['password_hash']):
-                    return False, "Current password is incorrect"
-                
-                # Update password
-                new_password_hash = AuthManager.hash_password(new_password)
                 conn.execute('UPDATE users SET password_hash = ? WHERE id = ?', 
                            (new_password_hash, user_id))
                 conn.commit()
@@ -218,55 +413,57 @@ class AuthManager:
                 
                 return True, "Password changed successfully"
                 
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
             return False, f"Error changing password: {str(e)}"
 
-def login_required(f):
-    """Decorator to require authentication"""
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        token = None
-        
-        # Check for token in Authorization header
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]  # Bearer <token>
-            except IndexError:
-                return jsonify({'error': 'Invalid authorization header format'}), 401
-        
-        # Check for token in session (fallback)
-        elif 'access_token' in session:
-            token = session['access_token']
-        
-        if not token:
-            return jsonify({'error': 'Authentication token is missing'}), 401
-        
-        # Verify token
-        user_data = AuthManager.verify_token(token)
-        if not user_data:
-            return jsonify({'error': 'Invalid or expired token'}), 401
-        
-        # Add user data to request context
-        request.current_user = user_data
-        return f(*args, **kwargs)
+def auth_required(required_role: Optional[str] = None):
+    """Decorator to require authentication and, optionally, a minimum role.
+    
+    The token is verified and the role checked in one pass, so a role
+    protected endpoint needs no separate login_required.
+    """
+    required_level = ROLE_LEVELS[required_role] if required_role else 0
     
-    return decorated_function
-
-def role_required(required_role: str):
-    """Decorator to require specific role"""
     def decorator(f):
         @wraps(f)
-        @login_required
         def decorated_function(*args, **kwargs):
-            user_role = request.current_user['role']
+            token = None
+            
+            # Check for token in Authorization header
+            auth_header = request.headers.get('Authorization')
+            if auth_header is not None:
+                try:
+                    token = auth_header.split(" ")[1]  # Bearer <token>
+                except IndexError:
+                    return jsonify({'error': 'Invalid authorization header format'}), 401
+            
+            # Check for token in session (fallback)
+            elif 'access_token' in session:
+                token = session['access_token']
             
-            # Define role hierarchy
-            role_hierarchy = {'viewer': 1, 'manager': 2, 'admin': 3}
+            if not token:
+                return jsonify({'error': 'Authentication token is missing'}), 401
             
-            if role_hierarchy.get(user_role, 0) < role_hierarchy.get(required_role, 0):
+            # Verify token
+            user_data = AuthManager.verify_token(token)
+            if not user_data:
+                return jsonify({'error': 'Invalid or expired token'}), 401
+            
+            if ROLE_LEVELS.get(user_data.get('role'), 0) < required_level:
                 return jsonify({'error': 'Insufficient permissions'}), 403
             
+            # Add user data to request context
+            request.current_user = user_data
             return f(*args, **kwargs)
+        
         return decorated_function
-    return decorator
\ No newline at end of file
+    return decorator
+
+# Decorator to require authentication
+login_required = auth_required()
+
+def role_required(required_role: str):
+    """Decorator to require specific role (authenticates the request too)"""
+    return auth_required(required_role)
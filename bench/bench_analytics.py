@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark GET /api/analytics/dashboard at 50k employees.
+
+Compares the old full-table COUNT/SUM/GROUP BY dashboard with the
+materialized aggregates, then runs a burst of mixed writes (awards,
+deactivations, department moves, new hires) and checks the summary tables
+still match a from-scratch recompute.
+"""
+import argparse
+import random
+import time
+
+from bench_common import (prepare_environment, seed_employees, auth_headers, measure, report,
+                          DEPARTMENTS)
+
+
+def legacy_dashboard(conn):
+    """The pre-materialization implementation: full scans on every request"""
+    total_employees = conn.execute('SELECT COUNT(*) FROM employees WHERE is_active = 1').fetchone()[0]
+    total_entries = conn.execute('SELECT SUM(total_entries) FROM employees WHERE is_active = 1').fetchone()[0] or 0
+    recent_activities = [dict(row) for row in conn.execute('''
+        SELECT a.activity_name, a.entries_awarded, a.created_at, e.name as employee_name
+        FROM activities a
+        JOIN employees e ON a.employee_id = e.id
+        WHERE e.is_active = 1
+        ORDER BY a.created_at DESC
+        LIMIT 10
+    ''')]
+    top_performers = [dict(row) for row in conn.execute('''
+        SELECT name, total_entries, department
+        FROM employees NOT INDEXED
+        WHERE is_active = 1 AND total_entries > 0
+        ORDER BY total_entries DESC
+        LIMIT 10
+    ''')]
+    department_stats = [dict(row) for row in conn.execute('''
+        SELECT department, COUNT(*) as employee_count, SUM(total_entries) as total_entries
+        FROM employees
+        WHERE is_active = 1 AND department IS NOT NULL
+        GROUP BY department
+        ORDER BY total_entries DESC
+    ''')]
+    return {
+        'total_employees': total_employees,
+        'total_entries': total_entries,
+        'recent_activities': recent_activities,
+        'top_performers': top_performers,
+        'department_stats': department_stats
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--employees', type=int, default=50_000)
+    parser.add_argument('--activities', type=int, default=2)
+    parser.add_argument('--writes', type=int, default=5_000)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = prepare_environment()
+    from database import db
+    from app import app, limiter
+    from analytics import check_analytics
+
+    from flask import jsonify
+
+    def legacy_view():
+        with db.get_connection() as conn:
+            return jsonify({'success': True, 'analytics': legacy_dashboard(conn)})
+
+    app.add_url_rule('/bench/legacy_dashboard', 'bench_legacy_dashboard', legacy_view)
+    limiter.enabled = False
+
+    print(f"Seeding {args.employees} employees x {args.activities} activities in {workdir}...")
+    rng = random.Random(11)
+    with db.get_connection() as conn:
+        employee_ids = seed_employees(conn, args.employees, args.activities)
+        conn.executemany('UPDATE employees SET total_entries = ? WHERE id = ?',
+                         [(rng.randint(0, 60), i) for i in employee_ids])
+        conn.commit()
+
+    client = app.test_client()
+    headers = auth_headers()
+    legacy = client.get('/bench/legacy_dashboard').get_json()['analytics']
+    current = client.get('/api/analytics/dashboard', headers=headers).get_json()['analytics']
+    for key in ('total_employees', 'total_entries', 'department_stats'):
+        assert legacy[key] == current[key], f"{key} differs from the full recompute"
+    # Ties may come back in a different order, so compare the sort keys
+    assert [r['total_entries'] for r in legacy['top_performers']] == \
+        [r['total_entries'] for r in current['top_performers']], "leaderboard differs"
+    assert [r['created_at'] for r in legacy['recent_activities']] == \
+        [r['created_at'] for r in current['recent_activities']], "recent activities differ"
+
+    def uncached_dashboard():
+        # Bump the data version so every request misses the response cache
+        with db.get_connection() as conn:
+            db.bump_data_version(conn)
+            conn.commit()
+        return client.get('/api/analytics/dashboard', headers=headers)
+
+    report('legacy full-scan dashboard (before)',
+           measure(lambda: client.get('/bench/legacy_dashboard'), args.iterations))
+    report('GET /api/analytics/dashboard (uncached)', measure(uncached_dashboard, args.iterations))
+
+    started = time.perf_counter()
+    with db.get_connection() as conn:
+        for _ in range(args.writes):
+            employee_id = rng.choice(employee_ids)
+            operation = rng.random()
+            if operation < 0.7:
+                conn.execute('UPDATE employees SET total_entries = total_entries + ? WHERE id = ?',
+                             (rng.randint(1, 5), employee_id))
+            elif operation < 0.8:
+                conn.execute('UPDATE employees SET is_active = 1 - is_active WHERE id = ?', (employee_id,))
+            elif operation < 0.9:
+                conn.execute('UPDATE employees SET department = ? WHERE id = ?',
+                             (rng.choice(DEPARTMENTS + [None]), employee_id))
+            else:
+                cursor = conn.execute('INSERT INTO employees (name, department, total_entries) VALUES (?, ?, ?)',
+                                      (f"New Hire {rng.random():.8f}", rng.choice(DEPARTMENTS), rng.randint(0, 10)))
+                employee_ids.append(cursor.lastrowid)
+        conn.commit()
+        elapsed = time.perf_counter() - started
+        print(f"{args.writes} mixed writes with triggers: {elapsed * 1000:.1f} ms "
+              f"({elapsed / args.writes * 1e6:.1f} us/write)")
+
+        problems = check_analytics(conn)
+    print("Consistency check: " + ("OK" if not problems else "; ".join(problems)))
+    if problems:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark of the auth decorators' per-request overhead.
+
+legacy:  the old login_required / role_required, stacked the way app.py
+         used them on manager endpoints (the token is verified twice and
+         the role table rebuilt on every call).
+current: auth.login_required / role_required, verifying once per request
+         through the token cache; "cold" clears the cache before each call.
+
+Each decorator wraps a no-op view called inside one request context, so
+only the decorator's own work is timed.
+"""
+import argparse
+import time
+from functools import wraps
+
+from bench_common import prepare_environment, auth_headers
+
+
+def legacy_decorators(request, jsonify, session, jwt, Config):
+    """The pre-cache decorators, verbatim in behaviour"""
+    def verify_token(token):
+        try:
+            return jwt.decode(token, Config.JWT_SECRET, algorithms=['HS256'])
+        except jwt.InvalidTokenError:
+            return None
+
+    def login_required(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            token = None
+            if 'Authorization' in request.headers:
+                auth_header = request.headers['Authorization']
+                try:
+                    token = auth_header.split(" ")[1]
+                except IndexError:
+                    return jsonify({'error': 'Invalid authorization header format'}), 401
+            elif 'access_token' in session:
+                token = session['access_token']
+            if not token:
+                return jsonify({'error': 'Authentication token is missing'}), 401
+            user_data = verify_token(token)
+            if not user_data:
+                return jsonify({'error': 'Invalid or expired token'}), 401
+            request.current_user = user_data
+            return f(*args, **kwargs)
+        return decorated_function
+
+    def role_required(required_role):
+        def decorator(f):
+            @wraps(f)
+            @login_required
+            def decorated_function(*args, **kwargs):
+                user_role = request.current_user['role']
+                role_hierarchy = {'viewer': 1, 'manager': 2, 'admin': 3}
+                if role_hierarchy.get(user_role, 0) < role_hierarchy.get(required_role, 0):
+                    return jsonify({'error': 'Insufficient permissions'}), 403
+                return f(*args, **kwargs)
+            return decorated_function
+        return decorator
+
+    return login_required, role_required
+
+
+def per_call_us(fn, iterations, before=None):
+    best = float('inf')
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            if before:
+                before()
+            fn()
+        best = min(best, time.perf_counter() - started)
+    return best / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=5_000)
+    args = parser.parse_args()
+
+    prepare_environment()
+    import jwt
+    from flask import request, jsonify, session
+    from app import app
+    from auth import login_required, role_required, token_cache
+    from config import Config
+
+    legacy_login, legacy_role = legacy_decorators(request, jsonify, session, jwt, Config)
+
+    def view():
+        return 'ok'
+
+    variants = [
+        ('legacy login_required', legacy_login(view), None),
+        ('legacy login_required+role_required', legacy_login(legacy_role('manager')(view)), None),
+        ('login_required, cold cache', login_required(view), token_cache.clear),
+        ('role_required, cold cache', role_required('manager')(view), token_cache.clear),
+        ('login_required, cached token', login_required(view), None),
+        ('role_required, cached token', role_required('manager')(view), None),
+    ]
+    with app.test_request_context(headers=auth_headers()):
+        for label, decorated, before in variants:
+            assert decorated() == 'ok'
+            print(f"{label:<40} {per_call_us(decorated, args.iterations, before):8.2f} us per request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Backup time and writer latency while a backup runs.
+
+Grows the database to --size-mb with a padding table of text rows, then
+takes backups while a writer thread keeps awarding entries through
+db.write_transaction every --write-interval seconds, the way request
+threads in the same worker would. For each method it reports how long the
+backup took, its size, the writer's latency before and during it, and how
+large the -wal file grew:
+
+  copy2           shutil.copy2 of the main file (the old backup_database;
+                  misses whatever is still in the -wal file)
+  api one step    Connection.backup of the whole file in a single step
+  api paged       backup.create_backup, BACKUP_PAGES_PER_STEP pages per step
+                  with BACKUP_STEP_PAUSE between steps, quick_check, no compression
+  api paged+gzip  the same, compressed with gzip (the default)
+  api paged+zstd  the same with zstd, when zstandard is installed
+"""
+import argparse
+import os
+import shutil
+import threading
+import time
+
+from bench_common import prepare_environment, seed_employees, percentile
+
+PADDING_ROWS_PER_BATCH = 20_000
+
+
+def grow_database(db, size_mb):
+    """Add text padding until the database file reaches size_mb"""
+    with db.get_connection() as conn:
+        conn.execute('CREATE TABLE IF NOT EXISTS bench_padding (id INTEGER PRIMARY KEY, notes TEXT)')
+        conn.commit()
+        target = size_mb * 1024 * 1024
+        while True:
+            page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+            size = conn.execute('PRAGMA page_count').fetchone()[0] * page_size
+            if size >= target:
+                break
+            # hex text compresses about as well as typical row data
+            conn.execute('''
+                WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+                INSERT INTO bench_padding (notes) SELECT hex(randomblob(500)) FROM n
+            ''', (PADDING_ROWS_PER_BATCH,))
+            conn.commit()
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, default=1024)
+    parser.add_argument('--employees', type=int, default=5_000)
+    parser.add_argument('--write-interval', type=float, default=0.01)
+    parser.add_argument('--baseline-seconds', type=float, default=2.0)
+    args = parser.parse_args()
+
+    workdir = prepare_environment()
+    import sqlite3
+    from backup import create_backup, verify_backup, zstandard
+    from config import Config
+    from database import db
+
+    with db.get_connection() as conn:
+        employee_ids = seed_employees(conn, args.employees)
+    started = time.perf_counter()
+    size = grow_database(db, args.size_mb)
+    print(f"{size / 1024 / 1024:,.0f} MB database built in {time.perf_counter() - started:.0f} s in {workdir}")
+
+    wal_path = db.db_path + '-wal'
+    backup_dir = Config.BACKUP_PATH
+    os.makedirs(backup_dir, exist_ok=True)
+
+    def copy2():
+        target = os.path.join(backup_dir, 'copy2.db')
+        shutil.copy2(db.db_path, target)
+        return target
+
+    def one_step():
+        target = os.path.join(backup_dir, 'one_step.db')
+        source = sqlite3.connect(db.db_path)
+        destination = sqlite3.connect(target)
+        source.backup(destination)
+        destination.close()
+        source.close()
+        return target
+
+    def paged(compression):
+        return lambda: create_backup(db.db_path, backup_dir, compression=compression, retention=0,
+                                     pages_per_step=Config.BACKUP_PAGES_PER_STEP,
+                                     pause=Config.BACKUP_STEP_PAUSE)['path']
+
+    methods = [('copy2', copy2), ('api one step', one_step), ('api paged', paged('none')),
+               ('api paged+gzip', paged('gzip'))]
+    if zstandard is not None:
+        methods.append(('api paged+zstd', paged('zstd')))
+
+    for label, method in methods:
+        phase = ['before']
+        latencies = []
+        stop = threading.Event()
+
+        def award():
+            i = 0
+            while not stop.is_set():
+                employee_id = employee_ids[i % len(employee_ids)]
+                i += 1
+                started = time.perf_counter()
+                with db.write_transaction() as conn:
+                    conn.execute('''
+                        INSERT INTO activities (employee_id, activity_name, activity_category, entries_awarded)
+                        VALUES (?, 'Shift Coverage', 'teamwork', 1)
+                    ''', (employee_id,))
+                    conn.execute('UPDATE employees SET total_entries = total_entries + 1 WHERE id = ?',
+                                 (employee_id,))
+                    db.bump_data_version(conn)
+                latencies.append((phase[0], (time.perf_counter() - started) * 1000))
+                time.sleep(args.write_interval)
+
+        writer = threading.Thread(target=award)
+        writer.start()
+        time.sleep(args.baseline_seconds)
+        phase[0] = 'during'
+        started = time.perf_counter()
+        path = method()
+        elapsed = time.perf_counter() - started
+        wal_mb = os.path.getsize(wal_path) / 1024 / 1024 if os.path.exists(wal_path) else 0.0
+        stop.set()
+        writer.join()
+
+        print(f"{label}: {elapsed:.1f} s, {os.path.getsize(path) / 1024 / 1024:,.0f} MB, "
+              f"-wal {wal_mb:,.1f} MB after, {verify_backup(path, full=False)}")
+        for name in ('before', 'during'):
+            samples = [ms for sample_phase, ms in latencies if sample_phase == name]
+            if samples:
+                print(f"  writer {name:<7} p50={percentile(samples, 50):8.2f} ms  "
+                      f"p99={percentile(samples, 99):8.2f} ms  max={max(samples):8.2f} ms  (n={len(samples)})")
+        os.remove(path)
+        with db.get_connection() as conn:
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+
+if __name__ == "__main__":
+    main()
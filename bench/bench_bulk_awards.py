@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark awarding entries to a whole team: one POST per employee through
+/api/employee/<id>/add_entry versus a single /api/entries/bulk request
+(JSON and CSV upload).
+"""
+import argparse
+import io
+import time
+
+from bench_common import prepare_environment, seed_employees, auth_headers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--employees', type=int, default=800)
+    args = parser.parse_args()
+
+    workdir = prepare_environment()
+    from database import db
+    from app import app, limiter
+
+    limiter.enabled = False
+    with db.get_connection() as conn:
+        employee_ids = seed_employees(conn, args.employees)
+    print(f"Awarding a bonus to {len(employee_ids)} employees in {workdir}")
+
+    client = app.test_client()
+    headers = auth_headers()
+    award = {'activity_name': 'Monthly Attendance Bonus', 'activity_category': 'attendance',
+             'entries_awarded': 2}
+
+    started = time.perf_counter()
+    for employee_id in employee_ids:
+        response = client.post(f'/api/employee/{employee_id}/add_entry', headers=headers, json=award)
+        assert response.status_code == 200, response.data
+    per_request = time.perf_counter() - started
+
+    awards = [{'employee_id': employee_id, 'activity_name': 'Monthly Attendance Bonus',
+               'category': 'attendance', 'entries': 2} for employee_id in employee_ids]
+    started = time.perf_counter()
+    response = client.post('/api/entries/bulk', headers=headers, json={'awards': awards})
+    bulk_json = time.perf_counter() - started
+    assert response.get_json()['applied'] == len(employee_ids), response.data[:300]
+
+    csv_body = 'employee_id,activity_name,category,entries\n' + ''.join(
+        f"{employee_id},Monthly Attendance Bonus,attendance,2\n" for employee_id in employee_ids)
+    started = time.perf_counter()
+    response = client.post('/api/entries/bulk', headers=headers, data={
+        'file': (io.BytesIO(csv_body.encode('utf-8')), 'bonus.csv')
+    }, content_type='multipart/form-data')
+    bulk_csv = time.perf_counter() - started
+    assert response.get_json()['applied'] == len(employee_ids), response.data[:300]
+
+    with db.get_connection() as conn:
+        mismatched = conn.execute('''
+            SELECT COUNT(*) FROM employees e
+            WHERE total_entries != (SELECT COALESCE(SUM(entries_awarded), 0)
+                                    FROM activities WHERE employee_id = e.id)
+        ''').fetchone()[0]
+    assert mismatched == 0
+
+    print(f"{'per-request add_entry':<28} {per_request * 1000:10.1f} ms")
+    print(f"{'bulk JSON':<28} {bulk_json * 1000:10.1f} ms  ({per_request / bulk_json:.1f}x faster)")
+    print(f"{'bulk CSV upload':<28} {bulk_csv * 1000:10.1f} ms  ({per_request / bulk_csv:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the benchmark scripts.
+
+Every benchmark runs against a throwaway database in a temporary working
+directory so the real data/raffle_database.db is never touched. Run them
+from anywhere, e.g. `python bench/bench_raffle_draw.py`; importing this
+module puts the repository root on sys.path so the app modules resolve.
+The scratch environment and admin token come from the test suite's
+conftest.py.
+"""
+import os
+import sys
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from conftest import scratch_environment, admin_headers as auth_headers  # noqa: E402,F401
+
+DEPARTMENTS = ['Caregiving', 'Nursing', 'Scheduling', 'Office', 'Training']
+ACTIVITIES = [
+    ('Perfect Attendance', 'attendance'),
+    ('Client Compliment', 'recognition'),
+    ('Shift Coverage', 'teamwork'),
+    ('Training Completed', 'training'),
+]
+
+
+def prepare_environment(prefix='raffle_bench_'):
+    """Point Config at a temporary database and chdir into a scratch directory.
+
+    Must be called before importing config, database, auth or app.
+    """
+    os.environ.setdefault('FLASK_ENV', 'production')
+    return scratch_environment(prefix, db_name='raffle_bench.db')
+
+
+def seed_employees(conn, employee_count, activities_per_employee=0):
+    """Bulk insert synthetic employees and activities, returns employee ids"""
+    from name_matching import normalize_name
+
+    rng = random.Random(42)
+
+    def employee_rows():
+        for i in range(employee_count):
+            name = f"Caregiver {i:06d}"
+            yield (name, normalize_name(name), DEPARTMENTS[i % len(DEPARTMENTS)], activities_per_employee)
+
+    conn.executemany('''
+        INSERT INTO employees (name, name_normalized, department, total_entries)
+        VALUES (?, ?, ?, ?)
+    ''', employee_rows())
+    employee_ids = [row[0] for row in conn.execute('SELECT id FROM employees ORDER BY id')]
+
+    start = datetime(2025, 1, 1)
+
+    def activity_rows():
+        for employee_id in employee_ids:
+            for j in range(activities_per_employee):
+                activity_name, category = ACTIVITIES[j % len(ACTIVITIES)]
+                created_at = start + timedelta(minutes=j * 37 + rng.randint(0, 30))
+                yield (employee_id, activity_name, category, 1,
+                       created_at.strftime('%Y-%m-%d %H:%M:%S'))
+
+    conn.executemany('''
+        INSERT INTO activities (employee_id, activity_name, activity_category,
+                                entries_awarded, created_at)
+        VALUES (?, ?, ?, ?, ?)
+    ''', activity_rows())
+    conn.commit()
+    conn.execute('ANALYZE')
+    return employee_ids
+
+
+def measure(fn, iterations):
+    """Run fn repeatedly and return per-call latencies in milliseconds"""
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def report(label, samples):
+    print(f"{label:<40} p50={percentile(samples, 50):9.2f} ms  "
+          f"p99={percentile(samples, 99):9.2f} ms  "
+          f"mean={statistics.mean(samples):9.2f} ms  (n={len(samples)})")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Threaded load benchmark for DatabaseManager connections.
+
+legacy: the old get_connection(): one connection per thread kept in
+        threading.local forever, PRAGMA journal_mode=WAL on each new one.
+pool:   DatabaseManager today: reads on the read-only pool, writes queued
+        for the single writer connection.
+
+Two traffic shapes, both 90% reads / 10% single-row writes:
+  thread-per-request  a new thread per request (werkzeug's threaded server)
+  worker threads      a fixed set of threads serving many requests (gthread)
+
+Reports latency, throughput, connections opened and pool metrics.
+"""
+import argparse
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from bench_common import prepare_environment, seed_employees, report
+
+
+class LegacyConnections:
+    """The pre-pool DatabaseManager.get_connection, verbatim in behaviour"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self.opened = 0
+
+    @contextmanager
+    def get_connection(self):
+        if not hasattr(self._local, 'connection'):
+            self.opened += 1
+            self._local.connection = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30.0)
+            self._local.connection.row_factory = sqlite3.Row
+            self._local.connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection.execute('PRAGMA foreign_keys=ON')
+        try:
+            yield self._local.connection
+        except Exception as e:
+            self._local.connection.rollback()
+            raise e
+
+
+def make_request(manager, employee_count):
+    rng = random.Random()
+    read_connection = getattr(manager, 'read_connection', manager.get_connection)
+
+    def request():
+        employee_id = rng.randint(1, employee_count)
+        if rng.random() < 0.1:
+            with manager.get_connection() as conn:
+                conn.execute('UPDATE employees SET total_entries = total_entries + 1 WHERE id = ?', (employee_id,))
+                conn.commit()
+        else:
+            with read_connection() as conn:
+                conn.execute('SELECT id, name, department, total_entries FROM employees WHERE id = ?',
+                             (employee_id,)).fetchone()
+                conn.execute('''
+                    SELECT department, COUNT(*), SUM(total_entries) FROM employees
+                    WHERE department = (SELECT department FROM employees WHERE id = ?)
+                ''', (employee_id,)).fetchone()
+    return request
+
+
+def timed(request, samples, lock):
+    started = time.perf_counter()
+    request()
+    elapsed = (time.perf_counter() - started) * 1000
+    with lock:
+        samples.append(elapsed)
+
+
+def thread_per_request(request, total, concurrency):
+    samples, lock = [], threading.Lock()
+    running = []
+    for _ in range(total):
+        thread = threading.Thread(target=timed, args=(request, samples, lock))
+        thread.start()
+        running.append(thread)
+        if len(running) >= concurrency:
+            running.pop(0).join()
+    for thread in running:
+        thread.join()
+    return samples
+
+
+def worker_threads(request, total, concurrency):
+    samples, lock = [], threading.Lock()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(total):
+            executor.submit(timed, request, samples, lock)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--employees', type=int, default=5_000)
+    parser.add_argument('--requests', type=int, default=3_000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    workdir = prepare_environment()
+    from database import db
+
+    with db.get_connection() as conn:
+        seed_employees(conn, args.employees)
+        conn.commit()
+    db.read_pool.close()
+    db.write_pool.close()
+    print(f"{args.employees} employees, {args.requests} requests x {args.concurrency} concurrent, "
+          f"{db.read_pool.max_size} read connections + 1 writer, in {workdir}")
+
+    def pool_opened():
+        return db.read_pool.metrics()['opened'] + db.write_pool.metrics()['opened']
+
+    for shape, runner in (('thread-per-request', thread_per_request), ('worker threads', worker_threads)):
+        for label, manager in (('legacy', LegacyConnections(db.db_path)), ('pool', db)):
+            opened_before = pool_opened()
+            request = make_request(manager, args.employees)
+            started = time.perf_counter()
+            samples = runner(request, args.requests, args.concurrency)
+            elapsed = time.perf_counter() - started
+            report(f"{shape}, {label}", samples)
+            opened = manager.opened if manager is not db else pool_opened() - opened_before
+            print(f"{'':<40} {args.requests / elapsed:7.0f} req/s  connections opened={opened}")
+        for name, pool in (('read pool', db.read_pool.metrics()), ('writer', db.write_pool.metrics())):
+            print(f"{'':<40} {name}: open={pool['open']} checkouts={pool['checkouts']} "
+                  f"waits={pool['waits']} max_wait={pool['max_wait_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark GET /api/employees against the old per-employee activity lookup.
+
+Seeds 5,000 employees x 200 activities into a scratch database and reports
+p50/p99 latency for the legacy N+1 query pattern and the current endpoint,
+the latter both rebuilt on every call and served from the response cache.
+"""
+import argparse
+
+from bench_common import prepare_environment, seed_employees, auth_headers, measure, report
+
+
+def legacy_get_employees(conn):
+    """The pre-optimisation implementation: one activity query per employee"""
+    cursor = conn.execute('''
+        SELECT id, name, email, phone, department, position,
+               hire_date, photo_path, total_entries, is_active,
+               created_at, updated_at
+        FROM employees WHERE is_active = 1
+        ORDER BY name
+    ''')
+    employees = []
+    for row in cursor.fetchall():
+        employee = dict(row)
+        activity_cursor = conn.execute('''
+            SELECT activity_name, activity_category, entries_awarded, created_at
+            FROM activities WHERE employee_id = ?
+            ORDER BY created_at DESC LIMIT 10
+        ''', (employee['id'],))
+        employee['activities'] = [dict(activity) for activity in activity_cursor.fetchall()]
+        employees.append(employee)
+    return employees
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--employees', type=int, default=5000)
+    parser.add_argument('--activities', type=int, default=200)
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = prepare_environment()
+    from database import db
+    from app import app, limiter
+    from cache import response_cache
+
+    from flask import jsonify
+
+    def legacy_view():
+        with db.get_connection() as conn:
+            return jsonify({'success': True, 'employees': legacy_get_employees(conn)})
+
+    # Serve the old implementation next to the new one so both pay the same
+    # request and serialization overhead
+    app.add_url_rule('/bench/legacy_employees', 'bench_legacy_employees', legacy_view)
+    limiter.enabled = False
+
+    print(f"Seeding {args.employees} employees x {args.activities} activities in {workdir}...")
+    with db.get_connection() as conn:
+        seed_employees(conn, args.employees, args.activities)
+
+    client = app.test_client()
+    headers = auth_headers()
+    legacy = client.get('/bench/legacy_employees').get_json()['employees']
+    current = client.get('/api/employees?include=activities', headers=headers).get_json()['employees']
+    assert legacy == current, "windowed fetch returned different activities"
+
+    report('legacy N+1 query (before)',
+           measure(lambda: client.get('/bench/legacy_employees'), args.iterations))
+
+    def uncached():
+        # Without this every call after the first would be a cache hit
+        response_cache.clear()
+        return client.get('/api/employees?include=activities', headers=headers)
+
+    report('GET /api/employees?include=activities (uncached)', measure(uncached, args.iterations))
+    report('GET /api/employees?include=activities (cached)',
+           measure(lambda: client.get('/api/employees?include=activities', headers=headers), args.iterations))
+
+
+if __name__ == "__main__":
+    main()
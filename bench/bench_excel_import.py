@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Excel employee import on synthetic 10k/100k/500k-row workbooks.
+
+Each measurement runs in a fresh subprocess so peak RSS (ru_maxrss) belongs
+to that run alone. The legacy full-mode loader is only measured up to
+--legacy-max-rows because it holds the whole sheet in memory.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from bench_common import prepare_environment, DEPARTMENTS
+
+FIRST_NAMES = ['Maria', 'James', 'Linda', 'Robert', 'Patricia', 'Michael', 'Susan', 'David']
+
+
+def legacy_extract_names(filepath):
+    """The pre-streaming importer: full-mode load, every row stringified up front"""
+    from openpyxl import load_workbook
+    workbook = load_workbook(filepath)
+    sheet = workbook.active
+    headers = [str(cell.value) if cell.value else "" for cell in sheet[1]]
+    data = []
+    for row in sheet.iter_rows(min_row=2, values_only=True):
+        data.append([str(cell) if cell is not None else "" for cell in row])
+    first_name_col = headers.index('First Name')
+    last_name_col = headers.index('Last Name')
+    employees = []
+    for row in data:
+        first_name = row[first_name_col].strip()
+        last_name = row[last_name_col].strip()
+        if first_name and last_name:
+            employees.append(f"{first_name} {last_name}")
+    workbook.close()
+    return len(data), len(set(employees))
+
+
+def build_workbook(path, rows):
+    """HR-export shaped sheet; ~5% of rows repeat an earlier person"""
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Employees')
+    sheet.append(['Employee ID', 'First Name', 'Last Name', 'Department', 'Hire Date', 'Phone'])
+    for i in range(rows):
+        person = i if i % 20 else i // 2
+        sheet.append([100000 + i, FIRST_NAMES[person % len(FIRST_NAMES)], f"Lastname{person:07d}",
+                      DEPARTMENTS[i % len(DEPARTMENTS)], '2024-03-01', f"555-{i % 10000:04d}"])
+    workbook.save(path)
+
+
+def run_child(mode, path):
+    started = time.perf_counter()
+    if mode == 'legacy':
+        total_rows, found = legacy_extract_names(path)
+    else:
+        from database import db
+        from excel_import import EmployeeNameReader, insert_employee_batches
+        with EmployeeNameReader(path) as reader, db.get_connection() as conn:
+            insert_employee_batches(conn, reader)
+            conn.commit()
+        total_rows, found = reader.total_rows, reader.employees_found
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        'rows': total_rows,
+        'found': found,
+        'seconds': elapsed,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }))
+
+
+def measure_in_subprocess(mode, path, workdir):
+    env = dict(os.environ, DATABASE_PATH=os.path.join(workdir, 'data', f'{mode}_{os.path.basename(path)}.db'))
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode, path],
+                            env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 500_000])
+    parser.add_argument('--legacy-max-rows', type=int, default=100_000)
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    workdir = prepare_environment()
+    print(f"Workbooks and databases in {workdir}")
+    print(f"{'rows':>8} {'importer':<10} {'seconds':>8} {'rows/sec':>10} {'peak RSS':>10} {'names':>8}")
+    for rows in args.rows:
+        path = os.path.join(workdir, f'hr_export_{rows}.xlsx')
+        build_workbook(path, rows)
+        modes = ['legacy', 'streaming'] if rows <= args.legacy_max_rows else ['streaming']
+        for mode in modes:
+            result = measure_in_subprocess(mode, path, workdir)
+            print(f"{rows:>8} {mode:<10} {result['seconds']:>8.2f} {result['rows'] / result['seconds']:>10.0f} "
+                  f"{result['peak_rss_mb']:>8.1f} MB {result['found']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark near-duplicate detection on a 50k-name roster.
+
+Builds a roster of realistic names, then imports a batch that mixes
+brand-new people with misspelt, re-cased and accented variants of people
+already on it. Compares the prefix-filtered trigram index with the
+pairwise comparison it replaces (timed on a sample and extrapolated),
+and reports how many planted variants each one catches.
+"""
+import argparse
+import random
+import time
+
+from bench_common import prepare_environment
+
+FIRST_NAMES = ['Maria', 'James', 'Linda', 'Robert', 'Patricia', 'Michael', 'Susan', 'David', 'Jennifer',
+               'William', 'Elizabeth', 'Richard', 'Barbara', 'Joseph', 'Jessica', 'Thomas', 'Sarah',
+               'Charles', 'Karen', 'Daniel', 'Nancy', 'Matthew', 'Lisa', 'Anthony', 'Betty', 'Mark',
+               'Sandra', 'Jose', 'Ashley', 'Bir', 'Priya', 'Ahmed', 'Mei', 'Olga', 'Kwame', 'Sofia']
+# Surnames are built from random syllables so the roster has the spread of a real
+# one (tens of thousands of distinct surnames over a few dozen common first names)
+ONSETS = ['b', 'c', 'd', 'f', 'g', 'h', 'j', 'k', 'l', 'm', 'n', 'p', 'r', 's', 't', 'v', 'w', 'z',
+          'br', 'ch', 'st', 'th', 'gr', 'sh']
+VOWELS = ['a', 'e', 'i', 'o', 'u', 'ai', 'ou', 'ee']
+CODAS = ['', 'n', 'r', 's', 'l', 't', 'ck', 'm']
+ACCENTS = str.maketrans('aeiou', 'áéíóú')
+
+
+def make_names(count, rng):
+    names = set()
+    while len(names) < count:
+        surname = ''.join(rng.choice(ONSETS) + rng.choice(VOWELS) + rng.choice(CODAS)
+                          for _ in range(rng.randint(2, 3))).capitalize()
+        names.add(f"{rng.choice(FIRST_NAMES)} {surname}")
+    names = sorted(names)
+    rng.shuffle(names)
+    return names
+
+
+def misspell(name, rng):
+    """One typo, or the same name re-cased / accented / re-spaced"""
+    i = rng.randrange(1, len(name) - 1)
+    return rng.choice([
+        lambda: name[:i] + name[i + 1:],                      # dropped letter
+        lambda: name[:i] + name[i] + name[i:],                # doubled letter
+        lambda: name[:i] + name[i + 1] + name[i] + name[i + 2:],  # swapped letters
+        lambda: name + 's',
+        lambda: name.upper(),
+        lambda: name.translate(ACCENTS),
+        lambda: '  ' + name.replace(' ', '   ') + ' ',
+    ])()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--roster', type=int, default=50_000)
+    parser.add_argument('--new', type=int, default=2_000, help="names in the imported batch")
+    parser.add_argument('--variants', type=int, default=500, help="of which variants of existing people")
+    parser.add_argument('--sample', type=int, default=50, help="names timed for the pairwise baseline")
+    parser.add_argument('--self-join', action='store_true', help="also time a whole-roster scan (minutes)")
+    args = parser.parse_args()
+
+    workdir = prepare_environment()
+    from database import db
+    from excel_import import insert_employee_batches
+    from name_matching import (find_near_duplicates, jaccard, name_trigrams, normalize_name,
+                               NEAR_DUPLICATE_THRESHOLD)
+
+    rng = random.Random(7)
+    names = make_names(args.roster + args.new - args.variants, rng)
+    roster, fresh = names[:args.roster], names[args.roster:]
+    originals = rng.sample(roster, args.variants)
+    variants = {misspell(name, rng): name for name in originals}
+    batch = fresh + list(variants)
+    rng.shuffle(batch)
+    print(f"Roster {len(roster)}, importing {len(batch)} names ({len(variants)} variants) in {workdir}")
+
+    with db.get_connection() as conn:
+        insert_employee_batches(conn, roster)
+        conn.commit()
+        last_id = conn.execute('SELECT MAX(id) FROM employees').fetchone()[0]
+
+        started = time.perf_counter()
+        added, skipped = insert_employee_batches(conn, batch)
+        conn.commit()
+        print(f"{'exact normalized-name match':<32} {(time.perf_counter() - started) * 1000:9.1f} ms  "
+              f"added={added} skipped={skipped}")
+
+        started = time.perf_counter()
+        flagged = find_near_duplicates(conn, new_since_id=last_id)
+        indexed_ms = (time.perf_counter() - started) * 1000
+        new_rows = conn.execute('SELECT name, name_normalized FROM employees WHERE id > ?', (last_id,)).fetchall()
+
+    caught_exact = sum(1 for variant, original in variants.items()
+                       if normalize_name(variant) == normalize_name(original))
+    flagged_names = {entry['name']: {match['name'] for match in entry['matches']} for entry in flagged}
+    caught_fuzzy = sum(1 for variant, original in variants.items() if original in flagged_names.get(variant, ()))
+    print(f"{'trigram index (prefix filter)':<32} {indexed_ms:9.1f} ms  flagged={len(flagged)}")
+    print(f"  variants caught: {caught_exact} by normalization, {caught_fuzzy} flagged as near duplicates, "
+          f"{len(variants) - caught_exact - caught_fuzzy} missed")
+
+    # Pairwise baseline: every new name against every existing name
+    roster_trigrams = [name_trigrams(normalize_name(name)) for name in roster]
+    sample = new_rows[:args.sample]
+    started = time.perf_counter()
+    for _, normalized in sample:
+        trigrams = name_trigrams(normalized)
+        [other for other in roster_trigrams if jaccard(trigrams, other) >= NEAR_DUPLICATE_THRESHOLD]
+    per_name = (time.perf_counter() - started) / len(sample)
+    pairwise_ms = per_name * len(new_rows) * 1000
+    print(f"{'pairwise comparison (est.)':<32} {pairwise_ms:9.1f} ms  "
+          f"({len(new_rows)} x {len(roster)} pairs, {indexed_ms and pairwise_ms / indexed_ms:.0f}x slower)")
+
+    if not args.self_join:
+        return
+    # Whole-roster self-join, as `python name_matching.py --similar` runs it
+    with db.get_connection() as conn:
+        started = time.perf_counter()
+        flagged = find_near_duplicates(conn)
+        self_join_ms = (time.perf_counter() - started) * 1000
+    total = args.roster + len(new_rows)
+    print(f"{'full roster self-join':<32} {self_join_ms:9.1f} ms  flagged={len(flagged)}  "
+          f"(pairwise est. {per_name * total / 2 / 60:.0f} min)")
+
+
+if __name__ == "__main__":
+    main()
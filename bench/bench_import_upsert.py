@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Regression benchmark for the employee import upsert.
+
+Imports 100k names into a database that already holds half of them and
+compares the old SELECT-then-INSERT-per-name loop with the set-based
+temp-table upsert. Exits non-zero if the upsert misses --budget-ms.
+"""
+import argparse
+import time
+
+from bench_common import prepare_environment, seed_employees
+
+
+def legacy_import(conn, names):
+    """The pre-optimisation loop: one lookup and one INSERT per name"""
+    added_count = 0
+    skipped_count = 0
+    for employee_name in names:
+        cursor = conn.execute('SELECT id FROM employees WHERE name = ?', (employee_name,))
+        if cursor.fetchone():
+            skipped_count += 1
+            continue
+        conn.execute('INSERT INTO employees (name, total_entries) VALUES (?, ?)', (employee_name, 0))
+        added_count += 1
+    return added_count, skipped_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--names', type=int, default=100_000)
+    parser.add_argument('--budget-ms', type=float, default=1000.0)
+    args = parser.parse_args()
+
+    workdir = prepare_environment()
+    from database import DatabaseManager
+    from excel_import import insert_employee_batches
+
+    existing = args.names // 2
+    # seed_employees names people "Caregiver 000000", so half the import overlaps
+    names = [f"Caregiver {i:06d}" for i in range(args.names)]
+    print(f"Importing {args.names} names ({existing} already present) in {workdir}")
+
+    results = {}
+    for label, importer in (('legacy per-name loop', legacy_import),
+                            ('set-based upsert', insert_employee_batches)):
+        manager = DatabaseManager(f"{workdir}/data/{label.split()[0]}.db")
+        with manager.get_connection() as conn:
+            seed_employees(conn, existing)
+            started = time.perf_counter()
+            added, skipped = importer(conn, iter(names))
+            manager.bump_data_version(conn)
+            conn.commit()
+            elapsed = (time.perf_counter() - started) * 1000
+        assert (added, skipped) == (args.names - existing, existing), (added, skipped)
+        results[label] = elapsed
+        print(f"{label:<25} {elapsed:9.1f} ms  added={added} skipped={skipped}")
+
+    if results['set-based upsert'] > args.budget_ms:
+        raise SystemExit(f"Upsert took {results['set-based upsert']:.1f} ms, budget is {args.budget_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON encoding of the largest API payload.
+
+Encodes the 5k-employee GET /api/employees payload with:
+
+  flask default    Flask's DefaultJSONProvider (stdlib, sorted keys, \\u escapes)
+  provider/json    FastJSONProvider with the stdlib fallback
+  provider/orjson  FastJSONProvider with orjson
+
+and reports encode time and body size, then end-to-end latency of the
+endpoint (response cache cleared per request) under each provider.
+Every tenth name carries an accent so the escaping cost shows up.
+"""
+import argparse
+import json
+
+from bench_common import prepare_environment, seed_employees, auth_headers, measure, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--employees', type=int, default=5_000)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = prepare_environment()
+    from flask.json.provider import DefaultJSONProvider
+    from app import app, limiter
+    from cache import response_cache
+    from database import db, fetch_records
+    from json_provider import FastJSONProvider
+
+    limiter.enabled = False
+    with db.get_connection() as conn:
+        seed_employees(conn, args.employees, activities_per_employee=2)
+        conn.execute("UPDATE employees SET name = name || ' Muñoz' WHERE id % 10 = 0")
+        conn.commit()
+    print(f"{args.employees} employees in {workdir}")
+
+    client = app.test_client()
+    headers = auth_headers()
+    providers = {
+        'flask default': DefaultJSONProvider(app),
+        'provider/json': FastJSONProvider(app, use_orjson=False),
+        'provider/orjson': FastJSONProvider(app),
+    }
+
+    with db.read_connection() as conn:
+        employees = fetch_records(conn, '''
+            SELECT id, name, email, phone, department, position, hire_date, photo_path,
+                   total_entries, is_active, created_at, updated_at
+            FROM employees WHERE is_active = 1 ORDER BY name, id
+        ''')
+    payloads = {
+        'employees': {'success': True, 'employees': employees, 'next_cursor': None},
+    }
+
+    with app.app_context():
+        for name, payload in payloads.items():
+            print(f"encode {name} payload")
+            for label, provider in providers.items():
+                body = provider.response(payload).get_data()
+                assert json.loads(body) == payload
+                report(f"  {label}", measure(lambda: provider.response(payload), args.iterations))
+                print(f"{'':<40} {len(body):,} bytes")
+
+    requests = {
+        'GET /api/employees': lambda: client.get('/api/employees', headers=headers),
+    }
+    default_provider = app.json
+    for name, call in requests.items():
+        print(name)
+        for label, provider in providers.items():
+            app.json = provider
+
+            def timed():
+                response_cache.clear()
+                assert call().status_code == 200
+            timed()
+            report(f"  {label}", measure(timed, args.iterations))
+    app.json = default_provider
+
+
+if __name__ == "__main__":
+    main()
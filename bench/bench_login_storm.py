@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Login storm: a shift change's worth of caregivers signing in at once.
+
+--users threads POST /login at the same moment while another thread keeps
+polling GET /api/analytics/dashboard. Reports login throughput, how many
+were shed with 503, and dashboard latency before and during the storm for:
+
+  inline  bcrypt on each request thread, no limit (the old behaviour)
+  pool    auth.password_hasher: PASSWORD_HASH_WORKERS threads, refusing
+          work beyond PASSWORD_HASH_QUEUE_LIMIT
+
+By default the app runs the way it is deployed: gunicorn with
+gunicorn.conf.py (WEB_CONCURRENCY gthread workers of WEB_THREADS threads)
+on --port, driven over HTTP. --server test-client runs it in this process
+through Flask's test client instead, one thread per request.
+
+--rounds sets the bcrypt cost (12 in production, ~250 ms per hash on
+server hardware); the default keeps a run short.
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from bench_common import REPO_DIR, prepare_environment, auth_headers, percentile
+
+PASSWORD = 'Shift-change-2025!'
+
+# The module gunicorn serves: the app with rate limits off and, for the
+# inline run, bcrypt called directly on the request thread
+STORM_APP = '''
+import os
+from app import app, limiter
+from auth import password_hasher
+
+limiter.enabled = False
+if os.environ['LOGIN_STORM_MODE'] == 'inline':
+    password_hasher._run = lambda fn, *args: fn(*args)
+'''
+
+
+def http_request(port, method, path, body=None, headers=None):
+    """Send one request on a fresh connection and return the status code"""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=600)
+    try:
+        connection.request(method, path, body=json.dumps(body) if body is not None else None,
+                           headers={'Content-Type': 'application/json', **(headers or {})})
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+
+class GunicornServer:
+    """gunicorn with the deployed settings, serving STORM_APP in one mode"""
+
+    def __init__(self, workdir, port, mode):
+        self.port = port
+        with open(os.path.join(workdir, 'storm_app.py'), 'w') as module:
+            module.write(STORM_APP)
+        self.log = open(os.path.join(workdir, f'gunicorn_{mode}.log'), 'w')
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'storm_app:app',
+             '--config', os.path.join(REPO_DIR, 'gunicorn.conf.py'),
+             '--pythonpath', REPO_DIR, '--bind', f'127.0.0.1:{port}'],
+            cwd=workdir, env={**os.environ, 'LOGIN_STORM_MODE': mode},
+            stdout=self.log, stderr=subprocess.STDOUT)
+        deadline = time.time() + 60
+        while True:
+            try:
+                if http_request(port, 'GET', '/health') == 200:
+                    break
+            except OSError:
+                pass
+            if self.process.poll() is not None or time.time() > deadline:
+                raise RuntimeError(f"gunicorn did not start, see {self.log.name}")
+            time.sleep(0.2)
+
+    def log_in(self, i):
+        return http_request(self.port, 'POST', '/login',
+                            {'email': f'caregiver{i}@homeinstead.com', 'password': PASSWORD})
+
+    def dashboard(self, headers):
+        return http_request(self.port, 'GET', '/api/analytics/dashboard', headers=headers)
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait()
+        self.log.close()
+
+
+class TestClientServer:
+    """The app in this process, called through Flask's test client"""
+
+    def __init__(self, mode):
+        from app import app, limiter
+        from auth import password_hasher
+        limiter.enabled = False
+        if mode == 'inline':
+            password_hasher._run = lambda fn, *fn_args: fn(*fn_args)
+        else:
+            password_hasher.__dict__.pop('_run', None)
+        self.app = app
+
+    def log_in(self, i):
+        return self.app.test_client().post('/login', json={'email': f'caregiver{i}@homeinstead.com',
+                                                           'password': PASSWORD}).status_code
+
+    def dashboard(self, headers):
+        return self.app.test_client().get('/api/analytics/dashboard', headers=headers).status_code
+
+    def close(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--baseline-seconds', type=float, default=2.0)
+    parser.add_argument('--server', choices=('gunicorn', 'test-client'), default='gunicorn')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    workdir = prepare_environment()
+    os.environ['BCRYPT_ROUNDS'] = str(args.rounds)
+    import bcrypt
+    from config import Config
+    from database import db
+
+    password_hash = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(args.rounds)).decode('utf-8')
+    with db.get_connection() as conn:
+        conn.executemany('INSERT INTO users (email, password_hash, role, name) VALUES (?, ?, ?, ?)',
+                         [(f'caregiver{i}@homeinstead.com', password_hash, 'viewer', f'Caregiver {i}')
+                          for i in range(args.users)])
+        conn.commit()
+    model = (f"gunicorn, {os.getenv('WEB_CONCURRENCY', 2)} gthread workers x "
+             f"{Config.WEB_THREADS} threads" if args.server == 'gunicorn' else "test client")
+    print(f"{args.users} simultaneous logins, bcrypt cost {args.rounds}, {model}, "
+          f"pool of {Config.PASSWORD_HASH_WORKERS} per process (queue limit "
+          f"{Config.PASSWORD_HASH_QUEUE_LIMIT}), in {workdir}")
+    dashboard_headers = auth_headers()
+
+    for label in ('inline', 'pool'):
+        server = GunicornServer(workdir, args.port, label) if args.server == 'gunicorn' \
+            else TestClientServer(label)
+        phase = ['before']
+        dashboard = []
+        stop = threading.Event()
+
+        def poll_dashboard():
+            while not stop.is_set():
+                started = time.perf_counter()
+                server.dashboard(dashboard_headers)
+                dashboard.append((phase[0], (time.perf_counter() - started) * 1000))
+                time.sleep(0.01)
+
+        results = []
+        barrier = threading.Barrier(args.users)
+
+        def log_in(i):
+            barrier.wait()
+            started = time.perf_counter()
+            status = server.log_in(i)
+            results.append((status, (time.perf_counter() - started) * 1000))
+
+        try:
+            poller = threading.Thread(target=poll_dashboard)
+            poller.start()
+            time.sleep(args.baseline_seconds)
+            phase[0] = 'storm'
+            started = time.perf_counter()
+            threads = [threading.Thread(target=log_in, args=(i,)) for i in range(args.users)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            stop.set()
+            poller.join()
+        finally:
+            stop.set()
+            server.close()
+
+        ok = [ms for status, ms in results if status == 200]
+        shed = [ms for status, ms in results if status == 503]
+        other = len(results) - len(ok) - len(shed)
+        print(f"{label}: {len(ok)} logged in, {len(shed)} shed with 503, {other} other, "
+              f"storm over in {elapsed:.1f} s ({len(ok) / elapsed:.1f} logins/s)")
+        if ok:
+            print(f"  login latency         p50={percentile(ok, 50):9.1f} ms  p99={percentile(ok, 99):9.1f} ms")
+        if shed:
+            print(f"  503 latency           p50={percentile(shed, 50):9.1f} ms  p99={percentile(shed, 99):9.1f} ms")
+        for name in ('before', 'storm'):
+            samples = [ms for sample_phase, ms in dashboard if sample_phase == name]
+            if samples:
+                print(f"  dashboard {name:<11} p50={percentile(samples, 50):9.1f} ms  "
+                      f"p99={percentile(samples, 99):9.1f} ms  max={max(samples):9.1f} ms  (n={len(samples)})")
+
+
+if __name__ == "__main__":
+    main()
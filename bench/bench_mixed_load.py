@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Mixed read/write load test: GET latency before, during and after a large import.
+
+Reader threads page through GET /api/employees (with a random search term,
+so every request reaches the database) and poll GET /api/analytics/dashboard,
+while writer threads award entries through POST /api/employee/<id>/add_entry.
+Midway, another process (standing in for a job worker in a second gunicorn
+worker) imports --import-names new employees in one transaction, holding
+SQLite's write lock for the whole insert. It rolls back at the end so
+every phase reads the same roster.
+
+--reads-via-writer routes the GET endpoints through the writer connection,
+as when every endpoint shared one connection type, for comparison.
+
+The importer runs niced so that on a small box the numbers show lock
+contention more than two processes sharing a core.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import threading
+import time
+
+from bench_common import prepare_environment, seed_employees, auth_headers, percentile
+
+SEARCH_TERMS = ['00', '12', '345', '9', '4', '77', 'Care', '1']
+
+
+def import_worker(names, ready):
+    os.nice(5)
+    from database import db
+    from excel_import import insert_employee_batches
+    ready.set()
+    started = time.perf_counter()
+    with db.get_connection() as conn:
+        insert_employee_batches(conn, (f"Imported Person {i:07d}" for i in range(names)))
+        print(f"  importer held the write lock for {time.perf_counter() - started:.2f} s ({names} names)")
+        conn.rollback()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--employees', type=int, default=20_000)
+    parser.add_argument('--import-names', type=int, default=100_000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--write-interval', type=float, default=0.05, help="seconds between awards per writer")
+    parser.add_argument('--phase-seconds', type=float, default=3.0, help="length of the before/after phases")
+    parser.add_argument('--reads-via-writer', action='store_true')
+    args = parser.parse_args()
+
+    workdir = prepare_environment()
+    from app import app, limiter
+    from database import db
+
+    limiter.enabled = False
+    with db.get_connection() as conn:
+        seed_employees(conn, args.employees, activities_per_employee=2)
+        db.bump_data_version(conn)
+        conn.commit()
+    if args.reads_via_writer:
+        db.read_connection = db.get_connection
+    mode = 'reads via writer connection' if args.reads_via_writer else 'reads on read-only pool'
+    print(f"{args.employees} employees, {args.readers} readers, {args.writers} writers, {mode}, in {workdir}")
+
+    headers = auth_headers()
+    phase = ['before']
+    reads, writes, failures = [], [], []
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def reader():
+        client = app.test_client()
+        rng = random.Random()
+        while not stop.is_set():
+            if rng.random() < 0.2:
+                url = '/api/analytics/dashboard'
+            else:
+                url = f'/api/employees?limit=50&q={rng.choice(SEARCH_TERMS)}{rng.randint(0, 99)}'
+            started = time.perf_counter()
+            response = client.get(url, headers=headers)
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                reads.append((phase[0], elapsed))
+                if response.status_code != 200:
+                    failures.append((phase[0], url, response.status_code))
+
+    def writer():
+        client = app.test_client()
+        rng = random.Random()
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = client.post(f'/api/employee/{rng.randint(1, args.employees)}/add_entry', headers=headers,
+                                   json={'activity_name': 'Load test', 'activity_category': 'load',
+                                         'entries_awarded': 1})
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                writes.append((phase[0], elapsed))
+                if response.status_code != 200:
+                    failures.append((phase[0], 'add_entry', response.status_code))
+            time.sleep(args.write_interval)
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer) for _ in range(args.writers)]
+    for thread in threads:
+        thread.start()
+
+    time.sleep(args.phase_seconds)
+    context = multiprocessing.get_context('spawn')
+    ready = context.Event()
+    importer = context.Process(target=import_worker, args=(args.import_names, ready))
+    importer.start()
+    ready.wait()
+    phase[0] = 'during import'
+    importer.join()
+    phase[0] = 'after'
+    time.sleep(args.phase_seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    for label, samples in (('GET', reads), ('POST add_entry', writes)):
+        for name in ('before', 'during import', 'after'):
+            latencies = [elapsed for sample_phase, elapsed in samples if sample_phase == name]
+            if latencies:
+                print(f"{label:<15} {name:<14} p50={percentile(latencies, 50):8.2f} ms  "
+                      f"p99={percentile(latencies, 99):8.2f} ms  max={max(latencies):8.2f} ms  (n={len(latencies)})")
+    print(f"failed requests: {len(failures)}" + (f" e.g. {failures[:3]}" if failures else ""))
+
+
+if __name__ == "__main__":
+    main()
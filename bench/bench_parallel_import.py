@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Benchmark multi-sheet Excel parsing: one worker process vs one per CPU.
+
+Builds a workbook with one sheet per office (like the regional exports)
+and times extract_workbooks() with sheets=all both ways.
+"""
+import argparse
+import os
+import time
+
+from bench_common import prepare_environment, DEPARTMENTS
+
+FIRST_NAMES = ['Maria', 'James', 'Linda', 'Robert', 'Patricia', 'Michael', 'Susan', 'David']
+
+
+def build_office_workbook(path, offices, rows_per_office):
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    for office in range(offices):
+        sheet = workbook.create_sheet(f'Office {office + 1}')
+        sheet.append(['Employee ID', 'First Name', 'Last Name', 'Department'])
+        for i in range(rows_per_office):
+            sheet.append([office * rows_per_office + i, FIRST_NAMES[i % len(FIRST_NAMES)],
+                          f"Office{office}Lastname{i:06d}", DEPARTMENTS[i % len(DEPARTMENTS)]])
+    workbook.save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--offices', type=int, default=4)
+    parser.add_argument('--rows', type=int, default=25_000, help="rows per office sheet")
+    args = parser.parse_args()
+
+    workdir = prepare_environment()
+    from excel_import import extract_workbooks, merge_names
+
+    path = os.path.join(workdir, 'regions.xlsx')
+    build_office_workbook(path, args.offices, args.rows)
+    files = [{'filepath': path, 'filename': 'regions.xlsx'}]
+    print(f"{args.offices} sheets x {args.rows} rows, {os.cpu_count()} CPUs, in {workdir}")
+
+    for label, processes in (('1 process', 1), (f'{os.cpu_count()} processes', None)):
+        started = time.perf_counter()
+        results = extract_workbooks(files, all_sheets=True, max_processes=processes)
+        names = list(merge_names(results))
+        elapsed = time.perf_counter() - started
+        slowest = max(result['seconds'] for result in results)
+        print(f"{label:<15} {elapsed:7.2f} s wall  (slowest sheet {slowest:.2f} s, {len(names)} names)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Benchmark the server-side weighted draw with 100k participants: sampler
+build and per-draw cost, plus POST /api/raffle/draw end to end compared
+with the /api/raffle/conduct preview (totals and leaderboard only).
+"""
+import argparse
+import random
+import time
+
+from bench_common import prepare_environment, seed_employees, auth_headers, measure, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--participants', type=int, default=100_000)
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = prepare_environment()
+    from database import db
+    from app import app, limiter
+    from raffle import SeededRandom, FenwickSampler
+
+    limiter.enabled = False
+    rng = random.Random(7)
+    with db.get_connection() as conn:
+        seed_employees(conn, args.participants)
+        conn.executemany('UPDATE employees SET total_entries = ? WHERE id = ?',
+                         [(rng.randint(1, 40), i) for i in range(1, args.participants + 1)])
+        conn.commit()
+    print(f"Seeded {args.participants} participants in {workdir}")
+
+    weights = [rng.randint(1, 40) for _ in range(args.participants)]
+    started = time.perf_counter()
+    sampler = FenwickSampler(weights)
+    print(f"{'Fenwick build':<40} {(time.perf_counter() - started) * 1000:9.2f} ms")
+
+    seeded = SeededRandom()
+    draws = 100_000
+    started = time.perf_counter()
+    for _ in range(draws):
+        sampler.sample(seeded)
+    print(f"{'sample() per draw':<40} {(time.perf_counter() - started) / draws * 1e6:9.2f} us")
+
+    client = app.test_client()
+    headers = auth_headers()
+    conduct = client.post('/api/raffle/conduct', headers=headers, json={})
+    draw = client.post('/api/raffle/draw', headers=headers, json={})
+    assert draw.status_code == 200, draw.data[:200]
+    print(f"{'/api/raffle/conduct payload':<40} {len(conduct.data) / 1024:9.1f} KiB")
+    print(f"{'/api/raffle/draw payload':<40} {len(draw.data) / 1024:9.1f} KiB")
+
+    report('POST /api/raffle/conduct',
+           measure(lambda: client.post('/api/raffle/conduct', headers=headers, json={}), args.iterations))
+    report('POST /api/raffle/draw (recorded)',
+           measure(lambda: client.post('/api/raffle/draw', headers=headers, json={}), args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Throughput of the rate-limit storage hot path.
+
+Times limiter.hit() - the call Flask-Limiter makes for every request -
+against "100 per hour" limits keyed on --clients client addresses, for:
+
+  memory  limits' in-memory storage (per process, the old behaviour)
+  sqlite  rate_limit_storage.SQLiteStorage (shared across processes)
+
+with both the moving-window and fixed-window strategies: per-hit latency
+in one process, then total hits/s with --processes processes hitting the
+same storage at once (for memory, each process has its own counts).
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import STRATEGIES
+
+from bench_common import measure, report
+import rate_limit_storage  # noqa: F401
+
+LIMIT = parse('100 per hour')
+
+
+def hammer(uri, strategy, clients, seconds, barrier, results):
+    limiter = STRATEGIES[strategy](storage_from_string(uri))
+    addresses = [f'10.0.{i // 256}.{i % 256}' for i in range(clients)]
+    barrier.wait()
+    hits = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        limiter.hit(LIMIT, random.choice(addresses))
+        hits += 1
+    results.put(hits)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=1_000)
+    parser.add_argument('--iterations', type=int, default=20_000)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='raffle_bench_')
+    addresses = [f'10.0.{i // 256}.{i % 256}' for i in range(args.clients)]
+    print(f"{args.clients} clients, limit {LIMIT}, in {workdir}")
+
+    for strategy in ('moving-window', 'fixed-window'):
+        for backend in ('memory', 'sqlite'):
+            uri = 'memory://' if backend == 'memory' else \
+                'sqlite://' + os.path.join(workdir, f'{strategy}.db')
+            limiter = STRATEGIES[strategy](storage_from_string(uri))
+            report(f"{strategy} {backend} hit()",
+                   measure(lambda: limiter.hit(LIMIT, random.choice(addresses)), args.iterations))
+
+            context = multiprocessing.get_context('fork')
+            barrier = context.Barrier(args.processes)
+            results = context.Queue()
+            processes = [context.Process(target=hammer, args=(uri, strategy, args.clients, args.seconds,
+                                                              barrier, results))
+                         for _ in range(args.processes)]
+            for process in processes:
+                process.start()
+            hits = sum(results.get() for _ in processes)
+            for process in processes:
+                process.join()
+            print(f"{'':<40} {hits / args.seconds:,.0f} hits/s across {args.processes} processes")
+
+
+if __name__ == "__main__":
+    main()
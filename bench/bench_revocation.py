@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Cost of the token revocation check with a large revocation list.
+
+Revokes --revoked tokens (logouts across a day of shifts) plus a handful
+of whole users, then reports:
+
+  load         a fresh worker reading every revocation into memory
+  refresh      picking up one new revocation, as each worker does at most
+               every TOKEN_REVOCATION_REFRESH_INTERVAL seconds
+  verify_token a cached token with and without the revocation check
+  request      GET /api/analytics/dashboard end to end (cached response)
+"""
+import argparse
+import secrets
+import time
+
+from bench_common import prepare_environment, auth_headers, measure, report
+
+
+def per_call_us(fn, iterations):
+    best = float('inf')
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        best = min(best, time.perf_counter() - started)
+    return best / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--revoked', type=int, default=100_000)
+    parser.add_argument('--iterations', type=int, default=20_000)
+    args = parser.parse_args()
+
+    workdir = prepare_environment()
+    from app import app, limiter
+    from auth import AuthManager, revocations
+    from database import db
+    from revocation import RevocationList
+
+    limiter.enabled = False
+    now = time.time()
+    with db.get_connection() as conn:
+        conn.executemany('''
+            INSERT INTO token_revocations (jti, user_id, revoked_at, expires_at, reason)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(secrets.token_urlsafe(16), i % 500, now, now + 28800, 'logout') for i in range(args.revoked)])
+        conn.executemany('''
+            INSERT INTO token_revocations (jti, user_id, revoked_at, expires_at, reason)
+            VALUES (NULL, ?, ?, ?, 'account disabled')
+        ''', [(user_id, now, now + 28800) for user_id in range(1000, 1050)])
+        conn.commit()
+    print(f"{args.revoked:,} revoked tokens and 50 revoked users in {workdir}")
+
+    fresh = RevocationList(db)
+    started = time.perf_counter()
+    fresh.refresh()
+    print(f"{'load into a fresh worker':<40} {(time.perf_counter() - started) * 1000:8.1f} ms")
+    revocations.refresh()
+
+    def refresh_one():
+        fresh.revoke(secrets.token_urlsafe(16), 1, time.time() + 60, 'logout')
+    report('revoke + incremental refresh', measure(refresh_one, 200))
+
+    headers = auth_headers()
+    token = headers['Authorization'].split(' ')[1]
+    assert AuthManager.verify_token(token) is not None
+    is_revoked = revocations.is_revoked
+    checked = per_call_us(lambda: AuthManager.verify_token(token), args.iterations)
+    revocations.is_revoked = lambda claims: False
+    try:
+        baseline = per_call_us(lambda: AuthManager.verify_token(token), args.iterations)
+    finally:
+        revocations.is_revoked = is_revoked
+    print(f"{'verify_token, no revocation check':<40} {baseline:8.2f} us per call")
+    print(f"{'verify_token, with revocation check':<40} {checked:8.2f} us per call "
+          f"(+{checked - baseline:.2f} us)")
+
+    client = app.test_client()
+    assert client.get('/api/analytics/dashboard', headers=headers).status_code == 200
+    report('GET /api/analytics/dashboard', measure(
+        lambda: client.get('/api/analytics/dashboard', headers=headers), 2_000))
+
+
+if __name__ == "__main__":
+    main()
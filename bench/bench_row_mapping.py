@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark the tuple-row query layer on the employees and analytics endpoints.
+
+before: rows come back as sqlite3.Row and are copied with dict(row), as
+        the endpoints did before database.fetch_records.
+after:  fetch_records / iter_keyed_records zip plain tuples into dicts.
+
+The response cache is cleared before every request so each one runs the
+view. Reports latency, throughput and the tracemalloc peak of one
+request, and the peak while mapping the full employee list alone.
+"""
+import argparse
+import time
+import tracemalloc
+
+from bench_common import prepare_environment, seed_employees, auth_headers, measure, report
+
+ENDPOINTS = [
+    '/api/employees',
+    '/api/employees?limit=100&include=activities',
+    '/api/analytics/dashboard',
+]
+
+
+def legacy_fetch_records(conn, sql, params=()):
+    return [dict(row) for row in conn.execute(sql, params)]
+
+
+def legacy_iter_keyed_records(conn, sql, params=()):
+    for row in conn.execute(sql, params):
+        record = dict(row)
+        yield record.pop(row.keys()[0]), record
+
+
+def traced_peak(fn):
+    """tracemalloc peak in KB over one call"""
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--employees', type=int, default=5_000)
+    parser.add_argument('--activities', type=int, default=20)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = prepare_environment()
+    import app as app_module
+    import database
+    from app import app, limiter
+    from cache import response_cache
+    from database import db
+
+    limiter.enabled = False
+    print(f"Seeding {args.employees} employees x {args.activities} activities in {workdir}...")
+    with db.get_connection() as conn:
+        seed_employees(conn, args.employees, args.activities)
+
+    client = app.test_client()
+    headers = auth_headers()
+
+    def request(url):
+        def call():
+            response_cache.clear()
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200, response.get_data(as_text=True)
+            return response
+        return call
+
+    implementations = {
+        'before': (legacy_fetch_records, legacy_iter_keyed_records),
+        'after': (database.fetch_records, database.iter_keyed_records),
+    }
+
+    def use(label):
+        fetch, keyed = implementations[label]
+        app_module.fetch_records = database.fetch_records = fetch
+        app_module.iter_keyed_records = keyed
+
+    bodies = {}
+    for label in implementations:
+        use(label)
+        bodies[label] = [request(url)().get_json() for url in ENDPOINTS]
+    assert bodies['before'] == bodies['after'], "tuple rows changed a response"
+
+    for url in ENDPOINTS:
+        print(url)
+        for label in implementations:
+            use(label)
+            call = request(url)
+            call()
+            started = time.perf_counter()
+            samples = measure(call, args.iterations)
+            elapsed = time.perf_counter() - started
+            report(f"  {label}", samples)
+            print(f"{'':<40} {args.iterations / elapsed:7.0f} req/s  peak={traced_peak(call):8.0f} KB")
+
+    print("mapping the employee list alone")
+    query = 'SELECT * FROM employees WHERE is_active = 1 ORDER BY name, id'
+    with db.read_connection() as conn:
+        for label, (fetch, _) in implementations.items():
+            samples = measure(lambda: fetch(conn, query), args.iterations)
+            report(f"  {label}", samples)
+            print(f"{'':<40} peak={traced_peak(lambda: fetch(conn, query)):8.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark repeated ~5 MB Excel uploads through the request path.
+
+legacy:  werkzeug's default 500KB spool, file.read() for the size check,
+         seek, file.save() into UPLOAD_PATH, reopen from disk, remove.
+current: POST /api/import_excel (spooled in memory, size-checked in
+         place, written once in 1 MiB chunks) plus the job reading it back.
+
+Workbook parsing itself is identical in both and left out. Read/write
+syscalls and bytes come from /proc/thread-self/io (Linux only).
+"""
+import argparse
+import io
+import os
+import statistics
+import time
+
+from bench_common import prepare_environment, auth_headers, report
+
+
+def thread_io():
+    with open('/proc/thread-self/io') as f:
+        return {key: int(value) for key, value in (line.split(': ') for line in f)}
+
+
+def run(label, fn, iterations):
+    samples, deltas = [], []
+    for _ in range(iterations):
+        before = thread_io()
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+        after = thread_io()
+        deltas.append({key: after[key] - before[key] for key in after})
+    report(label, samples)
+    mean = {key: statistics.mean(d[key] for d in deltas) for key in ('syscr', 'syscw', 'rchar', 'wchar')}
+    print(f"{'':<40} read syscalls={mean['syscr']:.0f}  write syscalls={mean['syscw']:.0f}  "
+          f"read={mean['rchar'] / 2**20:.1f} MiB  written={mean['wchar'] / 2**20:.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=165_000, help="rows in the synthetic workbook (~4.7 MiB)")
+    parser.add_argument('--iterations', type=int, default=30)
+    args = parser.parse_args()
+
+    workdir = prepare_environment()
+    from bench_excel_import import build_workbook
+    from flask import Flask, request, jsonify
+    from werkzeug.utils import secure_filename
+    from app import app, limiter, jobs
+
+    limiter.enabled = False
+    # Keep the dispatcher from claiming the queued imports mid-measurement
+    jobs.workers = 0
+
+    path = os.path.join(workdir, 'upload.xlsx')
+    build_workbook(path, args.rows)
+    with open(path, 'rb') as f:
+        payload = f.read()
+    print(f"Workbook: {len(payload) / 2**20:.2f} MiB ({args.rows} rows) in {workdir}")
+
+    # The old handler on a plain Flask app, so it gets werkzeug's default stream factory
+    legacy_app = Flask('legacy_uploads')
+    upload_dir = os.path.join(workdir, 'uploads')
+
+    @legacy_app.route('/legacy_import', methods=['POST'])
+    def legacy_import():
+        file = request.files['file']
+        file_content = file.read()
+        if len(file_content) > app.config['MAX_FILE_SIZE']:
+            return jsonify({'success': False, 'error': 'File too large'}), 400
+        file.seek(0)
+        filepath = os.path.join(upload_dir, secure_filename(file.filename))
+        file.save(filepath)
+        try:
+            with open(filepath, 'rb') as saved:
+                saved.read()
+        finally:
+            os.remove(filepath)
+        return jsonify({'success': True})
+
+    legacy_client = legacy_app.test_client()
+    client = app.test_client()
+    headers = auth_headers()
+
+    def legacy_upload():
+        response = legacy_client.post('/legacy_import', data={'file': (io.BytesIO(payload), 'hr.xlsx')},
+                                      content_type='multipart/form-data')
+        assert response.status_code == 200, response.data
+
+    def current_upload():
+        response = client.post('/api/import_excel', headers=headers,
+                               data={'file': (io.BytesIO(payload), 'hr.xlsx')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 202, response.data
+        # What the job does before parsing: open the saved upload, then remove it
+        job = jobs.get(response.get_json()['job_id'])
+        for file in job['payload']['files']:
+            with open(file['filepath'], 'rb') as saved:
+                saved.read()
+            os.remove(file['filepath'])
+
+    run('legacy save-to-disk upload', legacy_upload, args.iterations)
+    run('spooled upload, single write', current_upload, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Optional
+from flask import request, make_response, current_app
+from database import db
+
+class ResponseCache:
+    """In-process cache of serialized JSON responses keyed on the shared data version"""
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def etag_for(key: str, version: int) -> str:
+        """Strong ETag for a cache key at a data version.
+
+        Derived only from the key and version so any worker can answer a
+        conditional request without rebuilding the body.
+        """
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        return f"v{version}-{digest}"
+
+    def get(self, key: str, version: int) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, version: int, body: bytes):
+        with self._lock:
+            self._entries[key] = (version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+response_cache = ResponseCache()
+
+def versioned_response(f):
+    """Decorator serving a GET endpoint from the response cache with ETag / 304 support"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        version = db.get_data_version()
+        key = request.full_path
+        etag = response_cache.etag_for(key, version)
+
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            body = response_cache.get(key, version)
+            if body is None:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                response_cache.set(key, version, response.get_data())
+            else:
+                response = current_app.response_class(body, mimetype='application/json')
+
+        response.set_etag(etag)
+        # Let browsers keep the body but revalidate it on every poll
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    return decorated_function
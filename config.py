@@ -15,6 +15,39 @@ class Config:
     # Database
     DATABASE_PATH = os.getenv('DATABASE_PATH', './data/raffle_database.db')
     BACKUP_PATH = os.getenv('BACKUP_PATH', './backups')
+    # Online backups through the SQLite backup API (see backup.py)
+    BACKUP_COMPRESSION = os.getenv('BACKUP_COMPRESSION', 'gzip')  # zstd (needs zstandard, else gzip), gzip or none
+    BACKUP_RETENTION = int(os.getenv('BACKUP_RETENTION', 20))  # newest backups kept, 0 keeps every one
+    BACKUP_VERIFY = os.getenv('BACKUP_VERIFY', 'quick')  # quick, full or none
+    BACKUP_PAGES_PER_STEP = int(os.getenv('BACKUP_PAGES_PER_STEP', 1024))  # 4MB at the default page size
+    BACKUP_STEP_PAUSE = float(os.getenv('BACKUP_STEP_PAUSE', 0.001))  # seconds yielded between steps
+    
+    # Database connection pools (per worker process): read-only connections
+    # for queries plus a single writer connection that mutations queue for
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 8))  # read-only connections
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))  # seconds to wait for a free (or the writer) connection
+    DB_POOL_IDLE_TIMEOUT = float(os.getenv('DB_POOL_IDLE_TIMEOUT', 300))  # seconds before an idle connection closes
+    DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', 30))  # seconds idle before a SELECT 1 probe
+    # PRAGMAs applied once to every pooled connection
+    DB_SYNCHRONOUS = os.getenv('DB_SYNCHRONOUS', 'NORMAL')  # NORMAL is durable across app crashes under WAL
+    DB_CACHE_SIZE = int(os.getenv('DB_CACHE_SIZE', -16384))  # negative = KiB, so 16MB per connection
+    DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', 268435456))  # 256MB
+    DB_TEMP_STORE = os.getenv('DB_TEMP_STORE', 'MEMORY')
+    DB_CACHED_STATEMENTS = int(os.getenv('DB_CACHED_STATEMENTS', 256))  # prepared statements kept per connection
+    
+    # Audit log writer
+    AUDIT_SYNCHRONOUS = os.getenv('AUDIT_SYNCHRONOUS', 'false').lower() == 'true'
+    AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', 100))
+    AUDIT_FLUSH_INTERVAL = int(os.getenv('AUDIT_FLUSH_INTERVAL', 500))  # milliseconds
+    AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', 10000))
+    
+    # Background jobs
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 1))
+    JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 2))  # seconds
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+    
+    # API responses are encoded with orjson when it is installed; false forces the stdlib encoder
+    JSON_USE_ORJSON = os.getenv('JSON_USE_ORJSON', 'true').lower() == 'true'
     
     # Application
     APP_NAME = os.getenv('APP_NAME', 'Home Instead Raffle Dashboard')
@@ -22,6 +55,13 @@ class Config:
     
     # File Upload
     MAX_FILE_SIZE = int(os.getenv('MAX_FILE_SIZE', 5242880))  # 5MB default
+    MAX_IMPORT_FILES = int(os.getenv('MAX_IMPORT_FILES', 5))  # workbooks per Excel import
+    # Flask rejects larger request bodies with 413 while streaming them in
+    MAX_CONTENT_LENGTH = MAX_FILE_SIZE * MAX_IMPORT_FILES + 64 * 1024  # room for multipart framing
+    # Uploads stay in memory up to this size before spilling to a temp file
+    UPLOAD_SPOOL_THRESHOLD = int(os.getenv('UPLOAD_SPOOL_THRESHOLD', 8388608))  # 8MB
+    # Worker processes for multi-sheet imports (default: one per CPU)
+    IMPORT_PROCESSES = int(os.getenv('IMPORT_PROCESSES', 0)) or None
     UPLOAD_PATH = os.getenv('UPLOAD_PATH', './uploads')
     ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'png', 'jpg', 'jpeg', 'gif'}
     
@@ -29,6 +69,22 @@ class Config:
     SESSION_TIMEOUT = int(os.getenv('SESSION_TIMEOUT', 3600000))  # 1 hour
     MAX_LOGIN_ATTEMPTS = int(os.getenv('MAX_LOGIN_ATTEMPTS', 5))
     LOCKOUT_TIME = int(os.getenv('LOCKOUT_TIME', 900000))  # 15 minutes
+    TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 4096))  # verified JWTs remembered per worker
+    TOKEN_REVOCATION_REFRESH_INTERVAL = float(os.getenv('TOKEN_REVOCATION_REFRESH_INTERVAL', 1))  # seconds for a revocation to reach other workers
+    # Password hashing runs on a small thread pool per worker; beyond the
+    # queue limit logins are refused with 503 rather than left waiting.
+    # The limit stays below the request threads per worker (WEB_THREADS, see
+    # gunicorn.conf.py) so a login storm can't occupy all of them
+    BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))  # existing hashes are upgraded at next login
+    WEB_THREADS = int(os.getenv('WEB_THREADS', 8))
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv('PASSWORD_HASH_QUEUE_LIMIT',
+                                              max(1, WEB_THREADS - 2)))  # queued or running hashes
+    # Rate limits are counted in a SQLite file every worker on the host shares
+    # (see rate_limit_storage.py); memory:// counts per worker instead
+    RATELIMIT_STORAGE_URI = os.getenv('RATELIMIT_STORAGE_URI') or \
+        'sqlite://' + os.path.join(os.path.dirname(DATABASE_PATH), 'ratelimits.db')
+    RATELIMIT_STRATEGY = os.getenv('RATELIMIT_STRATEGY', 'moving-window')  # or fixed-window
     
     # Email Configuration
     MAIL_SERVER = os.getenv('SMTP_HOST', 'smtp.gmail.com')
@@ -72,6 +128,8 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     DATABASE_PATH = ':memory:'
+    RATELIMIT_STORAGE_URI = 'memory://'
+    AUDIT_SYNCHRONOUS = True
     SECRET_KEY = 'testing-secret-key'
     JWT_SECRET = 'testing-jwt-secret'
 
@@ -81,4 +139,8 @@ config = {
     'production': ProductionConfig,
     'testing': TestingConfig,
     'default': DevelopmentConfig
-}
\ No newline at end of file
+}
+
+def active_config():
+    """The configuration class FLASK_ENV selects"""
+    return config.get(os.getenv('FLASK_ENV', 'development'), config['default'])
\ No newline at end of file
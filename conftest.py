@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Shared test setup: one scratch environment and one app for the whole session.
+
+config, database and app read DATABASE_PATH and friends once, when they are
+first imported, and app.py creates its directories and migrates
+raffle_data.json relative to the working directory. pytest_configure
+therefore points all of them at a temporary directory before any test
+module is collected, so no test depends on which file happened to import
+the app first. Test files also run as scripts; their __main__ blocks call
+scratch_environment() themselves. The benchmarks in bench/ share these
+helpers through bench_common.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+ADMIN = {'id': 1, 'email': 'homecare@homeinstead.com', 'role': 'admin'}
+
+
+def use_database(db_path):
+    """Point Config at db_path and chdir next to it.
+
+    Must run before config, database, auth or app are imported; spawned
+    worker processes call it with the parent's db.db_path.
+    """
+    workdir = os.path.dirname(os.path.dirname(db_path))
+    os.environ['DATABASE_PATH'] = db_path
+    os.environ['BACKUP_PATH'] = os.path.join(workdir, 'backups')
+    os.environ['UPLOAD_PATH'] = os.path.join(workdir, 'uploads')
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+
+
+def scratch_environment(prefix='raffle_test_', db_name='raffle_test.db'):
+    """Create a temporary working directory and use a fresh database inside it"""
+    workdir = tempfile.mkdtemp(prefix=prefix)
+    use_database(os.path.join(workdir, 'data', db_name))
+    return workdir
+
+
+def app_client():
+    """Test client for the app with rate limiting off"""
+    from app import app, limiter
+    limiter.enabled = False
+    return app.test_client()
+
+
+def admin_headers():
+    """Authorization header carrying a token for the default admin"""
+    from auth import AuthManager
+    return {'Authorization': f'Bearer {AuthManager.generate_token(ADMIN)}'}
+
+
+def pytest_configure(config):
+    scratch_environment()
+
+
+@pytest.fixture(scope='session')
+def client():
+    return app_client()
+
+
+@pytest.fixture(scope='session')
+def auth_headers(client):
+    return admin_headers()
+
+
+@pytest.fixture(scope='session')
+def db(client):
+    """The app's DatabaseManager, with the app (and its job handlers) imported"""
+    from database import db
+    return db
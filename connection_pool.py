@@ -0,0 +1,216 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+from urllib.request import pathname2url
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool's checkout timeout"""
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections with checkout/checkin.
+
+    At most max_size connections are open; a checkout beyond that waits up
+    to timeout seconds for one to be checked back in. PRAGMAs are applied
+    once when a connection is opened. Idle connections are closed after
+    idle_timeout, and one that has sat idle longer than
+    health_check_interval is probed with SELECT 1 before being handed out.
+
+    Checkouts are re-entrant per thread: a nested checkout gets the
+    connection the thread already holds, so code that opens a connection
+    inside another caller's transaction keeps sharing that transaction.
+    A connection is rolled back if it comes back with a transaction open.
+
+    read_only connections are opened with a mode=ro URI and query_only,
+    so nothing on them can take the write lock. cached_statements sizes
+    each connection's prepared statement cache, keyed on the SQL text.
+    """
+
+    def __init__(self, db_path: str, max_size: int = 8, timeout: float = 30.0,
+                 idle_timeout: float = 300.0, health_check_interval: float = 30.0,
+                 pragmas: Optional[Dict[str, object]] = None, busy_timeout: float = 30.0,
+                 read_only: bool = False, cached_statements: int = 128):
+        self.db_path = db_path
+        self.read_only = read_only
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.pragmas = dict(pragmas or {})
+        if read_only:
+            self.pragmas['query_only'] = 'ON'
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self._condition = threading.Condition()
+        self._local = threading.local()
+        self._idle = deque()  # (connection, last checkin), most recently used on the right
+        self._open = 0
+        self._pid = os.getpid()
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+            'opened': 0,
+            'closed': 0,
+            'health_check_failures': 0
+        }
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of the block"""
+        held = getattr(self._local, 'connection', None)
+        if held is not None:
+            self._local.depth += 1
+            try:
+                yield held
+            finally:
+                self._local.depth -= 1
+            return
+
+        connection = self._checkout()
+        self._local.connection = connection
+        self._local.depth = 1
+        try:
+            yield connection
+        finally:
+            self._local.connection = None
+            self._local.depth = 0
+            self._checkin(connection)
+
+    def metrics(self) -> Dict:
+        with self._condition:
+            stats = dict(self._stats)
+            stats['open'] = self._open
+            stats['idle'] = len(self._idle)
+        stats['in_use'] = stats['open'] - stats['idle']
+        stats['max_size'] = self.max_size
+        stats['avg_wait_ms'] = round(stats['total_wait_ms'] / stats['waits'], 3) if stats['waits'] else 0.0
+        stats['total_wait_ms'] = round(stats['total_wait_ms'], 3)
+        stats['max_wait_ms'] = round(stats['max_wait_ms'], 3)
+        return stats
+
+    def close(self):
+        """Close every idle connection; checked-out ones close when returned"""
+        with self._condition:
+            while self._idle:
+                self._discard(self._idle.popleft()[0])
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.read_only:
+            database = f'file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro'
+        else:
+            database = self.db_path
+        connection = sqlite3.connect(database, timeout=self.busy_timeout, check_same_thread=False,
+                                     uri=self.read_only, cached_statements=self.cached_statements)
+        try:
+            connection.row_factory = sqlite3.Row
+            for name, value in self.pragmas.items():
+                connection.execute(f'PRAGMA {name}={value}')
+        except Exception:
+            connection.close()
+            raise
+        return connection
+
+    def _discard(self, connection: sqlite3.Connection):
+        """Close a connection and give up its slot; call with the lock held"""
+        self._open -= 1
+        self._stats['closed'] += 1
+        try:
+            connection.close()
+        except sqlite3.Error:
+            pass
+
+    def _reset_after_fork(self):
+        # Connections must not cross a fork; a gunicorn worker starts with an
+        # empty pool of its own and abandons what the master had opened
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle.clear()
+            self._open = 0
+            self._local = threading.local()
+
+    def _healthy(self, connection: sqlite3.Connection) -> bool:
+        try:
+            connection.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _checkout(self) -> sqlite3.Connection:
+        started = None
+        with self._condition:
+            self._reset_after_fork()
+            while True:
+                now = time.monotonic()
+                while self._idle:
+                    connection, last_used = self._idle.pop()
+                    idle_for = now - last_used
+                    if idle_for > self.idle_timeout:
+                        self._discard(connection)
+                        continue
+                    if idle_for > self.health_check_interval and not self._healthy(connection):
+                        self._stats['health_check_failures'] += 1
+                        self._discard(connection)
+                        continue
+                    self._record_checkout(started, now)
+                    return connection
+
+                if self._open < self.max_size:
+                    # Reserve the slot, then connect outside the lock
+                    self._open += 1
+                    self._record_checkout(started, now)
+                    break
+
+                if started is None:
+                    started = now
+                    self._stats['waits'] += 1
+                remaining = started + self.timeout - now
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f'No database connection free after {self.timeout:g}s '
+                                      f'({self.max_size} in use)')
+                self._condition.wait(remaining)
+
+        try:
+            connection = self._connect()
+        except Exception:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._stats['opened'] += 1
+        return connection
+
+    def _record_checkout(self, started: Optional[float], now: float):
+        self._stats['checkouts'] += 1
+        if started is not None:
+            waited = (now - started) * 1000
+            self._stats['total_wait_ms'] += waited
+            self._stats['max_wait_ms'] = max(self._stats['max_wait_ms'], waited)
+
+    def _checkin(self, connection: sqlite3.Connection):
+        healthy = True
+        if connection.in_transaction:
+            # Never hand the next caller someone else's half-finished transaction
+            try:
+                connection.rollback()
+            except sqlite3.Error:
+                healthy = False
+
+        with self._condition:
+            if self._pid != os.getpid():
+                return
+            if healthy:
+                now = time.monotonic()
+                self._idle.append((connection, now))
+                while self._idle and now - self._idle[0][1] > self.idle_timeout:
+                    self._discard(self._idle.popleft()[0])
+            else:
+                self._discard(connection)
+            self._condition.notify()
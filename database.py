@@ -2,51 +2,159 @@ import sqlite3
 import json
 import os
 import shutil
+import sys
 from datetime import datetime
 from contextlib import contextmanager
-from typing import Dict, List, Optional, Any
-import threading
-from config import Config
+from typing import Dict, Iterator, List, Optional, Any, Tuple
+from config import Config, active_config
+from audit import AuditLogWriter
+from backup import create_backup
+from connection_pool import ConnectionPool
+from analytics import install_analytics
+from name_matching import normalize_name, install_name_index
+from revocation import install_revocations
+
+# settings key holding the counter used to invalidate cached API responses
+DATA_VERSION_KEY = 'data_version'
+
+def fetch_records(conn, sql: str, params=()) -> List[Dict[str, Any]]:
+    """Run a query and return its rows as JSON-ready dicts.
+    
+    The cursor yields plain tuples instead of sqlite3.Row, and each one is
+    zipped straight into a dict against the column names read once per
+    query, so no Row object is built and copied per row.
+    """
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(sql, params)
+    columns = tuple(column[0] for column in cursor.description)
+    return [dict(zip(columns, row)) for row in cursor]
+
+def iter_keyed_records(conn, sql: str, params=()) -> Iterator[Tuple[Any, Dict[str, Any]]]:
+    """Like fetch_records, but yield (first column, dict of the other columns)"""
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(sql, params)
+    columns = tuple(column[0] for column in cursor.description[1:])
+    for row in cursor:
+        yield row[0], dict(zip(columns, row[1:]))
 
 class DatabaseManager:
     """Thread-safe SQLite database manager for the raffle system"""
     
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, audit_synchronous: bool = None, initialize: bool = True):
         self.db_path = db_path or Config.DATABASE_PATH
         self.backup_path = Config.BACKUP_PATH
-        self._local = threading.local()
+        pool_settings = dict(
+            timeout=Config.DB_POOL_TIMEOUT,
+            idle_timeout=Config.DB_POOL_IDLE_TIMEOUT,
+            health_check_interval=Config.DB_POOL_HEALTH_CHECK_INTERVAL,
+            cached_statements=Config.DB_CACHED_STATEMENTS
+        )
+        pragmas = {
+            'cache_size': Config.DB_CACHE_SIZE,
+            'mmap_size': Config.DB_MMAP_SIZE,
+            'temp_store': Config.DB_TEMP_STORE
+        }
+        # One writer connection per process: mutations queue for it instead
+        # of racing each other for SQLite's write lock
+        self.write_pool = ConnectionPool(
+            self.db_path,
+            max_size=1,
+            pragmas={'foreign_keys': 'ON', 'synchronous': Config.DB_SYNCHRONOUS, **pragmas},
+            **pool_settings
+        )
+        # Under WAL, readers work from the last committed snapshot and never
+        # wait on the writer
+        self.read_pool = ConnectionPool(
+            self.db_path,
+            max_size=Config.DB_POOL_SIZE,
+            pragmas=pragmas,
+            read_only=True,
+            **pool_settings
+        )
+        self.audit_writer = AuditLogWriter(
+            self.db_path,
+            batch_size=Config.AUDIT_BATCH_SIZE,
+            flush_interval=Config.AUDIT_FLUSH_INTERVAL / 1000,
+            max_queue=Config.AUDIT_QUEUE_SIZE,
+            synchronous=Config.AUDIT_SYNCHRONOUS if audit_synchronous is None else audit_synchronous
+        )
         
         # Ensure directories exist
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         os.makedirs(self.backup_path, exist_ok=True)
         
         # Initialize database
-        self.init_database()
+        if initialize:
+            self.init_database()
     
     @contextmanager
     def get_connection(self):
-        """Get a database connection with proper error handling"""
-        if not hasattr(self._local, 'connection'):
-            self._local.connection = sqlite3.connect(
-                self.db_path,
-                check_same_thread=False,
-                timeout=30.0
-            )
-            self._local.connection.row_factory = sqlite3.Row
-            
-            # Enable WAL mode for better concurrent access
-            self._local.connection.execute('PRAGMA journal_mode=WAL')
-            self._local.connection.execute('PRAGMA foreign_keys=ON')
-            
-        try:
-            yield self._local.connection
-        except Exception as e:
-            self._local.connection.rollback()
-            raise e
+        """Check out the process's writer connection for the duration of the block.
+        
+        Use it for anything that writes; callers queue for it. Nested calls
+        on one thread share the same connection and transaction. Commit
+        before the outermost block ends: a transaction still open when the
+        connection goes back to the pool is rolled back.
+        """
+        with self.write_pool.connection() as conn:
+            try:
+                yield conn
+            except Exception as e:
+                conn.rollback()
+                raise e
+    
+    @contextmanager
+    def read_connection(self):
+        """Check out a read-only connection for a block that only reads.
+        
+        It sees committed data only, so don't use it to read back writes
+        the current thread has not committed yet.
+        """
+        with self.read_pool.connection() as conn:
+            yield conn
+    
+    @contextmanager
+    def read_transaction(self):
+        """A read-only connection that keeps one snapshot for the whole block.
+        
+        Every statement in the block sees the same committed state, so rows
+        and the data version they were read at always agree.
+        """
+        with self.read_connection() as conn:
+            conn.execute('BEGIN')
+            try:
+                yield conn
+            finally:
+                conn.rollback()
+    
+    @contextmanager
+    def write_transaction(self):
+        """Run a block inside a single BEGIN IMMEDIATE transaction.
+        
+        Taking the write lock up front means the block never has to upgrade
+        a read lock mid-transaction, which is what surfaces as
+        'database is locked' under WAL. Commits on success, rolls back on error.
+        """
+        with self.get_connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
     
     def init_database(self):
         """Initialize the database with all required tables"""
         with self.get_connection() as conn:
+            # WAL is stored in the database file, so setting it once is enough
+            conn.execute('PRAGMA journal_mode=WAL')
+            # Workers starting together queue here instead of failing to
+            # upgrade a read lock halfway through the schema setup
+            conn.execute('BEGIN IMMEDIATE')
+            
             # Users table for authentication
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS users (
@@ -68,6 +176,7 @@ class DatabaseManager:
                 CREATE TABLE IF NOT EXISTS employees (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     name TEXT NOT NULL,
+                    name_normalized TEXT,
                     email TEXT UNIQUE,
                     phone TEXT,
                     department TEXT,
@@ -81,6 +190,10 @@ class DatabaseManager:
                 )
             ''')
             
+            self._ensure_columns(conn, 'employees', {
+                'name_normalized': 'TEXT'
+            })
+            
             # Activities table
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS activities (
@@ -113,6 +226,26 @@ class DatabaseManager:
                 )
             ''')
             
+            # Server-side draws: the seed and participant snapshot allow replay
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS raffle_draws (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    algorithm TEXT NOT NULL,
+                    seed TEXT NOT NULL,
+                    participants_snapshot TEXT NOT NULL,
+                    snapshot_sha256 TEXT NOT NULL,
+                    total_participants INTEGER,
+                    total_entries INTEGER,
+                    prize_count INTEGER NOT NULL DEFAULT 1,
+                    conducted_by INTEGER,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (conducted_by) REFERENCES users (id)
+                )
+            ''')
+            self._ensure_columns(conn, 'raffle_history', {
+                'draw_id': 'INTEGER REFERENCES raffle_draws (id)'
+            })
+            
             # Audit log table
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS audit_log (
@@ -139,19 +272,71 @@ class DatabaseManager:
                 )
             ''')
             
+            # Background jobs (imports, resets) and their progress
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT,
+                    progress TEXT,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER DEFAULT 0,
+                    cancel_requested BOOLEAN DEFAULT 0,
+                    worker_pid INTEGER,
+                    worker_started TEXT,
+                    heartbeat_at REAL,
+                    created_by INTEGER,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    started_at TIMESTAMP,
+                    finished_at TIMESTAMP,
+                    FOREIGN KEY (created_by) REFERENCES users (id)
+                )
+            ''')
+            
             # Create indexes for performance
             conn.execute('CREATE INDEX IF NOT EXISTS idx_employees_name ON employees(name)')
             conn.execute('CREATE INDEX IF NOT EXISTS idx_employees_department ON employees(department)')
             conn.execute('CREATE INDEX IF NOT EXISTS idx_activities_employee ON activities(employee_id)')
             conn.execute('CREATE INDEX IF NOT EXISTS idx_activities_date ON activities(created_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_activities_employee_created ON activities(employee_id, created_at DESC)')
             conn.execute('CREATE INDEX IF NOT EXISTS idx_audit_user ON audit_log(user_id)')
             conn.execute('CREATE INDEX IF NOT EXISTS idx_audit_date ON audit_log(created_at)')
+            self._ensure_columns(conn, 'jobs', {'worker_started': 'TEXT'})
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)')
+            
+            # One employee per normalized name; legacy duplicates are left for review
+            unresolved = install_name_index(conn)
+            if unresolved:
+                print(f"{unresolved} employees share a normalized name with an older record; "
+                      f"review them with: python name_matching.py")
+            
+            # Dashboard summary tables and the triggers that maintain them
+            install_analytics(conn)
+            
+            # Revoked JWTs (logout, disabled users)
+            install_revocations(conn)
+            
+            # Start the data version from the clock so a recreated database never
+            # reuses ETags a browser may still hold for the previous one
+            conn.execute('''
+                INSERT OR IGNORE INTO settings (key, value)
+                VALUES (?, CAST(strftime('%s', 'now') AS TEXT))
+            ''', (DATA_VERSION_KEY,))
             
             # Create default admin user if none exists
             self._create_default_admin(conn)
             
             conn.commit()
     
+    def _ensure_columns(self, conn, table: str, columns: Dict[str, str]):
+        """Add columns introduced after a table was first created"""
+        existing = {row['name'] for row in conn.execute(f'PRAGMA table_info({table})')}
+        for name, definition in columns.items():
+            if name not in existing:
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+    
     def _create_default_admin(self, conn):
         """Create default admin user if none exists"""
         import bcrypt
@@ -161,7 +346,7 @@ class DatabaseManager:
         if cursor.fetchone()[0] == 0:
             # Create default admin user
             password = 'Homeinstead3042'  # Should be changed immediately in production
-            password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(Config.BCRYPT_ROUNDS)).decode('utf-8')
             
             conn.execute('''
                 INSERT INTO users (email, password_hash, role, name)
@@ -185,16 +370,23 @@ class DatabaseManager:
                 if 'employees' in data:
                     for name, emp_data in data['employees'].items():
                         # Insert employee
+                        name_normalized = normalize_name(name)
                         cursor = conn.execute('''
                             INSERT OR IGNORE INTO employees 
-                            (name, total_entries, created_at)
-                            VALUES (?, ?, ?)
-                        ''', (name, emp_data.get('entries', 0), 
+                            (name, name_normalized, total_entries, created_at)
+                            VALUES (?, ?, ?, ?)
+                        ''', (name, name_normalized, emp_data.get('entries', 0), 
                              emp_data.get('created_at', datetime.now().isoformat())))
                         
-                        employee_id = cursor.lastrowid or conn.execute(
-                            'SELECT id FROM employees WHERE name = ?', (name,)
-                        ).fetchone()[0]
+                        if cursor.rowcount:
+                            employee_id = cursor.lastrowid
+                        else:
+                            # Same person under another spelling ("bir singh "): fold into it
+                            employee_id = conn.execute(
+                                'SELECT id FROM employees WHERE name_normalized = ?', (name_normalized,)
+                            ).fetchone()[0]
+                            conn.execute('UPDATE employees SET total_entries = total_entries + ? WHERE id = ?',
+                                         (emp_data.get('entries', 0), employee_id))
                         
                         # Insert activities
                         for activity in emp_data.get('activities', []):
@@ -205,6 +397,7 @@ class DatabaseManager:
                             ''', (employee_id, activity['activity'], 'migrated', 
                                  activity['entries'], activity['date']))
                 
+                self.bump_data_version(conn)
                 conn.commit()
                 print(f"Successfully migrated data from {json_file_path}")
                 
@@ -216,31 +409,73 @@ class DatabaseManager:
         except Exception as e:
             print(f"Error migrating JSON data: {e}")
     
-    def backup_database(self) -> str:
-        """Create a backup of the database"""
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_file = os.path.join(self.backup_path, f'raffle_backup_{timestamp}.db')
-        
+    def backup_database(self, progress=None) -> Dict:
+        """Create an online backup of the database (see backup.create_backup)"""
         try:
-            shutil.copy2(self.db_path, backup_file)
-            return backup_file
+            return create_backup(
+                self.db_path,
+                self.backup_path,
+                compression=Config.BACKUP_COMPRESSION,
+                retention=Config.BACKUP_RETENTION,
+                verify=Config.BACKUP_VERIFY,
+                pages_per_step=Config.BACKUP_PAGES_PER_STEP,
+                pause=Config.BACKUP_STEP_PAUSE,
+                progress=progress
+            )
         except Exception as e:
             raise Exception(f"Failed to create backup: {e}")
     
+    def get_data_version(self, conn=None) -> int:
+        """Return the shared data version, bumped by every write to employees, activities or raffle results.
+        
+        Pass conn to read it inside a transaction that is already open.
+        """
+        if conn is None:
+            with self.read_connection() as conn:
+                return self.get_data_version(conn)
+        row = conn.execute('SELECT value FROM settings WHERE key = ?', (DATA_VERSION_KEY,)).fetchone()
+        return int(row[0]) if row else 0
+    
+    def bump_data_version(self, conn):
+        """Increment the data version inside the caller's transaction.
+        
+        The counter lives in the settings table so every gunicorn worker sees
+        the same value and invalidates its cached responses together.
+        """
+        conn.execute('''
+            INSERT INTO settings (key, value) VALUES (?, '1')
+            ON CONFLICT(key) DO UPDATE SET
+                value = CAST(value AS INTEGER) + 1,
+                updated_at = CURRENT_TIMESTAMP
+        ''', (DATA_VERSION_KEY,))
+    
     def log_audit(self, user_id: Optional[int], action: str, table_name: str = None, 
                   record_id: int = None, old_values: Dict = None, new_values: Dict = None,
-                  ip_address: str = None, user_agent: str = None):
-        """Log audit trail for security and compliance"""
-        with self.get_connection() as conn:
+                  ip_address: str = None, user_agent: str = None, conn=None):
+        """Log audit trail for security and compliance
+        
+        Pass the caller's connection to write the row inside an open
+        transaction; it is then committed together with the audited change.
+        Otherwise the row is handed to the batched background writer.
+        """
+        params = (user_id, action, table_name, record_id,
+                  json.dumps(old_values) if old_values else None,
+                  json.dumps(new_values) if new_values else None,
+                  ip_address, user_agent)
+        if conn is not None:
             conn.execute('''
                 INSERT INTO audit_log 
                 (user_id, action, table_name, record_id, old_values, new_values, ip_address, user_agent)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (user_id, action, table_name, record_id,
-                 json.dumps(old_values) if old_values else None,
-                 json.dumps(new_values) if new_values else None,
-                 ip_address, user_agent))
-            conn.commit()
+            ''', params)
+            return
+        
+        self.audit_writer.write(params)
 
-# Global database instance
-db = DatabaseManager()
\ No newline at end of file
+# Global database instance; under FLASK_ENV=testing audit rows are written
+# synchronously (TestingConfig.AUDIT_SYNCHRONOUS). Sheet-parsing processes
+# started with spawn re-import the main module as __mp_main__, and this
+# module with it; they never touch the database, so the schema setup is
+# left to the serving process.
+db = DatabaseManager(audit_synchronous=active_config().AUDIT_SYNCHRONOUS,
+                     initialize=sys.modules['__main__'].__name__ != '__mp_main__')
\ No newline at end of file
@@ -0,0 +1,271 @@
+"""
+Streaming Excel import of employee names.
+
+The workbook is opened in openpyxl's read-only mode and consumed as a
+generator pipeline: rows are read lazily with values_only, passed through
+name extraction and de-duplication, and handed to the database in
+fixed-size batches, so memory stays flat no matter how large the HR export is.
+
+Multi-file / multi-sheet imports parse each sheet in its own process
+(openpyxl parsing is CPU bound and holds the GIL) and merge the names
+before a single batched insert.
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from openpyxl import load_workbook
+
+from name_matching import normalize_name
+
+# Names handed to the database per batch
+IMPORT_BATCH_SIZE = 1000
+
+NULL_MARKERS = {'none', 'null', 'nan', ''}
+
+def _cell_text(value) -> str:
+    return str(value) if value is not None else ""
+
+def _is_plausible_name(name: str) -> bool:
+    return (2 < len(name) < 100 and
+            any(c.isalpha() for c in name) and
+            name.lower() not in NULL_MARKERS)
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """Yield lists of up to size items"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+class EmployeeNameReader:
+    """Streams unique employee names out of one sheet (default: the active one).
+
+    Headers are read from the first row as soon as the reader is created, so
+    an unreadable file fails before anything touches the database. The
+    column detection rules are the same ones the importer has always used:
+    first + last name columns, then a full-name style column, then any
+    column whose header mentions a name, then the first column. Pass
+    assume_first_column=False to skip sheets without a recognizable name
+    column instead (e.g. summary tabs in a multi-sheet workbook).
+    """
+
+    def __init__(self, filepath: str, sheet_name: Optional[str] = None, assume_first_column: bool = True):
+        self.workbook = load_workbook(filepath, read_only=True, data_only=True)
+        self.assume_first_column = assume_first_column
+        try:
+            sheet = self.workbook[sheet_name] if sheet_name else self.workbook.active
+            self.sheet_name = sheet.title
+            # Some exporters write a bogus dimension (e.g. A1:A1); ignore it so
+            # read-only mode doesn't truncate rows
+            sheet.reset_dimensions()
+            self._rows = sheet.iter_rows(values_only=True)
+            header_row = next(self._rows, None) or ()
+        except Exception:
+            self.workbook.close()
+            raise
+
+        self.columns = [str(value) if value else "" for value in header_row]
+        self.detected_columns = []
+        self.total_rows = 0
+        self.employees_found = 0
+        self._extract = self._detect_name_columns()
+
+    def _detect_name_columns(self):
+        first_name_col = None
+        last_name_col = None
+        full_name_col = None
+
+        for i, header in enumerate(self.columns):
+            header_lower = header.lower().strip()
+            if 'first' in header_lower and 'name' in header_lower:
+                first_name_col = i
+                self.detected_columns.append(f"First Name (Column {i+1})")
+            elif 'last' in header_lower and 'name' in header_lower:
+                last_name_col = i
+                self.detected_columns.append(f"Last Name (Column {i+1})")
+            elif ('full' in header_lower or 'employee' in header_lower or 'caregiver' in header_lower or 'staff' in header_lower) and 'name' in header_lower:
+                full_name_col = i
+                self.detected_columns.append(f"Full Name (Column {i+1})")
+
+        # If we found both first and last name columns, combine them
+        if first_name_col is not None and last_name_col is not None:
+            width = max(first_name_col, last_name_col)
+
+            def extract(row) -> Optional[str]:
+                if len(row) <= width:
+                    return None
+                first_name = _cell_text(row[first_name_col]).strip()
+                last_name = _cell_text(row[last_name_col]).strip()
+                if first_name.lower() in NULL_MARKERS or last_name.lower() in NULL_MARKERS:
+                    return None
+                return f"{first_name} {last_name}"
+            return extract
+
+        if full_name_col is None and not self.detected_columns:
+            # Common column name patterns that might contain employee names
+            name_patterns = ['name', 'caregiver', 'employee', 'staff']
+            for i, header in enumerate(self.columns):
+                if header and any(pattern in header.lower() for pattern in name_patterns):
+                    full_name_col = i
+                    self.detected_columns.append(f"Name (Column {i+1}: {header})")
+                    break
+            else:
+                if not self.assume_first_column:
+                    return lambda row: None
+                # Last resort: check first column for names
+                full_name_col = 0
+                self.detected_columns.append("First Column (assumed names)")
+
+        if full_name_col is None:
+            # Only one of first/last name was found; nothing usable
+            return lambda row: None
+
+        def extract(row) -> Optional[str]:
+            if len(row) <= full_name_col:
+                return None
+            name = _cell_text(row[full_name_col]).strip()
+            return name if _is_plausible_name(name) else None
+        return extract
+
+    def __iter__(self) -> Iterator[str]:
+        """Unique names (by normalized name) in first-seen order; counts rows as they stream past"""
+        seen = set()
+        extract = self._extract
+        for row in self._rows:
+            self.total_rows += 1
+            name = extract(row)
+            if not name:
+                continue
+            key = normalize_name(name)
+            if key not in seen:
+                seen.add(key)
+                self.employees_found += 1
+                yield name
+
+    def close(self):
+        self.workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def file_info(self) -> Dict:
+        return {
+            'sheet': self.sheet_name,
+            'total_rows': self.total_rows,
+            'columns': self.columns,
+            'detected_columns': self.detected_columns
+        }
+
+def list_sheets(filepath: str) -> List[str]:
+    workbook = load_workbook(filepath, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+def extract_sheet(filepath: str, sheet_name: Optional[str] = None,
+                  assume_first_column: bool = True) -> Dict:
+    """Read one sheet completely; runs in a worker process, so it returns plain data"""
+    started = time.perf_counter()
+    with EmployeeNameReader(filepath, sheet_name, assume_first_column) as reader:
+        names = list(reader)
+    return {
+        **reader.file_info(),
+        'names': names,
+        'employees_found': len(names),
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+
+def extract_workbooks(files: List[Dict], all_sheets: bool = False, max_processes: Optional[int] = None,
+                      on_sheet_done: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+    """Parse every requested sheet of every file in a process pool.
+
+    files: dicts with filepath and filename. Returns one result per sheet,
+    in file/sheet order, each carrying its names plus rows, detected
+    columns and parse time. on_sheet_done(result) runs as each sheet
+    finishes and may raise to abort the remaining work.
+    """
+    tasks = []
+    for file in files:
+        sheets = list_sheets(file['filepath']) if all_sheets else [None]
+        # Only a single-sheet workbook may fall back to "first column is names"
+        assume_first_column = len(sheets) == 1
+        for sheet_name in sheets:
+            tasks.append((file, sheet_name, assume_first_column))
+
+    results: List[Optional[Dict]] = [None] * len(tasks)
+    workers = min(len(tasks), max_processes or os.cpu_count() or 1)
+    # spawn, not fork: the web process has live threads (audit writer, job
+    # dispatcher) whose locks a forked child could inherit mid-use
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        futures = {
+            executor.submit(extract_sheet, file['filepath'], sheet_name, assume_first_column): index
+            for index, (file, sheet_name, assume_first_column) in enumerate(tasks)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            result = future.result()
+            result['file'] = tasks[index][0]['filename']
+            results[index] = result
+            if on_sheet_done:
+                on_sheet_done(result)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return results
+
+def merge_names(results: List[Dict]) -> Iterator[str]:
+    """Names across all sheets, de-duplicated in file/sheet order"""
+    seen = set()
+    for result in results:
+        for name in result['names']:
+            key = normalize_name(name)
+            if key not in seen:
+                seen.add(key)
+                yield name
+
+def insert_employee_batches(conn, names: Iterable[str], batch_size: int = IMPORT_BATCH_SIZE,
+                            progress: Optional[Callable[[], None]] = None) -> Tuple[int, int]:
+    """Insert names that don't exist yet; returns (added, skipped).
+
+    Names are staged in a temp table batch by batch, then new and existing
+    employees are told apart by one set-based INSERT ... SELECT ... WHERE
+    NOT EXISTS on the normalized name, so the cost no longer scales with a
+    query per name and "bir singh " matches an existing "Bir Singh".
+    progress() is called after each staged batch. The caller owns the
+    transaction and commits.
+    """
+    conn.execute('''
+        CREATE TEMP TABLE IF NOT EXISTS import_names (name_normalized TEXT PRIMARY KEY, name TEXT NOT NULL)
+    ''')
+    try:
+        # Connections are reused per thread, so never trust leftovers
+        conn.execute('DELETE FROM temp.import_names')
+        for batch in batched(names, batch_size):
+            conn.executemany('INSERT OR IGNORE INTO temp.import_names (name_normalized, name) VALUES (?, ?)',
+                             ((normalize_name(name), name) for name in batch))
+            if progress:
+                progress()
+        staged_count = conn.execute('SELECT COUNT(*) FROM temp.import_names').fetchone()[0]
+
+        # rowid order keeps new employee ids in the order they appear in the file
+        cursor = conn.execute('''
+            INSERT INTO employees (name, name_normalized, total_entries)
+            SELECT i.name, i.name_normalized, 0
+            FROM temp.import_names i
+            WHERE NOT EXISTS (SELECT 1 FROM employees e WHERE e.name_normalized = i.name_normalized)
+            ORDER BY i.rowid
+        ''')
+        added_count = cursor.rowcount
+    finally:
+        conn.execute('DROP TABLE IF EXISTS temp.import_names')
+    return added_count, staged_count - added_count
@@ -0,0 +1,16 @@
+"""
+Gunicorn settings, read from the working directory by `gunicorn app:app`.
+
+Each worker process serves WEB_THREADS requests at once (gthread). bcrypt
+runs on PASSWORD_HASH_WORKERS of those threads' behalf, and once
+PASSWORD_HASH_QUEUE_LIMIT logins are hashing or waiting the rest get 503,
+so a login storm leaves threads free for everything else. The queue limit
+defaults to WEB_THREADS - 2 to match (see config.py).
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', 8))
+timeout = 120
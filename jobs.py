@@ -0,0 +1,308 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+# Job lifecycle: queued -> running -> succeeded | failed | cancelled
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+def process_start_time(pid: int) -> Optional[str]:
+    """Kernel start time of a process (Linux only, else None).
+
+    Paired with the pid it identifies a worker process even after the pid
+    is recycled, e.g. by a restarted container numbering processes alike.
+    """
+    try:
+        with open(f'/proc/{pid}/stat') as stat:
+            # Field 22; the command name in field 2 may itself contain spaces
+            return stat.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+class JobCancelled(Exception):
+    """Raised inside a handler when cancellation has been requested"""
+
+class JobContext:
+    """Handed to a job handler: its payload plus progress and cancellation hooks"""
+
+    def __init__(self, queue: 'JobQueue', job: Dict):
+        self._queue = queue
+        self.job_id = job['id']
+        self.kind = job['kind']
+        self.payload = job['payload']
+        self.created_by = job['created_by']
+        self.attempts = job['attempts']
+
+    def progress(self, **counts):
+        """Record progress counters; raises JobCancelled if a cancel is pending"""
+        if self._queue._heartbeat(self.job_id, counts):
+            raise JobCancelled()
+
+    def check_cancelled(self):
+        """Raise JobCancelled if a cancel is pending.
+
+        Only reads the job row, so unlike progress() it is safe to call
+        while the handler holds a transaction open on its own connection.
+        """
+        if self._queue._cancel_requested(self.job_id):
+            raise JobCancelled()
+
+class JobQueue:
+    """SQLite-backed background job queue with a small worker pool per process.
+
+    Jobs live in the jobs table, so any process can pick them up: a
+    dispatcher thread claims queued jobs with a conditional UPDATE (only
+    one process wins a claim) and runs them on a thread pool, outside the
+    request and its gunicorn timeout. Running jobs report progress (and
+    pick up cancellation) through progress(). A running job is recovered
+    only once the process that claimed it has exited - judged by its pid
+    and, on Linux, that process's start time - so a long step that reports
+    no progress is never mistaken for a dead worker and run twice. A
+    recovered job is re-queued while attempts remain, otherwise failed.
+    Handlers must be safe to re-run after a crash, e.g. by doing their
+    writes in a single transaction.
+    """
+
+    def __init__(self, db, workers: int = 1, poll_interval: float = 2.0, max_attempts: int = 3):
+        self.db = db
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self._handlers: Dict[str, Callable] = {}
+        self._cleanup: Dict[str, Callable] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._executor = None
+        self._thread = None
+        self._pid = None
+        self._started = None
+        self._running = 0
+
+    def register(self, kind: str, handler: Callable[[JobContext], Dict],
+                 cleanup: Optional[Callable[[Dict], None]] = None):
+        """Register the handler for a job kind.
+
+        cleanup(payload) runs once the job is finished for good, whatever the outcome.
+        """
+        self._handlers[kind] = handler
+        if cleanup:
+            self._cleanup[kind] = cleanup
+
+    def enqueue(self, kind: str, payload: Dict, created_by: Optional[int] = None) -> str:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        with self.db.get_connection() as conn:
+            conn.execute('''
+                INSERT INTO jobs (id, kind, status, payload, progress, created_by)
+                VALUES (?, ?, ?, ?, '{}', ?)
+            ''', (job_id, kind, JOB_QUEUED, json.dumps(payload), created_by))
+            conn.commit()
+        self._ensure_started()
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self.db.read_connection() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for key in ('payload', 'progress', 'result'):
+            job[key] = json.loads(job[key]) if job[key] else None
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        return job
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """Cancel a queued job outright or flag a running one; returns the new status"""
+        with self.db.write_transaction() as conn:
+            row = conn.execute('SELECT kind, status, payload FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row['status'] == JOB_QUEUED:
+                conn.execute('''
+                    UPDATE jobs SET status = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?
+                ''', (JOB_CANCELLED, job_id))
+                status = JOB_CANCELLED
+            elif row['status'] == JOB_RUNNING:
+                conn.execute('UPDATE jobs SET cancel_requested = 1 WHERE id = ?', (job_id,))
+                status = JOB_RUNNING
+            else:
+                return row['status']
+        if status == JOB_CANCELLED:
+            self._run_cleanup(row['kind'], json.loads(row['payload']))
+        return status
+
+    def _ensure_started(self):
+        # Gunicorn forks workers after import; each process needs its own threads
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._started = process_start_time(self._pid)
+            self._running = 0
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job-worker')
+            self._thread = threading.Thread(target=self._dispatch, name='job-dispatcher', daemon=True)
+            self._thread.start()
+
+    start = _ensure_started
+
+    def _dispatch(self):
+        while True:
+            try:
+                self._recover_orphaned()
+                while self._running < self.workers:
+                    job = self._claim_next()
+                    if job is None:
+                        break
+                    with self._lock:
+                        self._running += 1
+                    self._executor.submit(self._execute, job)
+            except Exception as e:
+                print(f"Job dispatcher error: {e}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _claim_next(self) -> Optional[Dict]:
+        # Only kinds this queue can run; another process may know more of them
+        kinds = json.dumps(sorted(self._handlers))
+        with self.db.read_connection() as conn:
+            # Cheap read first so an idle poll never takes the write lock
+            if conn.execute('''
+                SELECT 1 FROM jobs WHERE status = ? AND kind IN (SELECT value FROM json_each(?)) LIMIT 1
+            ''', (JOB_QUEUED, kinds)).fetchone() is None:
+                return None
+        with self.db.write_transaction() as conn:
+            row = conn.execute('''
+                SELECT id FROM jobs WHERE status = ? AND kind IN (SELECT value FROM json_each(?))
+                ORDER BY created_at, rowid LIMIT 1
+            ''', (JOB_QUEUED, kinds)).fetchone()
+            if row is None:
+                return None
+            conn.execute('''
+                UPDATE jobs
+                SET status = ?, attempts = attempts + 1, worker_pid = ?, worker_started = ?,
+                    started_at = CURRENT_TIMESTAMP, heartbeat_at = ?
+                WHERE id = ?
+            ''', (JOB_RUNNING, self._pid, self._started, time.time(), row['id']))
+        return self.get(row['id'])
+
+    @staticmethod
+    def _worker_alive(pid: Optional[int], started: Optional[str]) -> bool:
+        """Whether the process that claimed a job is still running"""
+        if not pid:
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            pass
+        # A live pid with a different start time is a later process reusing it
+        current = process_start_time(pid) if started is not None else None
+        return current is None or current == started
+
+    def _orphaned_job_ids(self, conn):
+        running = conn.execute('''
+            SELECT id, worker_pid, worker_started FROM jobs WHERE status = ?
+        ''', (JOB_RUNNING,)).fetchall()
+        return [job['id'] for job in running if not self._worker_alive(job['worker_pid'], job['worker_started'])]
+
+    def _recover_orphaned(self):
+        """Re-queue or fail running jobs whose worker process has exited"""
+        with self.db.read_connection() as conn:
+            if not self._orphaned_job_ids(conn):
+                return
+        finished = []
+        with self.db.write_transaction() as conn:
+            # Re-checked under the write lock, so two dispatchers never recover the same job
+            for job_id in self._orphaned_job_ids(conn):
+                job = conn.execute('''
+                    SELECT kind, payload, attempts, cancel_requested FROM jobs WHERE id = ?
+                ''', (job_id,)).fetchone()
+                if job['cancel_requested']:
+                    status, error = JOB_CANCELLED, None
+                elif job['attempts'] < self.max_attempts:
+                    status, error = JOB_QUEUED, None
+                else:
+                    status, error = JOB_FAILED, 'Worker exited while running the job; giving up after retries'
+                conn.execute('''
+                    UPDATE jobs SET status = ?, error = ?, worker_pid = NULL, worker_started = NULL,
+                        finished_at = CASE WHEN ? = 'queued' THEN NULL ELSE CURRENT_TIMESTAMP END
+                    WHERE id = ?
+                ''', (status, error, status, job_id))
+                print(f"Recovered orphaned job {job_id} ({job['kind']}): {status}")
+                if status != JOB_QUEUED:
+                    finished.append((job['kind'], json.loads(job['payload'])))
+        for kind, payload in finished:
+            self._run_cleanup(kind, payload)
+
+    def _bookkeeping_connection(self) -> sqlite3.Connection:
+        """Private autocommit connection for a worker thread's job-row updates.
+
+        The handler uses the thread's regular connection for its own
+        transaction; keeping progress off it means heartbeats are visible
+        immediately and are never rolled back with a cancelled job.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db.db_path, timeout=30.0, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            self._local.connection = connection
+        return connection
+
+    def _heartbeat(self, job_id: str, counts: Dict) -> bool:
+        """Merge progress counters, refresh the heartbeat, return cancel_requested"""
+        row = self._bookkeeping_connection().execute('''
+            UPDATE jobs SET progress = json_patch(progress, ?), heartbeat_at = ?
+            WHERE id = ?
+            RETURNING cancel_requested
+        ''', (json.dumps(counts), time.time(), job_id)).fetchone()
+        return bool(row and row['cancel_requested'])
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        row = self._bookkeeping_connection().execute(
+            'SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return bool(row and row['cancel_requested'])
+
+    def _execute(self, job: Dict):
+        context = JobContext(self, job)
+        status, result, error = JOB_SUCCEEDED, None, None
+        try:
+            result = self._handlers[job['kind']](context)
+        except JobCancelled:
+            status = JOB_CANCELLED
+        except Exception as e:
+            status, error = JOB_FAILED, str(e)
+            print(f"Job {job['id']} ({job['kind']}) failed: {e}")
+        finally:
+            with self._lock:
+                self._running -= 1
+
+        self._bookkeeping_connection().execute('''
+            UPDATE jobs SET status = ?, result = ?, error = ?,
+                heartbeat_at = ?, finished_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (status, json.dumps(result) if result is not None else None, error, time.time(), job['id']))
+        self._run_cleanup(job['kind'], job['payload'])
+        self._wakeup.set()
+
+    def _run_cleanup(self, kind: str, payload: Dict):
+        cleanup = self._cleanup.get(kind)
+        if cleanup:
+            try:
+                cleanup(payload)
+            except Exception as e:
+                print(f"Job cleanup failed ({kind}): {e}")
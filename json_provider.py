@@ -0,0 +1,75 @@
+"""
+JSON encoding for API responses.
+
+FastJSONProvider replaces Flask's default provider. It encodes with orjson
+when that is installed (and JSON_USE_ORJSON is on) and with the stdlib
+encoder otherwise; both write UTF-8 without sorting keys, format
+datetimes as ISO 8601, and hand the response its body as bytes.
+"""
+import dataclasses
+import decimal
+import uuid
+from datetime import date
+from typing import Any, Union
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib encoder is used instead
+    orjson = None
+
+# Dict keys are converted to strings the way the stdlib encoder does
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+def json_default(o: Any) -> Any:
+    """Encode the types the JSON encoders don't handle natively"""
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson when it is available"""
+
+    default = staticmethod(json_default)
+    ensure_ascii = False
+    sort_keys = False
+
+    def __init__(self, app, use_orjson: bool = True):
+        super().__init__(app)
+        self.orjson = orjson if use_orjson else None
+
+    @property
+    def backend(self) -> str:
+        return 'orjson' if self.orjson else 'json'
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # Callers passing json.dumps options (indent, cls, ...) get the stdlib encoder
+        if self.orjson is not None and not kwargs:
+            return self.orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def dumps_bytes(self, obj: Any, indent: bool = False) -> bytes:
+        """Serialize straight to the UTF-8 bytes of a response body"""
+        if self.orjson is not None:
+            option = ORJSON_OPTIONS | (self.orjson.OPT_INDENT_2 if indent else 0)
+            return self.orjson.dumps(obj, default=self.default, option=option)
+        if indent:
+            return super().dumps(obj, indent=2).encode('utf-8')
+        return super().dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        if self.orjson is not None and not kwargs:
+            return self.orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent), mimetype=self.mimetype)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Employee name normalization and near-duplicate detection.
+
+Every employee row stores name_normalized (accents stripped, casefolded,
+whitespace collapsed) under a unique index, so "Bir Singh" and
+"bir singh " are the same person to add_employee and the Excel importer.
+
+Near duplicates ("Maria Gonzalez" / "Maria Gonzales") are found with
+trigram Jaccard similarity. Rather than comparing every pair, each name
+is indexed under only its rarest trigrams (prefix filtering): two names
+with similarity >= t must share one of them, so a lookup only verifies
+the handful of names in a few short posting lists.
+
+Usage:
+    python name_matching.py              # list employees sharing a normalized name
+    python name_matching.py --similar    # also list near-duplicate names
+"""
+import argparse
+import math
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Trigram Jaccard similarity at which two names are flagged for review
+NEAR_DUPLICATE_THRESHOLD = 0.6
+
+# Near duplicates returned in an import result; the count is always exact
+NEAR_DUPLICATE_REPORT_LIMIT = 100
+
+def normalize_name(name: str) -> str:
+    """Comparison key for a name: no accents, casefolded, single spaces"""
+    # Most names are plain ASCII and need no Unicode decomposition
+    if not name.isascii():
+        decomposed = unicodedata.normalize('NFKD', name)
+        name = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(name.casefold().split())
+
+def name_trigrams(normalized: str) -> Set[str]:
+    padded = f" {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+class NameIndex:
+    """Prefix-filtered trigram index for finding similar names.
+
+    document_frequency must cover every name that will be added or looked
+    up: it fixes the rare-first trigram order the prefix filter relies on.
+    Candidates from the posting lists are pruned by length and by PPJoin's
+    positional filter (too few trigrams left to reach the threshold)
+    before the exact similarity is computed.
+    """
+
+    def __init__(self, document_frequency: Counter, threshold: float = NEAR_DUPLICATE_THRESHOLD):
+        self.document_frequency = document_frequency
+        self.threshold = threshold
+        # trigram -> (entry position, offset in its prefix, its trigram count)
+        self._postings: Dict[str, List[Tuple[int, int, int]]] = {}
+        self._entries: List[Tuple[int, str, Set[str]]] = []
+
+    def _prefix(self, trigrams: Set[str]) -> List[str]:
+        ordered = sorted(trigrams, key=lambda trigram: (self.document_frequency[trigram], trigram))
+        return ordered[:len(ordered) - math.ceil(self.threshold * len(ordered)) + 1]
+
+    def add(self, employee_id: int, name: str, trigrams: Set[str]):
+        position = len(self._entries)
+        self._entries.append((employee_id, name, trigrams))
+        size = len(trigrams)
+        for offset, trigram in enumerate(self._prefix(trigrams)):
+            self._postings.setdefault(trigram, []).append((position, offset, size))
+
+    def search(self, trigrams: Set[str]) -> List[Dict]:
+        """Indexed names with similarity >= threshold, most similar first"""
+        threshold = self.threshold
+        size = len(trigrams)
+        min_size, max_size = threshold * size, size / threshold
+        # Jaccard >= t  <=>  overlap >= t / (1 + t) * (|a| + |b|)
+        overlap_ratio = threshold / (1 + threshold)
+        overlaps: Dict[int, int] = {}
+        postings = self._postings
+        for offset, trigram in enumerate(self._prefix(trigrams)):
+            query_remaining = size - offset
+            for position, candidate_offset, candidate_size in postings.get(trigram, ()):
+                if not min_size <= candidate_size <= max_size:
+                    continue
+                overlap = overlaps.get(position, 0)
+                if overlap < 0:
+                    continue
+                remaining = candidate_size - candidate_offset
+                if query_remaining < remaining:
+                    remaining = query_remaining
+                if overlap + remaining >= overlap_ratio * (size + candidate_size):
+                    overlaps[position] = overlap + 1
+                else:
+                    overlaps[position] = -1
+
+        matches = []
+        entries = self._entries
+        for position, overlap in overlaps.items():
+            if overlap < 0:
+                continue
+            employee_id, name, candidate = entries[position]
+            shared = len(trigrams & candidate)
+            similarity = shared / (size + len(candidate) - shared)
+            if similarity >= threshold:
+                matches.append({'id': employee_id, 'name': name, 'similarity': round(similarity, 3)})
+        matches.sort(key=lambda match: -match['similarity'])
+        return matches
+
+def near_duplicate_pairs(rows: Iterable[Tuple[int, str, str]], new_since_id: int = 0,
+                         threshold: float = NEAR_DUPLICATE_THRESHOLD) -> List[Dict]:
+    """Flag names of employees with id > new_since_id that look like someone else.
+
+    rows: (id, name, name_normalized) for the whole roster, in id order.
+    Each new name is compared with the existing roster and with the new
+    names before it, so a file that brings in both "Linda Park" and
+    "Linda Parks" is flagged too.
+    """
+    roster = [(employee_id, name, name_trigrams(normalized)) for employee_id, name, normalized in rows]
+    document_frequency = Counter()
+    for _, _, trigrams in roster:
+        document_frequency.update(trigrams)
+
+    index = NameIndex(document_frequency, threshold)
+    flagged = []
+    for employee_id, name, trigrams in roster:
+        if employee_id > new_since_id:
+            matches = index.search(trigrams)
+            if matches:
+                flagged.append({'id': employee_id, 'name': name, 'matches': matches})
+        index.add(employee_id, name, trigrams)
+    return flagged
+
+def find_near_duplicates(conn, new_since_id: int = 0, threshold: float = NEAR_DUPLICATE_THRESHOLD) -> List[Dict]:
+    """near_duplicate_pairs() over the active roster in the database"""
+    rows = conn.execute('''
+        SELECT id, name, name_normalized FROM employees
+        WHERE is_active = 1 AND name_normalized IS NOT NULL
+        ORDER BY id
+    ''').fetchall()
+    return near_duplicate_pairs(((row[0], row[1], row[2]) for row in rows), new_since_id, threshold)
+
+def install_name_index(conn) -> int:
+    """Create the unique normalized-name index and fill in missing keys.
+
+    Rows are keyed oldest first; a row whose key already belongs to an
+    older employee keeps a NULL key rather than being merged or deleted
+    automatically. Returns how many such duplicates are left for review.
+    The caller commits.
+    """
+    conn.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_employees_name_normalized
+        ON employees(name_normalized)
+    ''')
+    if conn.execute('SELECT 1 FROM employees WHERE name_normalized IS NULL LIMIT 1').fetchone() is None:
+        return 0
+    if not conn.in_transaction:
+        # Several workers may start at once; queue on the write lock rather
+        # than fail upgrading a read snapshot another one has already changed
+        conn.execute('BEGIN IMMEDIATE')
+    pending = conn.execute('''
+        SELECT id, name FROM employees WHERE name_normalized IS NULL ORDER BY id
+    ''').fetchall()
+    conn.executemany('''
+        UPDATE employees SET name_normalized = ?
+        WHERE id = ? AND NOT EXISTS (SELECT 1 FROM employees WHERE name_normalized = ?)
+    ''', ((key, row[0], key) for row in pending for key in (normalize_name(row[1]),)))
+    return conn.execute('SELECT COUNT(*) FROM employees WHERE name_normalized IS NULL').fetchone()[0]
+
+def list_exact_duplicates(conn) -> List[Dict]:
+    """Employees whose name normalizes to the same key as an older employee"""
+    rows = conn.execute('''
+        SELECT id, name, total_entries FROM employees WHERE name_normalized IS NULL ORDER BY id
+    ''').fetchall()
+    duplicates = []
+    for row in rows:
+        keeper = conn.execute('SELECT id, name FROM employees WHERE name_normalized = ?',
+                              (normalize_name(row[1]),)).fetchone()
+        duplicates.append({
+            'id': row[0], 'name': row[1], 'total_entries': row[2],
+            'same_as': {'id': keeper[0], 'name': keeper[1]} if keeper else None
+        })
+    return duplicates
+
+def main(argv: Optional[List[str]] = None):
+    from database import db
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--similar', action='store_true', help="also list near-duplicate names")
+    parser.add_argument('--threshold', type=float, default=NEAR_DUPLICATE_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    with db.read_connection() as conn:
+        duplicates = list_exact_duplicates(conn)
+        print(f"{len(duplicates)} employees share a normalized name with an older record")
+        for duplicate in duplicates:
+            same_as = duplicate['same_as']
+            print(f"  #{duplicate['id']} {duplicate['name']!r} ({duplicate['total_entries']} entries)"
+                  + (f" -> #{same_as['id']} {same_as['name']!r}" if same_as else ""))
+
+        if args.similar:
+            flagged = find_near_duplicates(conn, threshold=args.threshold)
+            print(f"{len(flagged)} employees look like an older record")
+            for entry in flagged:
+                best = entry['matches'][0]
+                print(f"  #{entry['id']} {entry['name']!r} ~ #{best['id']} {best['name']!r} ({best['similarity']:.2f})")
+
+if __name__ == "__main__":
+    main()
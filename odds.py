@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo raffle odds simulator.
+
+Estimates, for every participant, the probability of winning at least one
+of several prizes drawn without replacement (the same procedure as
+/api/raffle/draw_many), using vectorized NumPy draws processed in chunks so
+memory stays bounded regardless of the trial count.
+
+Usage:
+    python odds.py --prizes 15 --trials 1000000 [--top 20]
+"""
+import argparse
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Trials simulated per chunk; bounds memory to chunk x prizes winner indices
+CHUNK_TRIALS = 100_000
+# Clashing redraws tried per prize before a trial is finished with sort keys
+REDRAW_ROUNDS = 8
+# Sort keys generated at once for trials finished that way (trials x participants), ~32MB
+CHUNK_KEYS = 4_000_000
+
+def alias_table(weights: np.ndarray):
+    """Vose alias table so each weighted draw is two uniform lookups"""
+    n = len(weights)
+    scaled = weights * n / weights.sum()
+    prob = np.ones(n)
+    alias = np.arange(n)
+    small = [i for i in range(n) if scaled[i] < 1.0]
+    large = [i for i in range(n) if scaled[i] >= 1.0]
+    while small and large:
+        s, l = small.pop(), large.pop()
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] -= 1.0 - scaled[s]
+        (small if scaled[l] < 1.0 else large).append(l)
+    return prob, alias
+
+def simulation_work(entries: List[int], prizes: int, trials: int) -> int:
+    """Expected number of random values simulate_odds generates, at most.
+
+    Redraws are cheap while the earlier winners hold little of the total
+    weight; a trial that still clashes after REDRAW_ROUNDS redraws costs
+    one key per participant.
+    """
+    if prizes == 1:
+        return 2 * trials
+    weights = np.sort(np.asarray(entries, dtype=np.float64))[::-1]
+    # Worst-case chance that a redraw hits one of the earlier winners
+    clash = min(float(weights[:prizes - 1].sum() / weights.sum()), 1.0)
+    redraws = REDRAW_ROUNDS if clash >= 1.0 else min(REDRAW_ROUNDS, 1 / (1 - clash))
+    finished_with_keys = min(1.0, prizes * clash ** REDRAW_ROUNDS)
+    return int(2 * trials * prizes * redraws + trials * finished_with_keys * len(weights))
+
+def simulate_odds(participants: List[Dict], prizes: int, trials: int,
+                  seed: Optional[int] = None, chunk_trials: int = CHUNK_TRIALS) -> Dict:
+    """Simulate `trials` multi-prize draws and return per-participant odds.
+
+    participants: dicts with id, name and total_entries (entries > 0)
+    Every prize in every trial is first drawn independently from the alias
+    table; trials whose winners collide then re-draw the later prize until
+    it is new, which is distributionally identical to removing the earlier
+    winner's weight (the procedure /api/raffle/draw_many uses). A trial
+    still clashing after REDRAW_ROUNDS redraws, as happens when a few
+    participants hold most of the entries, draws its remaining prizes at
+    once from Efraimidis-Spirakis keys (Exp(1) / entries, smallest first)
+    with the earlier winners excluded, which is the same distribution.
+    """
+    if prizes > len(participants):
+        raise ValueError(f"Cannot draw {prizes} prizes from {len(participants)} participants")
+
+    n = len(participants)
+    weights = np.array([p['total_entries'] for p in participants], dtype=np.float64)
+    total = weights.sum()
+    prob, alias = alias_table(weights)
+    index_type = np.int16 if n < np.iinfo(np.int16).max else np.int32
+    alias = alias.astype(index_type)
+    rng = np.random.default_rng(seed)
+
+    def draw(shape):
+        column = rng.integers(0, n, size=shape, dtype=index_type)
+        return np.where(rng.random(shape) < prob[column], column, alias[column])
+
+    def finish_with_keys(trial_winners, position):
+        """Draw prizes position.. of each row without replacement from the participants not yet drawn"""
+        for start in range(0, len(trial_winners), max(1, CHUNK_KEYS // n)):
+            block = trial_winners[start:start + max(1, CHUNK_KEYS // n)]
+            keys = rng.standard_exponential((len(block), n))
+            keys /= weights
+            np.put_along_axis(keys, block[:, :position].astype(np.intp), np.inf, axis=1)
+            rest = prizes - position
+            smallest = np.argpartition(keys, rest - 1, axis=1)[:, :rest]
+            order = np.take_along_axis(keys, smallest, axis=1).argsort(axis=1)
+            block[:, position:] = np.take_along_axis(smallest, order, axis=1)
+
+    wins = np.zeros(n, dtype=np.int64)
+    first_prize_wins = np.zeros(n, dtype=np.int64)
+
+    started = time.perf_counter()
+    remaining = trials
+    while remaining > 0:
+        size = min(chunk_trials, remaining)
+        remaining -= size
+        winners = draw((size, prizes))
+
+        if prizes > 1:
+            # Only the few trials with a repeated winner need fixing up
+            ordered = np.sort(winners, axis=1)
+            clashing = np.flatnonzero((ordered[:, 1:] == ordered[:, :-1]).any(axis=1))
+            subset = winners[clashing]
+            for position in range(1, prizes):
+                earlier = subset[:, :position]
+                rows = np.flatnonzero((earlier == subset[:, position, None]).any(axis=1))
+                for _ in range(REDRAW_ROUNDS):
+                    if not rows.size:
+                        break
+                    picks = draw(rows.size)
+                    subset[rows, position] = picks
+                    rows = rows[(earlier[rows] == picks[:, None]).any(axis=1)]
+                if rows.size:
+                    finished = subset[rows]
+                    finish_with_keys(finished, position)
+                    subset[rows] = finished
+            winners[clashing] = subset
+
+        # Winners are distinct within a trial, so appearances == trials won
+        wins += np.bincount(winners.ravel(), minlength=n)
+        first_prize_wins += np.bincount(winners[:, 0], minlength=n)
+
+    elapsed = time.perf_counter() - started
+    p_any = wins / trials
+    # 95% Wilson score interval for the win-any-prize probability
+    z = 1.959963984540054
+    denominator = 1 + z * z / trials
+    centre = (p_any + z * z / (2 * trials)) / denominator
+    margin = z * np.sqrt(p_any * (1 - p_any) / trials + z * z / (4 * trials * trials)) / denominator
+
+    results = []
+    for i, participant in enumerate(participants):
+        results.append({
+            'id': participant['id'],
+            'name': participant.get('name'),
+            'entries': participant['total_entries'],
+            'single_draw_chance': round(float(weights[i] / total * 100), 4),
+            'p_win_any': round(float(p_any[i]), 6),
+            'p_win_any_ci95': [round(float(max(centre[i] - margin[i], 0.0)), 6),
+                               round(float(min(centre[i] + margin[i], 1.0)), 6)],
+            # Without replacement nobody wins twice, so this equals p_win_any
+            'expected_prizes': round(float(p_any[i]), 6),
+            'p_first_prize': round(float(first_prize_wins[i] / trials), 6)
+        })
+    results.sort(key=lambda r: r['p_win_any'], reverse=True)
+
+    return {
+        'participants': results,
+        'prizes': prizes,
+        'trials': trials,
+        'total_entries': int(total),
+        'elapsed_seconds': round(elapsed, 3)
+    }
+
+def apply_overrides(participants: List[Dict], overrides: Dict) -> List[Dict]:
+    """What-if support: replace entries by employee id, dropping anyone left at zero"""
+    overrides = {int(employee_id): int(entries) for employee_id, entries in overrides.items()}
+    adjusted = []
+    for participant in participants:
+        entries = overrides.get(participant['id'], participant['total_entries'])
+        if entries < 0:
+            raise ValueError("Entries cannot be negative")
+        if entries > 0:
+            adjusted.append({**participant, 'total_entries': entries})
+    return adjusted
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo raffle odds for the current roster")
+    parser.add_argument('--prizes', type=int, default=1)
+    parser.add_argument('--trials', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--top', type=int, default=20, help="rows to print")
+    args = parser.parse_args()
+
+    from database import db
+    from raffle import load_participants
+
+    with db.read_connection() as conn:
+        participants = load_participants(conn)
+    if not participants:
+        print("No eligible employees found")
+        return
+
+    result = simulate_odds(participants, args.prizes, args.trials, args.seed)
+    print(f"{result['trials']} trials, {result['prizes']} prizes, {len(participants)} participants, "
+          f"{result['total_entries']} entries ({result['elapsed_seconds']}s)")
+    print(f"{'Name':<30} {'Entries':>7} {'1 draw %':>9} {'Any prize %':>12} {'95% CI':>19}")
+    for row in result['participants'][:args.top]:
+        low, high = row['p_win_any_ci95']
+        print(f"{str(row['name'])[:30]:<30} {row['entries']:>7} {row['single_draw_chance']:>9.2f} "
+              f"{row['p_win_any'] * 100:>12.3f} {low * 100:>8.3f}-{high * 100:<8.3f}")
+    if len(result['participants']) > args.top:
+        print(f"... and {len(result['participants']) - args.top} more")
+
+if __name__ == "__main__":
+    main()
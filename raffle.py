@@ -0,0 +1,130 @@
+import hashlib
+import hmac
+import json
+import secrets
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Recorded with every draw so a replay uses the exact same sampling procedure
+DRAW_ALGORITHM = 'fenwick-hmac-sha256-v1'
+
+class SeededRandom:
+    """Replayable CSPRNG: HMAC-SHA256 in counter mode keyed by a 256-bit seed.
+
+    A fresh seed comes from the OS CSPRNG; recording it alongside the draw
+    lets an auditor reproduce every random number the draw consumed.
+    """
+
+    def __init__(self, seed: Optional[str] = None):
+        self.seed = seed or secrets.token_hex(32)
+        self._key = bytes.fromhex(self.seed)
+        self._counter = 0
+
+    def randbelow(self, n: int) -> int:
+        """Uniform integer in [0, n) using rejection sampling to avoid modulo bias"""
+        if n <= 0:
+            raise ValueError("randbelow() requires a positive bound")
+        limit = (1 << 256) - (1 << 256) % n
+        while True:
+            block = hmac.digest(self._key, self._counter.to_bytes(8, 'big'), 'sha256')
+            self._counter += 1
+            value = int.from_bytes(block, 'big')
+            if value < limit:
+                return value % n
+
+class FenwickSampler:
+    """Weighted sampler over integer weights backed by a Fenwick (binary indexed) tree.
+
+    Building is O(n); sampling and weight updates are O(log n).
+    """
+
+    def __init__(self, weights: Sequence[int]):
+        n = len(weights)
+        tree = [0] * (n + 1)
+        for i, weight in enumerate(weights, start=1):
+            if weight < 0:
+                raise ValueError("Weights must be non-negative")
+            tree[i] += weight
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._size = n
+        self._top = 1 << (n.bit_length() - 1) if n else 0
+        self.total = sum(weights)
+
+    def __len__(self):
+        return self._size
+
+    def find(self, target: int) -> int:
+        """Index of the weight bucket containing target, for 0 <= target < total"""
+        tree = self._tree
+        position = 0
+        step = self._top
+        while step:
+            candidate = position + step
+            if candidate <= self._size and tree[candidate] <= target:
+                target -= tree[candidate]
+                position = candidate
+            step >>= 1
+        return position
+
+    def sample(self, rng: SeededRandom) -> int:
+        if self.total <= 0:
+            raise ValueError("Cannot sample from an empty raffle")
+        return self.find(rng.randbelow(self.total))
+
+    def update(self, index: int, delta: int):
+        """Add delta to the weight at index"""
+        self.total += delta
+        i = index + 1
+        while i <= self._size:
+            self._tree[i] += delta
+            i += i & -i
+
+def load_participants(conn) -> List[Dict]:
+    """Eligible employees in the canonical (id) order used by draws and replays"""
+    from database import fetch_records
+
+    return fetch_records(conn, '''
+        SELECT id, name, total_entries
+        FROM employees
+        WHERE is_active = 1 AND total_entries > 0
+        ORDER BY id
+    ''')
+
+def snapshot_participants(participants: List[Dict]) -> str:
+    """Compact JSON of [id, entries] pairs, stored with the draw for replay"""
+    return json.dumps([[p['id'], p['total_entries']] for p in participants], separators=(',', ':'))
+
+def draw_many(participants: List[Dict], count: int, seed: Optional[str] = None) -> Tuple[List[Dict], str]:
+    """Draw count distinct winners weighted by total_entries, in prize order.
+
+    Each winner's weight is removed from the Fenwick tree before the next
+    draw, so the whole draw is O(n + k log n) and equivalent to repeatedly
+    drawing and discarding anyone who already won.
+    """
+    if count > len(participants):
+        raise ValueError(f"Cannot draw {count} winners from {len(participants)} participants")
+    rng = SeededRandom(seed)
+    sampler = FenwickSampler([p['total_entries'] for p in participants])
+    winners = []
+    for _ in range(count):
+        index = sampler.sample(rng)
+        winners.append(participants[index])
+        sampler.update(index, -participants[index]['total_entries'])
+    return winners, rng.seed
+
+def draw_winner(participants: List[Dict], seed: Optional[str] = None) -> Tuple[Dict, str]:
+    """Pick one participant weighted by total_entries, returns (winner, seed)"""
+    winners, seed = draw_many(participants, 1, seed)
+    return winners[0], seed
+
+def replay_draw(snapshot: str, seed: str, count: int = 1) -> List[int]:
+    """Re-run a recorded draw and return the winning employee ids in prize order"""
+    pairs = json.loads(snapshot)
+    participants = [{'id': employee_id, 'total_entries': entries} for employee_id, entries in pairs]
+    winners, _ = draw_many(participants, count, seed)
+    return [winner['id'] for winner in winners]
+
+def snapshot_digest(snapshot: str) -> str:
+    return hashlib.sha256(snapshot.encode('utf-8')).hexdigest()
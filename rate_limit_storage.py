@@ -0,0 +1,171 @@
+"""
+Flask-Limiter storage shared by every worker process on the host.
+
+The default in-memory storage counts separately in each gunicorn worker,
+so with --workers 2 every limit is effectively doubled, and it forgets
+everything on restart. SQLiteStorage keeps the counters in a small SQLite
+file instead: each hit is one short BEGIN IMMEDIATE transaction, so the
+check and the increment are atomic across processes and limits hold
+exactly however many workers there are.
+
+Importing this module registers the sqlite:// scheme with limits, so it is
+chosen by configuration alone:
+
+    RATELIMIT_STORAGE_URI=sqlite:///var/lib/raffle/ratelimits.db   # absolute path
+    RATELIMIT_STORAGE_URI=sqlite://./data/ratelimits.db            # relative path
+
+Both the moving-window (a sliding log of hits) and fixed-window strategies
+are supported. The counters live in their own file rather than the raffle
+database so a limiter check never queues behind an import or an award.
+
+It implements the storage interface of limits 5.x (pinned in the
+requirements files); earlier majors call incr() with other arguments.
+"""
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from limits.errors import ConfigurationError
+from limits.storage import MovingWindowSupport, Storage
+
+from connection_pool import ConnectionPool
+
+RATE_LIMIT_SCHEMA = [
+    # fixed-window counters
+    '''
+    CREATE TABLE IF NOT EXISTS rate_limit_counters (
+        key TEXT PRIMARY KEY,
+        hits INTEGER NOT NULL,
+        expires_at REAL NOT NULL
+    ) WITHOUT ROWID
+    ''',
+    # moving-window log, one row per acquired entry
+    '''
+    CREATE TABLE IF NOT EXISTS rate_limit_entries (
+        key TEXT NOT NULL,
+        expires_at REAL NOT NULL,
+        hits INTEGER NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_rate_limit_entries_key ON rate_limit_entries(key, expires_at)'
+]
+
+# Seconds between sweeps of expired counters and entries for keys no longer being hit
+SWEEP_INTERVAL = 60
+
+class SQLiteStorage(Storage, MovingWindowSupport):
+    """Rate-limit counters in a SQLite file, exact across processes"""
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, pool_size: int = 4,
+                 busy_timeout: float = 5.0, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path = uri.split('://', 1)[1]
+        if not self.path or self.path == ':memory:':
+            raise ConfigurationError(f"sqlite rate-limit storage needs a file path, got {uri}")
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.pool = ConnectionPool(self.path, max_size=pool_size, timeout=busy_timeout,
+                                   busy_timeout=busy_timeout, pragmas={'synchronous': 'NORMAL'})
+        self._next_sweep = 0.0
+        with self.pool.connection() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+        with self._transaction() as conn:
+            for statement in RATE_LIMIT_SCHEMA:
+                conn.execute(statement)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        now = time.time()
+        with self._transaction() as conn:
+            self._sweep(conn, now)
+            return conn.execute('''
+                INSERT INTO rate_limit_counters (key, hits, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    hits = CASE WHEN expires_at <= ? THEN excluded.hits ELSE hits + excluded.hits END,
+                    expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END
+                RETURNING hits
+            ''', (key, amount, now + expiry, now, now)).fetchall()[0][0]
+
+    def get(self, key: str) -> int:
+        with self.pool.connection() as conn:
+            row = conn.execute('SELECT hits FROM rate_limit_counters WHERE key = ? AND expires_at > ?',
+                               (key, time.time())).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        with self.pool.connection() as conn:
+            row = conn.execute('SELECT expires_at FROM rate_limit_counters WHERE key = ? AND expires_at > ?',
+                               (key, now)).fetchone()
+        return row[0] if row else now
+
+    def acquire_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        with self._transaction() as conn:
+            self._sweep(conn, now)
+            conn.execute('DELETE FROM rate_limit_entries WHERE key = ? AND expires_at < ?', (key, now))
+            acquired = conn.execute('SELECT COALESCE(SUM(hits), 0) FROM rate_limit_entries WHERE key = ?',
+                                    (key,)).fetchone()[0]
+            if acquired + amount > limit:
+                return False
+            conn.execute('INSERT INTO rate_limit_entries (key, expires_at, hits) VALUES (?, ?, ?)',
+                         (key, now + expiry, amount))
+            return True
+
+    def get_moving_window(self, key: str, limit: int, expiry: int):
+        now = time.time()
+        with self.pool.connection() as conn:
+            oldest, acquired = conn.execute('''
+                SELECT MIN(expires_at), COALESCE(SUM(hits), 0) FROM rate_limit_entries
+                WHERE key = ? AND expires_at >= ?
+            ''', (key, now)).fetchone()
+        if not acquired:
+            return now, 0
+        return oldest - expiry, acquired
+
+    def check(self) -> bool:
+        try:
+            with self.pool.connection() as conn:
+                conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int:
+        with self._transaction() as conn:
+            return (conn.execute('DELETE FROM rate_limit_counters').rowcount
+                    + conn.execute('DELETE FROM rate_limit_entries').rowcount)
+
+    def clear(self, key: str):
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM rate_limit_counters WHERE key = ?', (key,))
+            conn.execute('DELETE FROM rate_limit_entries WHERE key = ?', (key,))
+
+    @contextmanager
+    def _transaction(self):
+        # Taking the write lock up front, so concurrent workers queue on the
+        # busy timeout instead of failing to upgrade a read snapshot
+        with self.pool.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def _sweep(self, conn, now: float):
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + SWEEP_INTERVAL
+        conn.execute('DELETE FROM rate_limit_counters WHERE expires_at <= ?', (now,))
+        conn.execute('DELETE FROM rate_limit_entries WHERE expires_at < ?', (now,))
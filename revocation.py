@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Server-side revocation of issued JWTs.
+
+Every token carries a jti. Logging out revokes that one token; disabling
+a user revokes every token issued to them up to that moment, comparing
+the token's iat with the revocation time as float seconds (tokens are
+issued with a sub-second iat). Revocations are rows in token_revocations
+and each worker mirrors them in memory, so the check login_required makes
+per request is a set and a dict lookup.
+
+The AUTOINCREMENT id doubles as the version counter: a worker asks for
+rows past the last id it has seen at most every refresh_interval seconds,
+so a revocation made in one worker applies in the others within that
+window (and immediately in the worker that made it). Rows are purged
+once every token they could match has expired anyway.
+
+Usage:
+    python revocation.py --user 7       # revoke every token issued to user 7
+    python revocation.py --purge        # delete rows for tokens that have expired
+    python revocation.py                # show what is revoked
+"""
+import argparse
+import threading
+import time
+from typing import Dict, Optional
+
+REVOCATION_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS token_revocations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        jti TEXT,
+        user_id INTEGER,
+        revoked_at REAL NOT NULL,
+        expires_at REAL NOT NULL,
+        reason TEXT
+    )
+    ''',
+    # jti set: that one token; jti NULL: every token of user_id issued up to revoked_at
+    'CREATE INDEX IF NOT EXISTS idx_token_revocations_expires ON token_revocations(expires_at)'
+]
+
+# Seconds between sweeps of expired revocations out of memory
+MEMORY_PURGE_INTERVAL = 300
+
+def install_revocations(conn):
+    """Create the revocation table"""
+    for statement in REVOCATION_SCHEMA:
+        conn.execute(statement)
+
+def purge_expired_revocations(conn, now: Optional[float] = None) -> int:
+    """Delete revocations for tokens that have expired (caller commits)"""
+    return conn.execute('DELETE FROM token_revocations WHERE expires_at < ?',
+                        (time.time() if now is None else now,)).rowcount
+
+class RevocationList:
+    """In-memory mirror of token_revocations with O(1) checks"""
+
+    def __init__(self, db, refresh_interval: float = 1.0):
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self._jtis: Dict[str, float] = {}  # jti -> exp of the revoked token
+        self._user_cutoffs: Dict[int, float] = {}  # user_id -> tokens with iat up to here are revoked
+        self._cutoff_expiry: Dict[int, float] = {}
+        self._last_id = 0
+        self._next_refresh = 0.0
+        self._next_purge = time.monotonic() + MEMORY_PURGE_INTERVAL
+        self._lock = threading.Lock()
+
+    def is_revoked(self, claims: Dict) -> bool:
+        if time.monotonic() >= self._next_refresh:
+            self.refresh(wait=False)
+        jti = claims.get('jti')
+        if jti is not None and jti in self._jtis:
+            return True
+        cutoff = self._user_cutoffs.get(claims.get('user_id'))
+        return cutoff is not None and claims.get('iat', 0) <= cutoff
+
+    def revoke(self, jti: str, user_id: Optional[int], expires_at: float, reason: str = None):
+        """Revoke one token until its expiry"""
+        self._insert(jti, user_id, time.time(), expires_at, reason)
+
+    def revoke_user(self, user_id: int, max_token_age: float, reason: str = None):
+        """Revoke every token issued to a user so far"""
+        now = time.time()
+        self._insert(None, user_id, now, now + max_token_age, reason)
+
+    def refresh(self, wait: bool = True):
+        """Load revocations added since the last refresh.
+
+        With wait=False a thread that finds another one already refreshing
+        carries on with the current view instead of queueing behind it.
+        """
+        if not self._lock.acquire(blocking=wait):
+            return
+        try:
+            with self.db.read_connection() as conn:
+                rows = conn.execute('''
+                    SELECT id, jti, user_id, revoked_at, expires_at FROM token_revocations
+                    WHERE id > ? ORDER BY id
+                ''', (self._last_id,)).fetchall()
+            for row_id, jti, user_id, revoked_at, expires_at in rows:
+                if jti is not None:
+                    self._jtis[jti] = expires_at
+                elif revoked_at > self._user_cutoffs.get(user_id, 0):
+                    self._user_cutoffs[user_id] = revoked_at
+                    self._cutoff_expiry[user_id] = expires_at
+                self._last_id = row_id
+
+            now = time.monotonic()
+            if now >= self._next_purge:
+                self._purge_memory(time.time())
+                self._next_purge = now + MEMORY_PURGE_INTERVAL
+            self._next_refresh = now + self.refresh_interval
+        finally:
+            self._lock.release()
+
+    def metrics(self) -> Dict:
+        return {
+            'revoked_tokens': len(self._jtis),
+            'revoked_users': len(self._user_cutoffs),
+            'last_id': self._last_id,
+            'refresh_interval': self.refresh_interval
+        }
+
+    def _insert(self, jti, user_id, revoked_at, expires_at, reason):
+        with self.db.get_connection() as conn:
+            conn.execute('''
+                INSERT INTO token_revocations (jti, user_id, revoked_at, expires_at, reason)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (jti, user_id, revoked_at, expires_at, reason))
+            purge_expired_revocations(conn, revoked_at)
+            conn.commit()
+        self.refresh()
+
+    def _purge_memory(self, now: float):
+        # Rebuilt rather than deleted from, so lock-free readers never see a dict change size
+        self._jtis = {jti: expires for jti, expires in self._jtis.items() if expires >= now}
+        expired = {user_id for user_id, expires in self._cutoff_expiry.items() if expires < now}
+        if expired:
+            self._user_cutoffs = {k: v for k, v in self._user_cutoffs.items() if k not in expired}
+            self._cutoff_expiry = {k: v for k, v in self._cutoff_expiry.items() if k not in expired}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--user', type=int, help="revoke every token issued to this user id")
+    parser.add_argument('--reason', default='revoked from the command line')
+    parser.add_argument('--purge', action='store_true', help="delete revocations of expired tokens")
+    args = parser.parse_args()
+
+    from auth import AuthManager
+    from database import db
+
+    if args.user is not None:
+        AuthManager.revoke_user_tokens(args.user, args.reason)
+        print(f"Revoked every token issued to user {args.user} so far")
+    if args.purge:
+        with db.get_connection() as conn:
+            purged = purge_expired_revocations(conn)
+            conn.commit()
+        print(f"Purged {purged} revocations of expired tokens")
+
+    with db.read_connection() as conn:
+        tokens, users = conn.execute('''
+            SELECT COUNT(jti), COUNT(*) - COUNT(jti) FROM token_revocations WHERE expires_at >= ?
+        ''', (time.time(),)).fetchone()
+    print(f"{tokens} revoked tokens and {users} revoked users still within token lifetime")
+
+if __name__ == "__main__":
+    main()
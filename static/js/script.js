@@ -1,12 +1,23 @@
+// Employees requested per /api/employees page; the next page is fetched as
+// the end of the list scrolls into view
+const EMPLOYEES_PAGE_SIZE = 100;
+// Pause after the last keystroke before a search goes to the server
+const SEARCH_DEBOUNCE_MS = 250;
+const JOB_POLL_INTERVAL_MS = 1000;
+
 class RaffleDashboard {
     constructor() {
         this.employees = [];
+        this.employeesCursor = null;
+        this.employeesQuery = '';
+        this.summary = null;
         this.currentEmployee = null;
         this.init();
     }
 
     init() {
         this.bindEvents();
+        this.observeEmployeesEnd();
         this.loadEmployees();
         this.updateDateInfo();
         this.initAnimations();
@@ -20,11 +31,16 @@ class RaffleDashboard {
             if (e.key === 'Enter') this.addEmployee();
         });
 
-        // Search functionality (if exists)
-        const searchEl = document.getElementById('employee-search');
-        if (searchEl) {
-            searchEl.addEventListener('input', (e) => this.filterEmployees(e.target.value));
-        }
+        // Search runs on the server (q=), so it covers employees not loaded yet
+        ['employee-search', 'employee-search-main'].forEach(id => {
+            const searchEl = document.getElementById(id);
+            if (searchEl) {
+                searchEl.addEventListener('input', (e) => this.searchEmployees(e.target.value));
+            }
+        });
+        
+        // Add Entry, Clear Points and Delete buttons on every card and row
+        this.attachEmployeeActionHandlers();
         
         // View toggle (if exists)
         document.querySelectorAll('.view-btn').forEach(btn => {
@@ -111,17 +127,18 @@ class RaffleDashboard {
         });
     }
 
-    openRaffleModal() {
-        const eligibleEmployees = this.employees.filter(employee => employee.total_entries > 0);
+    async openRaffleModal() {
+        // The draw happens on the server; the modal only needs its totals
+        const summary = await this.loadSummary();
         
-        if (eligibleEmployees.length === 0) {
+        if (!summary || !summary.eligible_employees) {
             this.showAlert('No employees with raffle entries found. Add some entries first!', 'error');
             return;
         }
         
         document.getElementById('raffle-modal').style.display = 'block';
         document.body.style.overflow = 'hidden';
-        this.setupRaffle(eligibleEmployees);
+        this.setupRaffle(summary);
     }
 
     closeRaffleModal() {
@@ -130,16 +147,17 @@ class RaffleDashboard {
         this.resetRaffle();
     }
 
-    setupRaffle(eligibleEmployees) {
-        const totalEntries = eligibleEmployees.reduce((sum, employee) => sum + employee.total_entries, 0);
+    setupRaffle(summary) {
+        const totalEntries = summary.total_entries;
+        const leaders = summary.top_performers;
         
         // Update stats
-        document.getElementById('raffle-participants').textContent = eligibleEmployees.length;
+        document.getElementById('raffle-participants').textContent = summary.eligible_employees;
         document.getElementById('raffle-total-entries').textContent = totalEntries;
         
-        // Create participants list
+        // Chances of the leaderboard; everyone else is summarised in one line
         const participantsGrid = document.getElementById('participants-grid');
-        participantsGrid.innerHTML = eligibleEmployees.map(employee => {
+        participantsGrid.innerHTML = leaders.map(employee => {
             const chance = ((employee.total_entries / totalEntries) * 100).toFixed(1);
             return `
                 <div class="participant-item">
@@ -149,6 +167,17 @@ class RaffleDashboard {
                 </div>
             `;
         }).join('');
+        const others = summary.eligible_employees - leaders.length;
+        if (others > 0) {
+            const otherEntries = totalEntries - leaders.reduce((sum, employee) => sum + employee.total_entries, 0);
+            participantsGrid.innerHTML += `
+                <div class="participant-item">
+                    <div class="participant-name">${others} more</div>
+                    <div class="participant-entries">${otherEntries} entries</div>
+                    <div class="participant-chance">${((otherEntries / totalEntries) * 100).toFixed(1)}% chance</div>
+                </div>
+            `;
+        }
         
         // Reset wheel and controls
         document.getElementById('raffle-result').style.display = 'none';
@@ -162,13 +191,13 @@ class RaffleDashboard {
         wheel.style.transform = 'rotate(0deg)';
         
         this.raffleData = {
-            participants: eligibleEmployees,
+            summary: summary,
             totalEntries: totalEntries,
             isSpinning: false
         };
     }
 
-    spinWheel() {
+    async spinWheel() {
         if (this.raffleData.isSpinning) return;
         
         this.raffleData.isSpinning = true;
@@ -176,8 +205,17 @@ class RaffleDashboard {
         spinBtn.disabled = true;
         spinBtn.innerHTML = '<div class="loading"></div> Spinning...';
         
-        // Select winner using weighted random selection
-        const winner = this.selectWeightedWinner();
+        // The winner is drawn and recorded server-side; the wheel is only the reveal
+        let winner;
+        try {
+            winner = await this.drawWinner();
+        } catch (error) {
+            this.showAlert(`Raffle draw failed: ${error.message}`, 'error');
+            this.raffleData.isSpinning = false;
+            spinBtn.disabled = false;
+            spinBtn.innerHTML = 'Spin the Wheel!';
+            return;
+        }
         
         // Calculate spin animation
         const baseSpins = 5; // Number of full rotations
@@ -198,20 +236,21 @@ class RaffleDashboard {
         this.addSpinEffects();
     }
 
-    selectWeightedWinner() {
-        const random = Math.random() * this.raffleData.totalEntries;
-        let currentWeight = 0;
+    async drawWinner() {
+        const response = await fetch('/api/raffle/draw', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ prize: 'Quarterly Prize' })
+        });
+        const data = await response.json();
         
-        for (const employee of this.raffleData.participants) {
-            currentWeight += employee.total_entries;
-            if (random <= currentWeight) {
-                return { name: employee.name, data: { entries: employee.total_entries } };
-            }
+        if (!data.success) {
+            throw new Error(data.error || 'Unknown error');
         }
         
-        // Fallback (should never reach here)
-        const fallbackEmployee = this.raffleData.participants[0];
-        return { name: fallbackEmployee.name, data: { entries: fallbackEmployee.total_entries } };
+        return { name: data.winner.name, data: { entries: data.winner.entries } };
     }
 
     announceWinner(winner) {
@@ -240,7 +279,7 @@ class RaffleDashboard {
         wheel.style.transform = 'rotate(0deg)';
         
         if (this.raffleData) {
-            this.setupRaffle(this.raffleData.participants);
+            this.setupRaffle(this.raffleData.summary);
         }
     }
 
@@ -353,32 +392,35 @@ class RaffleDashboard {
 
     async loadAnalytics() {
         try {
-            // For now, we'll use local data. In a real implementation, this would call the API
-            const employees = Object.entries(this.employees);
-            const totalEmployees = employees.length;
-            const totalEntries = employees.reduce((sum, [name, data]) => sum + data.entries, 0);
-            const topPerformers = employees
-                .filter(([name, data]) => data.entries > 0)
-                .sort((a, b) => b[1].entries - a[1].entries)
-                .slice(0, 5);
+            const summary = await this.loadSummary();
+            if (!summary) throw new Error('No analytics');
+            const topPerformers = summary.top_performers.slice(0, 5);
 
             // Update top performers list
             const topPerformersList = document.getElementById('top-performers-list');
             if (topPerformers.length > 0) {
-                topPerformersList.innerHTML = topPerformers.map(([name, data], index) => `
+                topPerformersList.innerHTML = topPerformers.map((employee, index) => `
                     <div class="top-performer-item">
                         <span class="rank">#${index + 1}</span>
-                        <span class="name">${this.escapeHtml(name)}</span>
-                        <span class="entries">${data.entries} entries</span>
+                        <span class="name">${this.escapeHtml(employee.name)}</span>
+                        <span class="entries">${employee.total_entries} entries</span>
                     </div>
                 `).join('');
             } else {
                 topPerformersList.innerHTML = '<p class="no-data">No entries recorded yet</p>';
             }
 
-            // Update recent activity (mock data for now)
             const recentActivityList = document.getElementById('recent-activity-list');
-            recentActivityList.innerHTML = '<p class="no-data">Activity tracking coming soon</p>';
+            if (summary.recent_activities.length > 0) {
+                recentActivityList.innerHTML = summary.recent_activities.map(activity => `
+                    <div class="top-performer-item">
+                        <span class="name">${this.escapeHtml(activity.employee_name)}</span>
+                        <span class="entries">${this.escapeHtml(activity.activity_name)} (+${activity.entries_awarded})</span>
+                    </div>
+                `).join('');
+            } else {
+                recentActivityList.innerHTML = '<p class="no-data">No activity recorded yet</p>';
+            }
 
         } catch (error) {
             console.error('Failed to load analytics:', error);
@@ -488,15 +530,25 @@ class RaffleDashboard {
 
             if (data.error) {
                 this.showAlert(data.error, 'error');
-            } else {
-                this.showAlert(data.message, 'success');
+                return;
+            }
+
+            // The import runs as a background job; follow its progress
+            const job = await this.waitForJob(data.job_id, (progress) => {
+                if (progress.rows_scanned) {
+                    uploadBtn.innerHTML = `<div class="loading"></div> Importing... ${progress.rows_scanned} rows`;
+                }
+            });
+
+            if (job.status === 'succeeded') {
+                this.showAlert(job.result.message, 'success');
                 await this.loadEmployees();
                 this.closeExcelModal();
                 
                 // Show detailed import results
-                if (data.file_info) {
-                    console.log('Import Details:', data);
-                }
+                console.log('Import Details:', job.result);
+            } else {
+                this.showAlert(job.error || `Import ${job.status}`, 'error');
             }
         } catch (error) {
             this.showAlert('Failed to upload file. Please try again.', 'error');
@@ -506,6 +558,26 @@ class RaffleDashboard {
         }
     }
 
+    async waitForJob(jobId, onProgress) {
+        // Poll until the job reaches a final state
+        while (true) {
+            const response = await fetch(`/api/jobs/${jobId}`);
+            const data = await response.json();
+            if (data.error) {
+                throw new Error(data.error);
+            }
+
+            const job = data.job;
+            if (['succeeded', 'failed', 'cancelled'].includes(job.status)) {
+                return job;
+            }
+            if (onProgress && job.progress) {
+                onProgress(job.progress);
+            }
+            await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        }
+    }
+
     async addEmployee() {
         const nameInput = document.getElementById('employee-name');
         const name = nameInput.value.trim();
@@ -547,51 +619,144 @@ class RaffleDashboard {
     }
 
     async loadEmployees() {
+        // Start over from the first page (after a change or a new search);
+        // later pages are fetched by loadMoreEmployees as the list scrolls.
+        // Totals and the raffle come from the server, so nothing needs the
+        // whole roster in the browser
+        this.employeesLoadId = (this.employeesLoadId || 0) + 1;
+        this.employees = [];
+        this.employeesCursor = null;
+        this.employeesLoading = false;
+        this.clearEmployees();
+        this.loadSummary();
+        await this.loadMoreEmployees(true);
+    }
+
+    async loadMoreEmployees(firstPage = false) {
+        if (this.employeesLoading || (!firstPage && !this.employeesCursor)) return;
+        const loadId = this.employeesLoadId;
+        this.employeesLoading = true;
+        const params = new URLSearchParams({
+            limit: EMPLOYEES_PAGE_SIZE,
+            fields: 'name,department,total_entries,updated_at'
+        });
+        if (this.employeesQuery) params.set('q', this.employeesQuery);
+        if (this.employeesCursor) params.set('after', this.employeesCursor);
+        
         try {
-            const response = await fetch('/api/employees');
+            const response = await fetch(`/api/employees?${params}`);
             const data = await response.json();
             
-            if (data.success && data.employees) {
-                this.employees = data.employees;
-            } else {
+            // A newer refresh or search has started, let it take over
+            if (loadId !== this.employeesLoadId) return;
+            
+            if (!data.success || !data.employees) {
                 console.error('Invalid API response:', data);
-                this.employees = [];
+                this.employeesCursor = null;
+                return;
             }
             
-            this.renderEmployees();
-            this.updateStatsSmooth();
+            this.employees.push(...data.employees);
+            this.employeesCursor = data.next_cursor;
+            if (this.employees.length === 0) {
+                this.renderEmptyState();
+            } else {
+                this.appendEmployees(data.employees);
+            }
         } catch (error) {
+            if (loadId !== this.employeesLoadId) return;
             console.error('Failed to load employees:', error);
             this.showAlert('Failed to load employees', 'error');
-            this.employees = [];
+            this.employeesCursor = null;
+        } finally {
+            if (loadId === this.employeesLoadId) {
+                this.employeesLoading = false;
+                // A short page may leave the end of the list on screen already
+                if (this.employeesCursor && this.employeesEndVisible()) this.loadMoreEmployees();
+            }
         }
     }
 
-    renderEmployees() {
-        const grid = document.getElementById('employees-grid');
+    searchEmployees(searchTerm) {
+        clearTimeout(this.searchTimer);
+        this.searchTimer = setTimeout(() => {
+            const query = searchTerm.trim();
+            if (query === this.employeesQuery) return;
+            this.employeesQuery = query;
+            this.loadEmployees();
+        }, SEARCH_DEBOUNCE_MS);
+    }
+
+    observeEmployeesEnd() {
+        // An empty marker after the list; when it nears the viewport the next page loads
+        const container = document.getElementById('employees-container');
+        this.employeesEnd = document.createElement('div');
+        this.employeesEnd.className = 'employees-end';
+        container.appendChild(this.employeesEnd);
         
-        if (!this.employees || this.employees.length === 0) {
-            grid.innerHTML = `
-                <div class="empty-state fade-in">
-                                        <h3>No Employees Yet</h3>
-                    <p>Add your first employee to start tracking raffle entries and begin your quarterly raffle!</p>
-                    <button class="empty-state-action" onclick="document.getElementById('employee-name').focus()">
-                                                Add Your First Employee
-                    </button>
-                </div>
-            `;
-            const tableBody = document.getElementById('employee-table-body');
-            if (tableBody) tableBody.innerHTML = '';
-            return;
+        if ('IntersectionObserver' in window) {
+            const observer = new IntersectionObserver((entries) => {
+                if (entries.some(entry => entry.isIntersecting)) this.loadMoreEmployees();
+            }, { rootMargin: '400px' });
+            observer.observe(this.employeesEnd);
+        } else {
+            window.addEventListener('scroll', () => {
+                if (this.employeesEndVisible()) this.loadMoreEmployees();
+            });
         }
+    }
 
-        // Sort employees by total_entries (descending)
-        const sortedEmployees = [...this.employees]
-            .sort((a, b) => (b.total_entries || 0) - (a.total_entries || 0));
+    employeesEndVisible() {
+        return this.employeesEnd && this.employeesEnd.getBoundingClientRect().top < window.innerHeight + 400;
+    }
 
-        // Render cards view with new design
-        grid.innerHTML = sortedEmployees.map((employee, index) => `
-            <div class="employee-card slide-up" data-employee="${this.escapeHtml(employee.name)}" data-employee-id="${employee.id}" style="animation-delay: ${index * 0.1}s">
+    async loadSummary() {
+        // Totals, leaderboard and recent activity for the stats and the raffle modal
+        try {
+            const response = await fetch('/api/analytics/dashboard');
+            const data = await response.json();
+            if (!data.success) {
+                console.error('Invalid API response:', data);
+                return this.summary;
+            }
+            this.summary = data.analytics;
+            this.updateStatsSmooth();
+            this.updateTopPerformerStat();
+        } catch (error) {
+            console.error('Failed to load dashboard totals:', error);
+        }
+        return this.summary;
+    }
+
+    clearEmployees() {
+        document.getElementById('employees-grid').innerHTML = '';
+        const tableBody = document.getElementById('employee-table-body');
+        if (tableBody) tableBody.innerHTML = '';
+    }
+
+    renderEmptyState() {
+        const grid = document.getElementById('employees-grid');
+        grid.innerHTML = this.employeesQuery ? `
+            <div class="empty-state fade-in">
+                <h3>No Matching Employees</h3>
+                <p>No employee name contains "${this.escapeHtml(this.employeesQuery)}".</p>
+            </div>
+        ` : `
+            <div class="empty-state fade-in">
+                                    <h3>No Employees Yet</h3>
+                <p>Add your first employee to start tracking raffle entries and begin your quarterly raffle!</p>
+                <button class="empty-state-action" onclick="document.getElementById('employee-name').focus()">
+                                            Add Your First Employee
+                </button>
+            </div>
+        `;
+    }
+
+    appendEmployees(employees) {
+        // Only the new page is rendered; cards already on screen are left alone
+        const grid = document.getElementById('employees-grid');
+        grid.insertAdjacentHTML('beforeend', employees.map((employee, index) => `
+            <div class="employee-card slide-up" data-employee="${this.escapeHtml(employee.name)}" data-employee-id="${employee.id}" style="animation-delay: ${Math.min(index, 10) * 0.1}s">
                 <div class="employee-header">
                     <div class="employee-info">
                         <div class="employee-name">${this.escapeHtml(employee.name)}</div>
@@ -614,36 +779,32 @@ class RaffleDashboard {
                     </button>
                 </div>
             </div>
-        `).join('');
+        `).join(''));
         
-        // Render table view
         const tableBody = document.getElementById('employee-table-body');
         if (tableBody) {
-            tableBody.innerHTML = sortedEmployees.map((employee) => `
-                <tr>
-                    <td class="employee-name-cell">${this.escapeHtml(employee.name)}</td>
-                    <td>${employee.department || 'General'}</td>
-                    <td><span class="entries-badge">${employee.total_entries || 0}</span></td>
-                    <td>${employee.updated_at || 'No recent activity'}</td>
-                    <td>
-                        <div class="action-buttons">
-                            <button class="action-btn action-btn-primary add-entry-btn" data-employee-name="${this.escapeHtml(employee.name)}" data-employee-id="${employee.id}" title="Add entry">
-                                Add
-                            </button>
-                            <button class="action-btn action-btn-warning clear-points-btn" data-employee-name="${this.escapeHtml(employee.name)}" title="Clear points">
-                                Clear
-                            </button>
-                            <button class="action-btn action-btn-danger delete-employee-btn" data-employee-name="${this.escapeHtml(employee.name)}" title="Delete">
-                                Delete
-                            </button>
-                        </div>
-                    </td>
-                </tr>
-            `).join('');
+            tableBody.insertAdjacentHTML('beforeend', employees.map((employee) => `
+            <tr>
+                <td class="employee-name-cell">${this.escapeHtml(employee.name)}</td>
+                <td>${employee.department || 'General'}</td>
+                <td><span class="entries-badge">${employee.total_entries || 0}</span></td>
+                <td>${employee.updated_at || 'No recent activity'}</td>
+                <td>
+                    <div class="action-buttons">
+                        <button class="action-btn action-btn-primary add-entry-btn" data-employee-name="${this.escapeHtml(employee.name)}" data-employee-id="${employee.id}" title="Add entry">
+                            Add
+                        </button>
+                        <button class="action-btn action-btn-warning clear-points-btn" data-employee-name="${this.escapeHtml(employee.name)}" title="Clear points">
+                            Clear
+                        </button>
+                        <button class="action-btn action-btn-danger delete-employee-btn" data-employee-name="${this.escapeHtml(employee.name)}" title="Delete">
+                            Delete
+                        </button>
+                    </div>
+                </td>
+            </tr>
+            `).join(''));
         }
-        
-        // Add event delegation for Add Entry and Delete buttons
-        this.attachEmployeeActionHandlers();
     }
     
     attachEmployeeActionHandlers() {
@@ -811,17 +972,6 @@ class RaffleDashboard {
         }
     }
 
-    updateStats() {
-        const totalEmployees = this.employees ? this.employees.length : 0;
-        const totalEntries = this.employees ? this.employees.reduce((sum, emp) => sum + (emp.total_entries || 0), 0) : 0;
-
-        const totalEmployeesEl = document.getElementById('total-employees');
-        const totalEntriesEl = document.getElementById('total-entries');
-        
-        if (totalEmployeesEl) totalEmployeesEl.textContent = totalEmployees;
-        if (totalEntriesEl) totalEntriesEl.textContent = totalEntries;
-    }
-
     updateDateInfo() {
         const now = new Date();
         const options = { 
@@ -895,29 +1045,6 @@ class RaffleDashboard {
         }
     }
     
-    filterEmployees(searchTerm) {
-        const cards = document.querySelectorAll('.employee-card');
-        const term = searchTerm.toLowerCase().trim();
-        
-        cards.forEach(card => {
-            const name = card.querySelector('.employee-name').textContent.toLowerCase();
-            const matches = name.includes(term);
-            
-            if (matches) {
-                card.style.display = 'block';
-                card.style.animation = 'fadeInScale 0.3s ease-out';
-            } else {
-                card.style.animation = 'fadeOut 0.3s ease-out';
-                setTimeout(() => {
-                    if (!card.querySelector('.employee-name').textContent.toLowerCase().includes(term)) {
-                        card.style.display = 'none';
-                    }
-                }, 300);
-            }
-        });
-    }
-    
-    
     toggleDropdown() {
         const dropdown = document.querySelector('.dropdown-menu');
         dropdown.classList.toggle('show');
@@ -960,12 +1087,8 @@ class RaffleDashboard {
     }
     
     updateTopPerformerStat() {
-        if (!this.employees || this.employees.length === 0) {
-            this.animateNumber('top-performer-entries', 0);
-            return;
-        }
-        const topEntries = Math.max(...this.employees.map(emp => emp.total_entries || 0), 0);
-        this.animateNumber('top-performer-entries', topEntries);
+        const leader = this.summary && this.summary.top_performers[0];
+        this.animateNumber('top-performer-entries', leader ? leader.total_entries : 0);
     }
     
     updateDaysRemaining() {
@@ -978,8 +1101,8 @@ class RaffleDashboard {
     }
     
     updateStats() {
-        const totalEmployees = (Array.isArray(this.employees)) ? this.employees.length : 0;
-        const totalEntries = (Array.isArray(this.employees)) ? this.employees.reduce((sum, emp) => sum + (emp.total_entries || 0), 0) : 0;
+        const totalEmployees = this.summary ? this.summary.total_employees : 0;
+        const totalEntries = this.summary ? this.summary.total_entries : 0;
         
         this.animateNumber('total-employees', totalEmployees);
         this.animateNumber('total-entries', totalEntries);
@@ -1132,8 +1255,8 @@ class RaffleDashboard {
     
     // Enhanced stats update without flickering
     updateStatsSmooth() {
-        const totalEmployees = this.employees ? this.employees.length : 0;
-        const totalEntries = this.employees ? this.employees.reduce((sum, emp) => sum + (emp.total_entries || 0), 0) : 0;
+        const totalEmployees = this.summary ? this.summary.total_employees : 0;
+        const totalEntries = this.summary ? this.summary.total_entries : 0;
         
         // Update with smooth transitions
         const employeeEl = document.getElementById('total-employees');
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for the batched audit-log writer.
+
+A batch that can't be committed is retried with backoff rather than lost,
+and FLASK_ENV=testing makes the shared database write audit rows
+synchronously.
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from audit import AuditLogWriter
+
+ROW = (1, 'Added 3 raffle entries', 'activities', 7, None, '{"entries": 3}', '10.0.0.1', None)
+
+
+def _audit_database():
+    path = os.path.join(tempfile.mkdtemp(prefix='raffle_audit_'), 'audit.db')
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('''
+        CREATE TABLE audit_log (id INTEGER PRIMARY KEY, user_id INTEGER, action TEXT, table_name TEXT,
+                                record_id INTEGER, old_values TEXT, new_values TEXT, ip_address TEXT,
+                                user_agent TEXT, created_at TEXT)
+    ''')
+    conn.commit()
+    return path, conn
+
+
+def test_failed_flush_is_retried_not_dropped():
+    path, conn = _audit_database()
+    writer = AuditLogWriter(path, flush_interval=0.05, retries=5, retry_delay=0.01)
+    insert = writer._insert
+    failures = [sqlite3.OperationalError('database is locked')] * 2
+
+    def flaky_insert(batch):
+        if failures:
+            raise failures.pop()
+        insert(batch)
+
+    writer._insert = flaky_insert
+    try:
+        writer.write(ROW)
+        assert writer.flush(timeout=10)
+    finally:
+        writer.close()
+    metrics = writer.metrics()
+    assert metrics['retried_flushes'] == 2
+    assert metrics['written_total'] == 1 and metrics['dropped_rows'] == 0
+    assert conn.execute('SELECT COUNT(*) FROM audit_log').fetchone()[0] == 1
+
+
+def test_retries_are_bounded():
+    path, blocker = _audit_database()
+    writer = AuditLogWriter(path, synchronous=True, retries=2, retry_delay=0.01)
+    blocker.execute('DROP TABLE audit_log')
+    blocker.commit()
+    started = time.perf_counter()
+    writer.write(ROW)
+    assert time.perf_counter() - started < 5
+    metrics = writer.metrics()
+    assert metrics['retried_flushes'] == 2
+    assert metrics['failed_flushes'] == 1 and metrics['dropped_rows'] == 1
+
+
+def test_testing_config_writes_synchronously():
+    workdir = tempfile.mkdtemp(prefix='raffle_audit_')
+    env = dict(os.environ, FLASK_ENV='testing', DATABASE_PATH=os.path.join(workdir, 'data', 'raffle_test.db'),
+               BACKUP_PATH=os.path.join(workdir, 'backups'))
+    output = subprocess.run([sys.executable, '-c', 'from database import db; print(db.audit_writer.synchronous)'],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                            capture_output=True, text=True, check=True).stdout
+    assert output.strip().splitlines()[-1] == 'True'
+
+
+if __name__ == "__main__":
+    test_failed_flush_is_retried_not_dropped()
+    test_retries_are_bounded()
+    test_testing_config_writes_synchronously()
+    print("SUCCESS: audit rows survive a busy database")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for online backups (backup.py).
+
+A backup taken while another connection keeps writing restores to a sound
+database holding everything committed before it started, for each
+compression, `python backup.py --verify` accepts it and rejects a damaged
+copy, and only the newest BACKUP_RETENTION backups are kept.
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from backup import create_backup, decompress_file, list_backups, verify_backup
+
+BACKUP_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backup.py')
+ROWS = 5000
+
+
+def _database():
+    workdir = tempfile.mkdtemp(prefix='raffle_backup_')
+    path = os.path.join(workdir, 'raffle.db')
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('CREATE TABLE activities (id INTEGER PRIMARY KEY, notes TEXT)')
+    conn.executemany('INSERT INTO activities (notes) VALUES (?)', ((f'award {i}',) for i in range(ROWS)))
+    conn.commit()
+    return workdir, path, conn
+
+
+def _verify_from_command_line(path):
+    return subprocess.run([sys.executable, BACKUP_SCRIPT, '--verify', path], capture_output=True, text=True)
+
+
+def test_backup_round_trip():
+    workdir, path, writer = _database()
+    backup_dir = os.path.join(workdir, 'backups')
+    for compression in ('none', 'gzip', 'zstd'):
+        writes = []
+
+        def write_during_copy(copied, total):
+            # Commits made while the copy runs are not part of its snapshot
+            writer.execute("INSERT INTO activities (notes) VALUES ('during backup')")
+            writer.commit()
+            writes.append(copied)
+
+        result = create_backup(path, backup_dir, compression=compression, retention=0,
+                               pages_per_step=4, pause=0, progress=write_during_copy)
+        assert writes and result['integrity'] == 'ok'
+        assert verify_backup(result['path']) == 'ok'
+        checked = _verify_from_command_line(result['path'])
+        assert checked.returncode == 0, checked.stdout + checked.stderr
+
+        restored = os.path.join(workdir, f'restored_{compression}.db')
+        decompress_file(result['path'], restored)
+        conn = sqlite3.connect(restored)
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+        assert conn.execute("SELECT COUNT(*) FROM activities WHERE notes != 'during backup'").fetchone()[0] == ROWS
+        conn.close()
+    assert len(list_backups(backup_dir)) == 3
+
+
+def test_damaged_backup_fails_verification():
+    workdir, path, writer = _database()
+    result = create_backup(path, os.path.join(workdir, 'backups'), compression='none', retention=0)
+    with open(result['path'], 'r+b') as backup:
+        backup.seek(4096)
+        backup.write(b'\xff' * 8192)
+    assert verify_backup(result['path']) != 'ok'
+    checked = _verify_from_command_line(result['path'])
+    assert checked.returncode == 1
+
+
+def test_only_the_newest_backups_are_kept():
+    workdir, path, writer = _database()
+    backup_dir = os.path.join(workdir, 'backups')
+    paths = [create_backup(path, backup_dir, compression='gzip', retention=2)['path'] for _ in range(4)]
+    assert list_backups(backup_dir) == paths[-2:]
+    assert not any(name.endswith('.partial') for name in os.listdir(backup_dir))
+
+
+if __name__ == "__main__":
+    test_backup_round_trip()
+    test_damaged_backup_fails_verification()
+    test_only_the_newest_backups_are_kept()
+    print("SUCCESS: backups restore, verify and rotate")
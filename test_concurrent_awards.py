@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress test for POST /api/employee/<id>/add_entry
+
+Fires thousands of awards from several threads in this process and from
+several worker processes, all against one SQLite file, then checks that no
+update was lost: every employee's total_entries must equal the sum of their
+activity rows, and every award must have exactly one audit row.
+"""
+import os
+import multiprocessing
+import threading
+
+from conftest import use_database, app_client, admin_headers
+
+EMPLOYEES = 20
+THREADS = 8
+PROCESSES = 4
+AWARDS_PER_WORKER = 250
+
+
+def _award(client, headers, employee_ids, worker, count):
+    failures = 0
+    for i in range(count):
+        employee_id = employee_ids[(worker * 7 + i) % len(employee_ids)]
+        response = client.post(f'/api/employee/{employee_id}/add_entry', headers=headers, json={
+            'activity_name': f'Stress award {worker}-{i}',
+            'activity_category': 'stress',
+            'entries_awarded': i % 10 + 1
+        })
+        if response.status_code != 200:
+            failures += 1
+    return failures
+
+
+def _process_worker(db_path, employee_ids, worker, results):
+    # A spawned process starts clean: point it at the parent's database first
+    use_database(db_path)
+    results.put(_award(app_client(), admin_headers(), employee_ids, worker, AWARDS_PER_WORKER))
+
+
+def run_stress_test(client, auth_headers):
+    from database import db
+    with db.get_connection() as conn:
+        employee_ids = [conn.execute('INSERT INTO employees (name) VALUES (?)',
+                                     (f'Stress Employee {os.getpid()} {i}',)).lastrowid
+                        for i in range(EMPLOYEES)]
+        conn.commit()
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    processes = [ctx.Process(target=_process_worker, args=(db.db_path, employee_ids, THREADS + p, results))
+                 for p in range(PROCESSES)]
+    for process in processes:
+        process.start()
+
+    thread_failures = []
+
+    def thread_worker(worker):
+        thread_client = client.application.test_client()
+        thread_failures.append(_award(thread_client, auth_headers, employee_ids, worker,
+                                      AWARDS_PER_WORKER))
+
+    threads = [threading.Thread(target=thread_worker, args=(t,)) for t in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for process in processes:
+        process.join()
+
+    failures = sum(thread_failures) + sum(results.get() for _ in processes)
+    total_awards = (THREADS + PROCESSES) * AWARDS_PER_WORKER
+
+    placeholders = ','.join('?' * len(employee_ids))
+    with db.get_connection() as conn:
+        mismatched = conn.execute('''
+            SELECT e.id, e.total_entries, COALESCE(SUM(a.entries_awarded), 0) AS awarded
+            FROM employees e LEFT JOIN activities a ON a.employee_id = e.id
+            WHERE e.id IN ({placeholders})
+            GROUP BY e.id
+            HAVING e.total_entries != awarded
+        '''.format(placeholders=placeholders), employee_ids).fetchall()
+        activity_count = conn.execute(
+            f'SELECT COUNT(*) FROM activities WHERE employee_id IN ({placeholders})', employee_ids
+        ).fetchone()[0]
+        audit_count = conn.execute(f'''
+            SELECT COUNT(*) FROM audit_log WHERE table_name = 'activities'
+            AND record_id IN (SELECT id FROM activities WHERE employee_id IN ({placeholders}))
+        ''', employee_ids).fetchone()[0]
+
+    print(f"Awards attempted: {total_awards}, failed: {failures}")
+    print(f"Activities: {activity_count}, audit rows: {audit_count}")
+    print(f"Employees with mismatched totals: {len(mismatched)}")
+    return failures, total_awards, activity_count, audit_count, mismatched
+
+
+def test_concurrent_awards_keep_totals_consistent(client, auth_headers):
+    failures, total_awards, activity_count, audit_count, mismatched = run_stress_test(client, auth_headers)
+    assert failures == 0
+    assert activity_count == total_awards
+    assert audit_count == total_awards
+    assert not mismatched
+
+
+if __name__ == "__main__":
+    from conftest import scratch_environment
+    scratch_environment()
+    test_concurrent_awards_keep_totals_consistent(app_client(), admin_headers())
+    print("SUCCESS: totals match the sum of activities")
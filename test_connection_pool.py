@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded SQLite connection pool behind DatabaseManager.
+
+A checkout beyond max_size waits at most the pool's timeout and then
+raises PoolTimeout, a connection freed meanwhile goes to the waiter, a
+transaction left open is rolled back at checkin, and a forked worker
+starts with an empty pool of its own instead of the parent's connections.
+Read-only connections can't write, and under WAL they read the last
+committed data without waiting for the single writer.
+"""
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from connection_pool import ConnectionPool, PoolTimeout
+
+
+def _database():
+    path = os.path.join(tempfile.mkdtemp(prefix='raffle_pool_'), 'pool.db')
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('CREATE TABLE counters (name TEXT PRIMARY KEY, value INTEGER)')
+    conn.execute("INSERT INTO counters VALUES ('entries', 0)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _hold(pool, seconds):
+    """Check out a connection on another thread and keep it for `seconds`"""
+    checked_out = threading.Event()
+
+    def hold():
+        with pool.connection():
+            checked_out.set()
+            time.sleep(seconds)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    checked_out.wait()
+    return thread
+
+
+def test_checkout_times_out_when_pool_is_exhausted():
+    pool = ConnectionPool(_database(), max_size=1, timeout=0.2)
+    holder = _hold(pool, 1.0)
+    started = time.monotonic()
+    try:
+        with pool.connection():
+            raise AssertionError("checked out a connection beyond max_size")
+    except PoolTimeout:
+        pass
+    waited = time.monotonic() - started
+    holder.join()
+    assert 0.2 <= waited < 1.0
+    metrics = pool.metrics()
+    assert metrics['timeouts'] == 1 and metrics['open'] == 1
+
+
+def test_waiter_gets_the_returned_connection():
+    pool = ConnectionPool(_database(), max_size=1, timeout=5)
+    holder = _hold(pool, 0.2)
+    with pool.connection() as conn:
+        assert conn.execute('SELECT value FROM counters').fetchone()[0] == 0
+    holder.join()
+    metrics = pool.metrics()
+    assert metrics['waits'] == 1 and metrics['timeouts'] == 0 and metrics['opened'] == 1
+
+
+def test_open_transaction_is_rolled_back_at_checkin():
+    pool = ConnectionPool(_database(), max_size=1)
+    with pool.connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute("UPDATE counters SET value = 99 WHERE name = 'entries'")
+    with pool.connection() as conn:
+        assert not conn.in_transaction
+        assert conn.execute('SELECT value FROM counters').fetchone()[0] == 0
+
+
+def _use_pool_in_child(pool, parent_connection_id, results):
+    try:
+        with pool.connection() as conn:
+            conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'entries'")
+            conn.commit()
+            results.put(id(conn) != parent_connection_id)
+    except Exception as e:
+        results.put(repr(e))
+
+
+def test_forked_worker_gets_a_pool_of_its_own():
+    pool = ConnectionPool(_database(), max_size=1, timeout=2)
+    with pool.connection() as conn:
+        parent_connection_id = id(conn)
+    # The parent's only connection is checked out while the worker forks
+    held = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with pool.connection():
+            held.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    held.wait()
+    try:
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        child = context.Process(target=_use_pool_in_child, args=(pool, parent_connection_id, results))
+        child.start()
+        outcome = results.get(timeout=30)
+        child.join()
+    finally:
+        release.set()
+        holder.join()
+    assert outcome is True, outcome
+    assert child.exitcode == 0
+    with pool.connection() as conn:
+        assert id(conn) == parent_connection_id
+        assert conn.execute('SELECT value FROM counters').fetchone()[0] == 1
+    assert pool.metrics()['open'] == 1
+
+
+def test_read_only_connection_cannot_write():
+    readers = ConnectionPool(_database(), read_only=True)
+    with readers.connection() as conn:
+        assert conn.execute('SELECT value FROM counters').fetchone()[0] == 0
+        try:
+            conn.execute("UPDATE counters SET value = 1 WHERE name = 'entries'")
+            raise AssertionError("a read-only connection wrote to the database")
+        except sqlite3.OperationalError:
+            pass
+
+
+def test_readers_do_not_wait_for_the_writer():
+    path = _database()
+    writer = ConnectionPool(path, max_size=1)
+    readers = ConnectionPool(path, read_only=True, busy_timeout=5)
+    with writer.connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute("UPDATE counters SET value = 5 WHERE name = 'entries'")
+        started = time.monotonic()
+        with readers.connection() as reader:
+            assert reader.execute('SELECT value FROM counters').fetchone()[0] == 0
+        assert time.monotonic() - started < 1
+        conn.commit()
+    with readers.connection() as reader:
+        assert reader.execute('SELECT value FROM counters').fetchone()[0] == 5
+
+
+if __name__ == "__main__":
+    test_checkout_times_out_when_pool_is_exhausted()
+    test_waiter_gets_the_returned_connection()
+    test_open_transaction_is_rolled_back_at_checkin()
+    test_forked_worker_gets_a_pool_of_its_own()
+    test_read_only_connection_cannot_write()
+    test_readers_do_not_wait_for_the_writer()
+    print("SUCCESS: the pool bounds, times out, rolls back and survives a fork")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Tests for recovering background jobs whose worker process is gone.
+
+A running job is re-queued only once the process that claimed it has
+exited (or its pid now belongs to another process), never because a long
+step went quiet, and then runs exactly once more. A dispatcher only
+claims jobs of kinds it has a handler for.
+"""
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+
+
+def _queue(db, handler=None):
+    from jobs import JobQueue
+    queue = JobQueue(db, poll_interval=0.05)
+    queue.register('test_job', handler or (lambda job: {'ok': True}))
+    return queue
+
+
+def _running_job(db, pid, started, heartbeat_age=3600.0):
+    """Insert a job as if `pid` had claimed it and last reported progress heartbeat_age ago"""
+    job_id = uuid.uuid4().hex
+    with db.get_connection() as conn:
+        conn.execute('''
+            INSERT INTO jobs (id, kind, status, payload, progress, attempts, worker_pid, worker_started, heartbeat_at)
+            VALUES (?, 'test_job', 'running', '{}', '{}', 1, ?, ?, ?)
+        ''', (job_id, pid, started, time.time() - heartbeat_age))
+        conn.commit()
+    return job_id
+
+
+def _exited_pid():
+    process = multiprocessing.get_context('fork').Process(target=os._exit, args=(0,))
+    process.start()
+    process.join()
+    return process.pid
+
+
+def test_quiet_job_of_a_live_worker_is_left_running(db):
+    from jobs import process_start_time
+    queue = _queue(db)
+    job_id = _running_job(db, os.getpid(), process_start_time(os.getpid()))
+    queue._recover_orphaned()
+    job = queue.get(job_id)
+    assert job['status'] == 'running' and job['attempts'] == 1
+
+
+def test_recycled_pid_does_not_keep_a_job_running(db):
+    queue = _queue(db)
+    # This process's pid, but recorded with another process's start time
+    job_id = _running_job(db, os.getpid(), 'started-before-a-restart')
+    queue._recover_orphaned()
+    job = queue.get(job_id)
+    assert job['status'] == 'queued' and job['worker_pid'] is None
+
+
+def test_cancel_is_seen_inside_a_transaction(db):
+    from jobs import JobCancelled, JobContext
+    queue = _queue(db)
+    job_id = _running_job(db, os.getpid(), None)
+    context = JobContext(queue, queue.get(job_id))
+    assert queue.cancel(job_id) == 'running'
+    with db.get_connection() as conn:
+        # The handler holds the write lock, as an import does while inserting
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute("UPDATE settings SET value = value WHERE key = 'data_version'")
+        started = time.perf_counter()
+        try:
+            context.check_cancelled()
+            raise AssertionError("check_cancelled ignored a pending cancel")
+        except JobCancelled:
+            pass
+        finally:
+            conn.rollback()
+        assert time.perf_counter() - started < 1
+
+
+def test_jobs_without_a_handler_are_left_queued(db):
+    queue = _queue(db)
+    job_id = uuid.uuid4().hex
+    with db.get_connection() as conn:
+        conn.execute('''
+            INSERT INTO jobs (id, kind, status, payload, progress) VALUES (?, 'other_job', 'queued', '{}', '{}')
+        ''', (job_id,))
+        conn.commit()
+    while queue._claim_next() is not None:
+        pass
+    assert queue.get(job_id)['status'] == 'queued'
+    with db.get_connection() as conn:
+        conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+        conn.commit()
+
+
+def test_job_of_an_exited_worker_runs_once_more(db):
+    # Starts dispatchers that keep claiming queued jobs, so it runs last
+    runs = []
+    lock = threading.Lock()
+
+    def handler(job):
+        with lock:
+            runs.append(job.job_id)
+        return {'ok': True}
+
+    first, second = _queue(db, handler), _queue(db, handler)
+    job_id = _running_job(db, _exited_pid(), None)
+    # Two dispatchers notice the orphan; only one may re-queue it
+    first._recover_orphaned()
+    second._recover_orphaned()
+    assert first.get(job_id)['status'] == 'queued'
+
+    first.start()
+    second.start()
+    deadline = time.time() + 10
+    while first.get(job_id)['status'] != 'succeeded' and time.time() < deadline:
+        time.sleep(0.05)
+    time.sleep(0.3)
+    job = first.get(job_id)
+    assert job['status'] == 'succeeded'
+    assert job['attempts'] == 2
+    assert runs.count(job_id) == 1
+
+
+if __name__ == "__main__":
+    from conftest import scratch_environment, app_client
+    scratch_environment()
+    app_client()
+    from database import db
+    test_quiet_job_of_a_live_worker_is_left_running(db)
+    test_recycled_pid_does_not_keep_a_job_running(db)
+    test_cancel_is_seen_inside_a_transaction(db)
+    test_jobs_without_a_handler_are_left_queued(db)
+    test_job_of_an_exited_worker_runs_once_more(db)
+    print("SUCCESS: only jobs of exited workers are recovered, and exactly once")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for POST /api/raffle/draw, the /api/raffle/conduct preview and
+the what-if overrides of /api/raffle/odds.
+
+The roster is read and the winner picked before the write lock is taken;
+if entries change in between, the stale draw is thrown away and drawn
+again, so the recorded snapshot is always the roster at commit time. The
+preview returns totals and the leaderboard, never the whole roster.
+Malformed odds overrides are a 400, not a 500.
+"""
+import json
+
+from analytics import LEADERBOARD_SIZE
+
+
+def _add_employees(db, count, entries=1):
+    with db.write_transaction() as conn:
+        ids = [conn.execute('INSERT INTO employees (name, total_entries) VALUES (?, ?)',
+                            (f'Draw Tester {i}', entries)).lastrowid for i in range(count)]
+        db.bump_data_version(conn)
+    return ids
+
+
+def test_entries_awarded_mid_draw_are_in_the_recorded_snapshot(client, auth_headers, db):
+    import app as app_module
+    employee_id = _add_employees(db, 1)[0]
+    calls = []
+
+    def draw_many_with_concurrent_award(participants, count):
+        # Another request awards entries after the roster was read
+        if not calls:
+            response = client.post(f'/api/employee/{employee_id}/add_entry', headers=auth_headers,
+                                   json={'activity_name': 'Shift Coverage', 'entries_awarded': 5})
+            assert response.status_code == 200
+        calls.append(len(participants))
+        return real_draw_many(participants, count)
+
+    real_draw_many = app_module.draw_many
+    app_module.draw_many = draw_many_with_concurrent_award
+    try:
+        response = client.post('/api/raffle/draw', headers=auth_headers, json={})
+    finally:
+        app_module.draw_many = real_draw_many
+    assert response.status_code == 200, response.get_json()
+    assert len(calls) == 2
+
+    with db.read_connection() as conn:
+        snapshot = conn.execute('SELECT participants_snapshot FROM raffle_draws WHERE id = ?',
+                                (response.get_json()['draw_id'],)).fetchone()[0]
+    assert [employee_id, 6] in json.loads(snapshot)
+
+    replay = client.get(f"/api/raffle/{response.get_json()['raffle_id']}/replay", headers=auth_headers)
+    assert replay.get_json()['verified']
+
+
+def test_conduct_previews_without_the_roster(client, auth_headers, db):
+    _add_employees(db, LEADERBOARD_SIZE + 5, entries=2)
+    with db.read_connection() as conn:
+        participants, entries = conn.execute('''
+            SELECT COUNT(*), SUM(total_entries) FROM employees WHERE is_active = 1 AND total_entries > 0
+        ''').fetchone()
+
+    preview = client.post('/api/raffle/conduct', headers=auth_headers, json={}).get_json()
+    assert preview['success']
+    assert 'participants' not in preview
+    assert len(preview['leaders']) == LEADERBOARD_SIZE
+    assert preview['total_participants'] == participants
+    assert preview['total_entries'] == entries
+    assert preview['draw_url'] == '/api/raffle/draw'
+
+
+def test_odds_overrides_are_validated(client, auth_headers, db):
+    employee_id = _add_employees(db, 2)[0]
+
+    def odds(body):
+        return client.post('/api/raffle/odds', headers=auth_headers, json=body)
+
+    for overrides in ([1, 2], 'x', 3, {'abc': 1}, {str(employee_id): -1}, {str(employee_id): 1.5},
+                      {str(employee_id): '2'}, {str(employee_id): True}):
+        response = odds({'prizes': 1, 'trials': 1000, 'overrides': overrides})
+        assert response.status_code == 400, overrides
+        assert not response.get_json()['success']
+    assert odds([1, 2]).status_code == 400
+
+    response = odds({'prizes': 1, 'trials': 1000, 'overrides': {str(employee_id): 0}})
+    assert response.status_code == 200, response.get_json()
+    assert employee_id not in {row['id'] for row in response.get_json()['participants']}
+
+
+if __name__ == "__main__":
+    from conftest import scratch_environment, app_client, admin_headers
+    scratch_environment()
+    client, auth_headers = app_client(), admin_headers()
+    from database import db
+    test_entries_awarded_mid_draw_are_in_the_recorded_snapshot(client, auth_headers, db)
+    test_conduct_previews_without_the_roster(client, auth_headers, db)
+    test_odds_overrides_are_validated(client, auth_headers, db)
+    print("SUCCESS: draws record the roster they committed against and the preview stays small")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Statistical fairness test for the server-side raffle draw.
+
+Runs a million simulated single-winner draws with the production sampler
+and checks the observed win counts against the entry-weighted expectation
+with a chi-square goodness-of-fit test. Multi-prize draws (weight removal
+in the Fenwick tree) are compared against the naive approach of drawing
+repeatedly and discarding anyone who already won, and the Monte Carlo
+odds simulator against exact multi-prize probabilities.
+"""
+import itertools
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from raffle import SeededRandom, FenwickSampler, draw_winner, draw_many, replay_draw, snapshot_participants
+from odds import simulate_odds, simulation_work
+
+DRAWS = 1_000_000
+MULTI_PRIZE_DRAWS = 50_000
+MULTI_PRIZE_COUNT = 3
+# Mix of small and large weights, including a lone single-entry participant
+WEIGHTS = [1] + [w % 10 + 1 for w in range(48)] + [40]
+
+
+def chi_square_p_value(statistic, degrees_of_freedom):
+    """Upper-tail p-value using the Wilson-Hilferty normal approximation"""
+    k = degrees_of_freedom
+    z = ((statistic / k) ** (1 / 3) - (1 - 2 / (9 * k))) / math.sqrt(2 / (9 * k))
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def run_fairness_check(draws=DRAWS, seed=None):
+    rng = SeededRandom(seed)
+    sampler = FenwickSampler(WEIGHTS)
+    counts = [0] * len(WEIGHTS)
+    for _ in range(draws):
+        counts[sampler.sample(rng)] += 1
+
+    total = sum(WEIGHTS)
+    statistic = sum((observed - draws * weight / total) ** 2 / (draws * weight / total)
+                    for observed, weight in zip(counts, WEIGHTS))
+    p_value = chi_square_p_value(statistic, len(WEIGHTS) - 1)
+    print(f"{draws} draws over {len(WEIGHTS)} participants (seed {rng.seed[:16]}...)")
+    print(f"chi-square = {statistic:.2f}, df = {len(WEIGHTS) - 1}, p = {p_value:.4f}")
+    return p_value
+
+
+def test_draws_match_entry_weights():
+    # A fixed seed keeps the test deterministic; p < 0.001 would mean bias
+    assert run_fairness_check(seed='5eed' * 16) > 0.001
+
+
+def test_fenwick_find_matches_linear_scan():
+    sampler = FenwickSampler(WEIGHTS)
+    boundary = 0
+    for index, weight in enumerate(WEIGHTS):
+        assert sampler.find(boundary) == index
+        assert sampler.find(boundary + weight - 1) == index
+        boundary += weight
+
+
+def test_replay_reproduces_recorded_winner():
+    participants = [{'id': i + 100, 'name': f'P{i}', 'total_entries': w} for i, w in enumerate(WEIGHTS)]
+    winner, seed = draw_winner(participants)
+    assert replay_draw(snapshot_participants(participants), seed) == [winner['id']]
+
+    winners, seed = draw_many(participants, 5)
+    assert replay_draw(snapshot_participants(participants), seed, 5) == [w['id'] for w in winners]
+
+
+def naive_draw_many(weights, count, rng):
+    """Reference multi-prize draw: redraw from the full pool until a new winner appears"""
+    sampler = FenwickSampler(weights)
+    winners = []
+    while len(winners) < count:
+        index = sampler.sample(rng)
+        if index not in winners:
+            winners.append(index)
+    return winners
+
+
+def run_multi_prize_check(draws=MULTI_PRIZE_DRAWS, seed=None):
+    """Two-sample chi-square test on (position, participant) win counts"""
+    weights = WEIGHTS[:12]
+    participants = [{'id': i, 'total_entries': w} for i, w in enumerate(weights)]
+    rng = SeededRandom(seed)
+    fenwick_counts = {}
+    naive_counts = {}
+    for _ in range(draws):
+        # Derive a fresh 256-bit seed per draw from the deterministic test RNG
+        winners, _ = draw_many(participants, MULTI_PRIZE_COUNT, format(rng.randbelow(1 << 256), '064x'))
+        for position, winner in enumerate(winners):
+            fenwick_counts[position, winner['id']] = fenwick_counts.get((position, winner['id']), 0) + 1
+        for position, index in enumerate(naive_draw_many(weights, MULTI_PRIZE_COUNT, rng)):
+            naive_counts[position, index] = naive_counts.get((position, index), 0) + 1
+
+    statistic = 0.0
+    cells = set(fenwick_counts) | set(naive_counts)
+    for cell in cells:
+        a, b = fenwick_counts.get(cell, 0), naive_counts.get(cell, 0)
+        statistic += (a - b) ** 2 / (a + b)
+    # Each prize position contributes (participants - 1) degrees of freedom
+    degrees_of_freedom = len(cells) - MULTI_PRIZE_COUNT
+    p_value = chi_square_p_value(statistic, degrees_of_freedom)
+    print(f"{draws} {MULTI_PRIZE_COUNT}-prize draws: Fenwick removal vs naive redraw")
+    print(f"chi-square = {statistic:.2f}, df = {degrees_of_freedom}, p = {p_value:.4f}")
+    return p_value
+
+
+def test_multi_prize_draw_matches_naive_redraw():
+    assert run_multi_prize_check(seed='ab' * 32) > 0.001
+
+
+def exact_win_any(entries, prizes):
+    """P(win at least one prize) by enumerating every ordered set of winners"""
+    exact = [0.0] * len(entries)
+    for order in itertools.permutations(range(len(entries)), prizes):
+        chance, remaining = 1.0, sum(entries)
+        for index in order:
+            chance *= entries[index] / remaining
+            remaining -= entries[index]
+        for index in order:
+            exact[index] += chance
+    return exact
+
+
+def check_odds(entries, prizes, seed):
+    participants = [{'id': i, 'total_entries': w} for i, w in enumerate(entries)]
+    odds = {row['id']: row['p_win_any']
+            for row in simulate_odds(participants, prizes, 300_000, seed=seed)['participants']}
+    for index, probability in enumerate(exact_win_any(entries, prizes)):
+        assert abs(odds[index] - probability) < 0.005
+
+
+def test_odds_match_exact_probabilities():
+    check_odds([1, 2, 3, 4, 5], 2, seed=7)
+
+
+def test_odds_fallback_matches_exact_probabilities():
+    # Two entrants hold nearly everything, so third prizes are finished with sort keys
+    check_odds([1, 1, 50, 200], 3, seed=3)
+
+
+def test_odds_cost_is_bounded_for_skewed_entries():
+    # Drawing every prize with one entrant holding almost all entries used to
+    # redraw the later prizes without bound
+    participants = [{'id': i, 'total_entries': 1} for i in range(29)] + [{'id': 99, 'total_entries': 5000}]
+    started = time.perf_counter()
+    result = simulate_odds(participants, 30, 20_000, seed=1)
+    assert time.perf_counter() - started < 5
+    assert all(row['p_win_any'] == 1.0 for row in result['participants'])
+    assert simulation_work([p['total_entries'] for p in participants], 30, 20_000) < 20_000_000
+
+
+if __name__ == "__main__":
+    test_odds_match_exact_probabilities()
+    test_odds_fallback_matches_exact_probabilities()
+    test_odds_cost_is_bounded_for_skewed_entries()
+    test_fenwick_find_matches_linear_scan()
+    test_replay_reproduces_recorded_winner()
+    p_value = min(run_fairness_check(), run_multi_prize_check())
+    print("SUCCESS" if p_value > 0.001 else "FAILURE: draw distribution deviates from entry weights")
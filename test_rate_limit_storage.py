@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite rate-limit storage shared by worker processes.
+
+Several processes hit one limit at the same moment, the way gunicorn
+workers do; across all of them exactly the allowed number of hits may get
+through, for both strategies and for the /login limit of the app itself.
+"""
+import multiprocessing
+import os
+import tempfile
+import time
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import STRATEGIES
+
+import rate_limit_storage  # noqa: F401
+
+PROCESSES = 4
+ATTEMPTS = 10
+
+
+def _storage_uri():
+    return 'sqlite://' + os.path.join(tempfile.mkdtemp(prefix='raffle_rate_limit_'), 'ratelimits.db')
+
+
+def _hit(uri, strategy, limit, barrier, results):
+    limiter = STRATEGIES[strategy](storage_from_string(uri))
+    item = parse(limit)
+    barrier.wait()
+    results.put(sum(limiter.hit(item, '10.0.0.1') for _ in range(ATTEMPTS)))
+
+
+def _log_in(client, barrier, results):
+    barrier.wait()
+    statuses = [client.post('/login', json={'email': 'nobody@homeinstead.com', 'password': 'wrong'}).status_code
+                for _ in range(ATTEMPTS)]
+    results.put(sum(status != 429 for status in statuses))
+
+
+def _run_in_processes(target, *args):
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(PROCESSES)
+    results = context.Queue()
+    processes = [context.Process(target=target, args=args + (barrier, results)) for _ in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    allowed = [results.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    return allowed
+
+
+def test_moving_window_is_exact_across_processes():
+    allowed = _run_in_processes(_hit, _storage_uri(), 'moving-window', '7 per minute')
+    assert sum(allowed) == 7
+
+
+def test_fixed_window_is_exact_across_processes():
+    allowed = _run_in_processes(_hit, _storage_uri(), 'fixed-window', '7 per minute')
+    assert sum(allowed) == 7
+
+
+def test_moving_window_slides():
+    storage = storage_from_string(_storage_uri())
+    limiter = STRATEGIES['moving-window'](storage)
+    item = parse('2 per 2 seconds')
+    assert limiter.hit(item, 'a') and limiter.hit(item, 'a')
+    assert not limiter.hit(item, 'a')
+    assert limiter.hit(item, 'b')
+    time.sleep(2.1)
+    assert limiter.hit(item, 'a')
+    assert limiter.get_window_stats(item, 'a').remaining == 1
+
+
+def test_login_limit_holds_across_workers(client):
+    from app import app, limiter
+    assert type(limiter.storage).__name__ == 'SQLiteStorage', app.config['RATELIMIT_STORAGE_URI']
+    enabled = limiter.enabled
+    limiter.enabled = True
+    limiter.reset()
+    try:
+        # Forked, so every worker shares the app and its rate-limit storage
+        allowed = _run_in_processes(_log_in, client)
+    finally:
+        limiter.reset()
+        limiter.enabled = enabled
+    assert sum(allowed) == 5
+
+
+if __name__ == "__main__":
+    test_moving_window_is_exact_across_processes()
+    test_fixed_window_is_exact_across_processes()
+    test_moving_window_slides()
+    from conftest import scratch_environment, app_client
+    scratch_environment()
+    test_login_limit_holds_across_workers(app_client())
+    print("SUCCESS: rate limits hold exactly across processes")
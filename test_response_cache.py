@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Tests for @versioned_response, the ETag cache on GET /api/employees and
+/api/analytics/dashboard.
+
+A request whose If-None-Match matches the current ETag gets an empty 304,
+and every kind of write (adding an employee, an entry, bulk entries, a
+raffle draw, an Excel import, a reset, the raffle_data.json migration)
+bumps the data version so the old ETag stops matching and the next
+response is rebuilt.
+"""
+import io
+import json
+import os
+import tempfile
+import time
+
+from openpyxl import Workbook
+
+EMPLOYEES_URL = '/api/employees?include=activities&fields=name,total_entries'
+
+
+def _get(client, auth_headers, etag=None):
+    headers = dict(auth_headers)
+    if etag:
+        headers['If-None-Match'] = etag
+    return client.get(EMPLOYEES_URL, headers=headers)
+
+
+def _employee_id(client, auth_headers, name):
+    response = client.get(f'/api/employees?q={name}', headers=auth_headers)
+    return response.get_json()['employees'][0]['id']
+
+
+def _wait_for_job(client, auth_headers, response):
+    assert response.status_code == 202, response.get_json()
+    job_id = response.get_json()['job_id']
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        job = client.get(f'/api/jobs/{job_id}', headers=auth_headers).get_json()['job']
+        if job['status'] in ('succeeded', 'failed', 'cancelled'):
+            assert job['status'] == 'succeeded', job
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def _roster(*names):
+    workbook = Workbook()
+    workbook.active.append(['Employee Name'])
+    for name in names:
+        workbook.active.append([name])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def _assert_write_invalidates(client, auth_headers, write, body_changes=True):
+    before = _get(client, auth_headers)
+    assert before.status_code == 200
+    write()
+    after = _get(client, auth_headers, etag=before.headers['ETag'])
+    assert after.status_code == 200, write.__name__
+    assert after.headers['ETag'] != before.headers['ETag'], write.__name__
+    if body_changes:
+        assert after.get_data() != before.get_data(), write.__name__
+
+
+def test_matching_etag_gets_304(client, auth_headers):
+    first = _get(client, auth_headers)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    cached = _get(client, auth_headers, etag=etag)
+    assert cached.status_code == 304
+    assert cached.get_data() == b''
+    assert cached.headers['ETag'] == etag
+
+    assert _get(client, auth_headers, etag='"v0-stale"').status_code == 200
+
+
+def test_every_write_changes_etag_and_body(client, auth_headers):
+    def add_employee():
+        response = client.post('/api/employee', headers=auth_headers, json={'name': 'Etag Tester'})
+        assert response.status_code == 200, response.get_json()
+
+    _assert_write_invalidates(client, auth_headers, add_employee)
+    employee_id = _employee_id(client, auth_headers, 'Etag Tester')
+
+    def add_entry():
+        response = client.post(f'/api/employee/{employee_id}/add_entry', headers=auth_headers,
+                               json={'activity_name': 'Shift Coverage', 'entries_awarded': 2})
+        assert response.status_code == 200, response.get_json()
+
+    def bulk_entries():
+        response = client.post('/api/entries/bulk', headers=auth_headers, json={'awards': [
+            {'employee_id': employee_id, 'activity_name': 'Client Compliment', 'entries': 3}
+        ]})
+        assert response.status_code == 200, response.get_json()
+
+    def raffle_draw():
+        response = client.post('/api/raffle/draw', headers=auth_headers, json={'prize': 'Gift card'})
+        assert response.status_code == 200, response.get_json()
+
+    def excel_import():
+        response = client.post('/api/import_excel', headers=auth_headers, content_type='multipart/form-data',
+                               data={'file': (io.BytesIO(_roster('Imported Etag Tester')), 'roster.xlsx')})
+        _wait_for_job(client, auth_headers, response)
+
+    def reset():
+        response = client.post('/api/reset_all', headers=auth_headers, json={'confirmation': 'RESET_ALL_DATA'})
+        _wait_for_job(client, auth_headers, response)
+
+    _assert_write_invalidates(client, auth_headers, add_entry)
+    _assert_write_invalidates(client, auth_headers, bulk_entries)
+    # Draws change no employee or activity, only the version
+    _assert_write_invalidates(client, auth_headers, raffle_draw, body_changes=False)
+    _assert_write_invalidates(client, auth_headers, excel_import)
+    _assert_write_invalidates(client, auth_headers, reset)
+
+
+def test_json_migration_changes_etag(client, auth_headers):
+    from database import db
+    path = os.path.join(tempfile.mkdtemp(prefix='raffle_migrate_'), 'raffle_data.json')
+    with open(path, 'w') as f:
+        json.dump({'employees': {'Migrated Etag Tester': {'entries': 1, 'activities': [
+            {'activity': 'Perfect Attendance', 'entries': 1, 'date': '2024-01-01'}]}}}, f)
+    _assert_write_invalidates(client, auth_headers, lambda: db.migrate_from_json(path))
+
+
+if __name__ == "__main__":
+    from conftest import scratch_environment, app_client, admin_headers
+    scratch_environment()
+    client, auth_headers = app_client(), admin_headers()
+    test_matching_etag_gets_304(client, auth_headers)
+    test_every_write_changes_etag_and_body(client, auth_headers)
+    test_json_migration_changes_etag(client, auth_headers)
+    print("SUCCESS: cached responses answer 304 and every write invalidates them")
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Tests for the verified-token cache behind login_required / role_required.
+
+A cached token must never outlive what jwt.decode would accept: it is
+rejected once its exp passes, as soon as JWT_SECRET is rotated, and as
+soon as it (or every token of its user) is revoked. Role-protected
+endpoints verify the token once per request, and not at all while it is
+cached.
+"""
+import time
+
+import jwt
+
+
+def _token(role='admin', lifetime=3600):
+    from config import Config
+    now = int(time.time())
+    return jwt.encode({'user_id': 1, 'email': 'homecare@homeinstead.com', 'role': role,
+                       'iat': now, 'exp': now + lifetime}, Config.JWT_SECRET, algorithm='HS256')
+
+
+def _get_dashboard(client, token):
+    return client.get('/api/analytics/dashboard', headers={'Authorization': f'Bearer {token}'})
+
+
+def test_expired_token_is_not_served_from_cache(client):
+    from auth import token_cache
+    from config import Config
+    token = _token(lifetime=2)
+    assert _get_dashboard(client, token).status_code == 200
+    assert token_cache.get(token, Config.JWT_SECRET) is not None
+
+    expires = jwt.decode(token, options={'verify_signature': False})['exp']
+    time.sleep(max(0.0, expires - time.time()) + 0.2)
+    assert _get_dashboard(client, token).status_code == 401
+
+
+def test_rotated_secret_revokes_cached_tokens(client):
+    from config import Config
+    token = _token()
+    assert _get_dashboard(client, token).status_code == 200
+    assert _get_dashboard(client, token).status_code == 200
+
+    original = Config.JWT_SECRET
+    Config.JWT_SECRET = original + '-rotated'
+    try:
+        assert _get_dashboard(client, token).status_code == 401
+        assert _get_dashboard(client, _token()).status_code == 200
+    finally:
+        Config.JWT_SECRET = original
+    assert _get_dashboard(client, token).status_code == 200
+
+
+def test_revoked_token_is_not_served_from_cache(client):
+    from auth import AuthManager
+    token = AuthManager.generate_token({'id': 1, 'email': 'homecare@homeinstead.com', 'role': 'admin'})
+    other = AuthManager.generate_token({'id': 1, 'email': 'homecare@homeinstead.com', 'role': 'admin'})
+    assert _get_dashboard(client, token).status_code == 200
+    assert _get_dashboard(client, token).status_code == 200
+
+    response = client.post('/logout', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+    assert _get_dashboard(client, token).status_code == 401
+    assert _get_dashboard(client, other).status_code == 200
+
+
+def test_revoking_a_user_revokes_all_their_tokens(client):
+    from auth import AuthManager
+    user = {'id': 2, 'email': 'manager@homeinstead.com', 'role': 'manager'}
+    tokens = [AuthManager.generate_token(user) for _ in range(2)]
+    for token in tokens:
+        assert _get_dashboard(client, token).status_code == 200
+
+    AuthManager.revoke_user_tokens(2, 'account disabled')
+    for token in tokens:
+        assert _get_dashboard(client, token).status_code == 401
+    assert _get_dashboard(client, _token()).status_code == 200
+
+    # Issued within the same second as the revocation, but after it
+    assert _get_dashboard(client, AuthManager.generate_token(user)).status_code == 200
+
+
+def test_revocation_reaches_other_workers_on_refresh():
+    from auth import AuthManager
+    from database import db
+    from revocation import RevocationList
+    # Another worker's view of token_revocations
+    other_worker = RevocationList(db, refresh_interval=0.2)
+    token = AuthManager.generate_token({'id': 3, 'email': 'scheduler@homeinstead.com', 'role': 'viewer'})
+    claims = jwt.decode(token, options={'verify_signature': False})
+    assert not other_worker.is_revoked(claims)
+
+    assert AuthManager.revoke_token(token, 'logout')
+    assert AuthManager.verify_token(token) is None
+    time.sleep(0.25)
+    assert other_worker.is_revoked(claims)
+    assert not other_worker.is_revoked(dict(claims, jti='another-token'))
+
+
+def test_role_check_verifies_token_once(client):
+    import auth
+    decodes = []
+    real_decode = auth.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        decodes.append(1)
+        return real_decode(*args, **kwargs)
+
+    auth.jwt.decode = counting_decode
+    try:
+        viewer = _token(role='viewer')
+        response = client.post('/api/raffle/conduct', headers={'Authorization': f'Bearer {viewer}'}, json={})
+        assert response.status_code == 403
+
+        manager = {'Authorization': f'Bearer {_token(role="manager")}'}
+        decodes.clear()
+        assert client.post('/api/raffle/conduct', headers=manager, json={}).status_code not in (401, 403)
+        assert len(decodes) == 1
+        client.post('/api/raffle/conduct', headers=manager, json={})
+        assert len(decodes) == 1
+    finally:
+        auth.jwt.decode = real_decode
+
+
+def test_cache_is_bounded():
+    from auth import TokenCache
+    cache = TokenCache(max_entries=3)
+    tokens = [_token(lifetime=3600 + i) for i in range(5)]
+    for token in tokens:
+        cache.set(token, 'secret', {'exp': time.time() + 60})
+    assert len(cache) == 3
+    assert cache.get(tokens[0], 'secret') is None
+    assert cache.get(tokens[-1], 'secret') is not None
+
+
+if __name__ == "__main__":
+    from conftest import scratch_environment, app_client
+    scratch_environment()
+    client = app_client()
+    test_expired_token_is_not_served_from_cache(client)
+    test_rotated_secret_revokes_cached_tokens(client)
+    test_revoked_token_is_not_served_from_cache(client)
+    test_revoking_a_user_revokes_all_their_tokens(client)
+    test_revocation_reaches_other_workers_on_refresh()
+    test_role_check_verifies_token_once(client)
+    test_cache_is_bounded()
+    print("SUCCESS: cached tokens honour expiry, secret rotation, revocation and roles")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tests for Excel uploads to /api/import_excel.
+
+A body over MAX_CONTENT_LENGTH is refused with 413 before it is buffered,
+a single file over MAX_FILE_SIZE or one that isn't a workbook is refused
+before anything is written, normal-sized uploads stay in memory, a
+failure after saving leaves nothing behind in UPLOAD_PATH, and the
+sheet-parsing workers don't re-run the app's startup.
+"""
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+
+def _workbook_bytes(size=0):
+    """A zip container, padded to at least `size` bytes"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as workbook:
+        workbook.writestr('[Content_Types].xml', '<Types/>')
+        workbook.writestr('padding.bin', b'\0' * size)
+    return buffer.getvalue()
+
+
+def _upload(client, headers, *files):
+    return client.post('/api/import_excel', headers=headers, content_type='multipart/form-data',
+                       data={'file': [(io.BytesIO(content), name) for name, content in files]})
+
+
+def _saved_uploads():
+    from app import app
+    upload_dir = app.config['UPLOAD_PATH']
+    return os.listdir(upload_dir) if os.path.isdir(upload_dir) else []
+
+
+def test_oversize_body_is_refused_with_413(client, auth_headers):
+    from app import app
+    before = _saved_uploads()
+    body = _workbook_bytes(app.config['MAX_CONTENT_LENGTH'])
+    response = _upload(client, auth_headers, ('roster.xlsx', body))
+    assert response.status_code == 413
+    assert response.get_json() == {'success': False, 'error': 'File too large'}
+    assert _saved_uploads() == before
+
+
+def test_oversize_file_is_refused_before_saving(client, auth_headers):
+    from app import app
+    before = _saved_uploads()
+    response = _upload(client, auth_headers, ('roster.xlsx', _workbook_bytes(app.config['MAX_FILE_SIZE'])))
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'File too large: roster.xlsx'
+    assert _saved_uploads() == before
+
+
+def test_non_workbook_is_refused_before_saving(client, auth_headers):
+    before = _saved_uploads()
+    response = _upload(client, auth_headers, ('roster.xlsx', _workbook_bytes()), ('notes.xlsx', b'not a workbook'))
+    assert response.status_code == 400
+    assert 'File is not a zip file' in response.get_json()['error']
+    assert _saved_uploads() == before
+
+
+def test_upload_is_spooled_in_memory(client):
+    from app import app
+    body = _workbook_bytes(1024 * 1024)
+    with app.test_request_context('/api/import_excel', method='POST', content_type='multipart/form-data',
+                                  data={'file': (io.BytesIO(body), 'roster.xlsx')}):
+        from flask import request
+        stream = request.files['file'].stream
+        assert isinstance(stream, tempfile.SpooledTemporaryFile)
+        assert not stream._rolled
+        assert stream.read() == body
+
+
+def test_saved_uploads_are_removed_when_queueing_fails(client, auth_headers):
+    import app as app_module
+    before = _saved_uploads()
+
+    def failing_enqueue(*args, **kwargs):
+        raise RuntimeError('job queue unavailable')
+
+    enqueue = app_module.jobs.enqueue
+    app_module.jobs.enqueue = failing_enqueue
+    try:
+        response = _upload(client, auth_headers, ('roster.xlsx', _workbook_bytes()), ('more.xlsx', _workbook_bytes()))
+    finally:
+        app_module.jobs.enqueue = enqueue
+    assert response.status_code == 500
+    assert _saved_uploads() == before
+
+
+# Runs with app.py as the main module, the way `python app.py` does, so the
+# spawned workers re-import it as __mp_main__
+SHEET_WORKERS_SCRIPT = '''
+import sqlite3, sys
+from openpyxl import Workbook
+import app
+sys.modules['__main__'].__file__ = app.__file__
+files = []
+for i in range(2):
+    workbook = Workbook()
+    workbook.active.append(['Name'])
+    workbook.active.append([f'Person {i}'])
+    workbook.save(f'roster{i}.xlsx')
+    files.append({'filepath': f'roster{i}.xlsx', 'filename': f'roster{i}.xlsx'})
+app.extract_workbooks(files, max_processes=2)
+print(sqlite3.connect(app.db.db_path).execute('SELECT COUNT(*) FROM activities').fetchone()[0])
+'''
+
+
+def test_sheet_workers_skip_app_startup():
+    workdir = tempfile.mkdtemp(prefix='raffle_uploads_')
+    with open(os.path.join(workdir, 'raffle_data.json'), 'w') as f:
+        json.dump({'employees': {'Ann Lee': {'entries': 1, 'activities': [
+            {'activity': 'Shift Coverage', 'entries': 1, 'date': '2024-01-01'}]}}}, f)
+    env = dict(os.environ, FLASK_ENV='testing', DATABASE_PATH=os.path.join(workdir, 'data', 'raffle_test.db'),
+               BACKUP_PATH=os.path.join(workdir, 'backups'), UPLOAD_PATH=os.path.join(workdir, 'uploads'),
+               PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', SHEET_WORKERS_SCRIPT], cwd=workdir, env=env,
+                            capture_output=True, text=True, check=True)
+    # Migrated once by the parent; a worker re-running it would add another row
+    assert result.stdout.count('Successfully migrated') == 1
+    assert result.stdout.strip().splitlines()[-1] == '1'
+
+
+if __name__ == "__main__":
+    from conftest import scratch_environment, app_client, admin_headers
+    scratch_environment()
+    client, auth_headers = app_client(), admin_headers()
+    test_oversize_body_is_refused_with_413(client, auth_headers)
+    test_oversize_file_is_refused_before_saving(client, auth_headers)
+    test_non_workbook_is_refused_before_saving(client, auth_headers)
+    test_upload_is_spooled_in_memory(client)
+    test_saved_uploads_are_removed_when_queueing_fails(client, auth_headers)
+    test_sheet_workers_skip_app_startup()
+    print("SUCCESS: upload limits hold and failed uploads leave nothing behind")